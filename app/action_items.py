@@ -0,0 +1,86 @@
+"""Per-user action item inbox and bulk updates in a fixed handful of statements."""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from . import caching, events
+from .models import ActionItem, Meeting
+from .pagination import KeysetPaginator
+
+ITEMS_PER_PAGE = 25
+
+
+def inbox(user, completed=False, cursor=None):
+    """Return a page of the action items assigned to ``user``, newest first.
+
+    Filtering on ``assigned_to`` and ``completed`` and ordering on
+    ``-created_at`` is served by ``actionitem_assignee_idx``.
+    """
+    return KeysetPaginator(
+        ActionItem.objects.filter(assigned_to=user, completed=completed).select_related('meeting'),
+        per_page=ITEMS_PER_PAGE,
+        ordering=['-created_at', '-pk'],
+    ).get_page(cursor)
+
+
+def group_by_meeting(items):
+    """Return ``(meeting, items)`` pairs for a page of action items.
+
+    Meetings come in the order of their newest item on the page, so a
+    meeting whose items span two pages appears on both.
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(item.meeting_id, (item.meeting, []))[1].append(item)
+    return list(groups.values())
+
+
+def _update(items, open_delta, **changes):
+    """Apply ``changes`` to ``items`` with one ``UPDATE``.
+
+    ``open_delta`` is the change to ``open_action_item_count`` per updated
+    item. Returns the number of items updated.
+    """
+    with transaction.atomic():
+        rows = list(items.select_for_update().values_list('pk', 'meeting_id'))
+        if not rows:
+            return 0
+        ActionItem.objects.filter(pk__in=[pk for pk, _ in rows]).update(**changes)
+        # update() sends no signals, so bump counters and versions with one
+        # UPDATE per distinct item count and tell live watchers here
+        per_meeting = Counter(meeting_id for _, meeting_id in rows)
+        by_count = defaultdict(list)
+        for meeting_id, count in per_meeting.items():
+            by_count[count].append(meeting_id)
+        for count, meeting_ids in by_count.items():
+            caching.touch(
+                Meeting.objects.filter(pk__in=meeting_ids),
+                open_action_item_count=open_delta * count,
+            )
+        for meeting_id, count in per_meeting.items():
+            caching.purge_public_page(meeting_id)
+            events.publish(meeting_id, {
+                'type': 'actionitem', 'action': 'bulk_updated', 'count': count,
+            })
+    return len(rows)
+
+
+def _assigned(user, item_ids):
+    return ActionItem.objects.filter(pk__in=item_ids, assigned_to=user)
+
+
+def complete(user, item_ids):
+    """Mark the open items among ``item_ids`` assigned to ``user`` as done"""
+    return _update(_assigned(user, item_ids).filter(completed=False), -1, completed=True)
+
+
+def reopen(user, item_ids):
+    """Mark the done items among ``item_ids`` assigned to ``user`` as open"""
+    return _update(_assigned(user, item_ids).filter(completed=True), 1, completed=False)
+
+
+def reassign(user, item_ids, assignee):
+    """Hand the items among ``item_ids`` assigned to ``user`` to ``assignee``"""
+    if assignee == user:
+        return 0
+    return _update(_assigned(user, item_ids), 0, assigned_to=assignee)
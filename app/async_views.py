@@ -0,0 +1,185 @@
+"""Async variants of the read-heavy views, for use under an ASGI server.
+
+Enabled with the ``ASYNC_VIEWS`` setting, which makes ``app.urls`` route
+the dashboard, meeting list and meeting detail here instead of to
+``app.views``. Independent queries are started together with
+``asyncio.gather`` so a worker can interleave them with other requests.
+The live event stream is always served from here, since an idle watcher
+should cost a coroutine rather than a worker thread.
+
+Django 4.2 runs async ORM calls through ``sync_to_async`` with
+``thread_sensitive=True``, which funnels a request's queries through a
+single thread. Until the database layer is natively async the gain is in
+how many requests one worker can keep in flight, not in parallel round
+trips for one request; ``manage.py loadtest`` measures the difference.
+"""
+import asyncio
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+
+from . import events
+from .caching import fragment_timeout
+from .loaders import meeting_sections
+from .models import Meeting, MeetingSeries
+from .pagination import KeysetPaginator
+from .recurrence import OccurrencePaginator
+from .permissions import can_view_meeting, remember_meeting_access
+from .views import (
+    MEETINGS_PER_PAGE, conditional_meeting_response, meeting_validators, patch_meeting_response,
+)
+
+# Section name -> name of the {% cache %} fragment that renders it
+SECTION_FRAGMENTS = {
+    'notes': 'meeting_notes',
+    'action_items': 'meeting_action_items',
+    'attachments': 'meeting_attachments',
+    'attendees': 'meeting_attendees',
+}
+
+arender = sync_to_async(render)
+
+
+def login_required(view):
+    """``login_required`` for coroutine views (Django 4.2's is sync only)"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # request.user is a lazy object that hits the session store
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _evaluate(queryset):
+    # Async iteration doesn't support prefetch_related() in Django 4.2
+    return await sync_to_async(list)(queryset)
+
+
+async def _page(queryset, cursor, series=None):
+    if series is None:
+        paginator = KeysetPaginator(queryset, per_page=MEETINGS_PER_PAGE)
+    else:
+        paginator = OccurrencePaginator(queryset, series, per_page=MEETINGS_PER_PAGE)
+    return await sync_to_async(paginator.get_page)(cursor)
+
+
+@login_required
+async def dashboard(request):
+    """User dashboard, loading both meeting lists concurrently"""
+    meetings, attended_meetings = await asyncio.gather(
+        _page(
+            Meeting.objects.filter(created_by=request.user),
+            request.GET.get('created'),
+            MeetingSeries.objects.filter(created_by=request.user).select_related('created_by'),
+        ),
+        _page(Meeting.objects.filter(attendees__user=request.user), request.GET.get('attending')),
+    )
+    return await arender(request, 'dashboard.html', {
+        'meetings': meetings,
+        'attended_meetings': attended_meetings
+    })
+
+
+@login_required
+async def meeting_list(request):
+    """List all meetings"""
+    meetings = await _page(
+        Meeting.objects.visible_to(request.user).select_related('created_by'),
+        request.GET.get('cursor'),
+        MeetingSeries.objects.visible_to(request.user).select_related('created_by'),
+    )
+    return await arender(request, 'meeting_list.html', {'meetings': meetings})
+
+
+async def _load_sections(meeting, is_authenticated):
+    """Evaluate the sections whose cached fragment is missing.
+
+    The queries are gathered but still run one after another on the
+    request's database thread (see the module docstring). Sections with a cached fragment are left as lazy querysets, so they
+    cost nothing unless the fragment expires before the page is rendered.
+    """
+    sections = meeting_sections(meeting)
+    keys = {
+        name: make_template_fragment_key(
+            fragment,
+            [meeting.cache_key] + ([is_authenticated] if name == 'notes' else []),
+        )
+        for name, fragment in SECTION_FRAGMENTS.items()
+    }
+    cached = await cache.aget_many(keys.values())
+    missing = [name for name, key in keys.items() if key not in cached]
+    for name, rows in zip(missing, await asyncio.gather(
+        *(_evaluate(sections[name]) for name in missing)
+    )):
+        sections[name] = rows
+    return sections
+
+
+@login_required
+async def meeting_detail(request, pk):
+    """View meeting details"""
+    meeting = await Meeting.objects.select_related(
+        'created_by', 'last_edited_by'
+    ).with_access(request.user).filter(pk=pk).afirst()
+    if meeting is None:
+        raise Http404('No Meeting matches the given query.')
+    remember_meeting_access(request, meeting)
+    if not meeting.can_view:
+        response = await arender(request, 'access_denied.html', status=403)
+        return patch_meeting_response(response, None)
+
+    session_key = await sync_to_async(lambda: request.session.session_key)()
+    validators = meeting_validators(request, meeting, session_key)
+    response = conditional_meeting_response(request, validators)
+    if response is not None:
+        return response
+
+    context = {
+        'meeting': meeting,
+        'fragment_timeout': fragment_timeout(),
+        'live_updates': events.streams_enabled(),
+    }
+    context.update(await _load_sections(meeting, request.user.is_authenticated))
+    response = await arender(request, 'meeting_detail.html', context)
+    return patch_meeting_response(response, validators)
+
+
+async def _event_stream(meeting_id):
+    """Yield SSE messages for a meeting until the stream times out"""
+    deadline = time.monotonic() + events.stream_timeout()
+    yield f'retry: {events.heartbeat_interval() * 1000}\n\n'
+    async with events.get_broker().subscribe(meeting_id) as subscription:
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.get(), min(events.heartbeat_interval(), remaining)
+                )
+            except asyncio.TimeoutError:
+                # SSE comment: keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            yield events.format_event(event)
+
+
+@login_required
+async def meeting_events(request, pk):
+    """Server-Sent Events stream of changes to a meeting's children"""
+    if not events.streams_enabled():
+        # 204 tells EventSource to stop reconnecting
+        return HttpResponse(status=204)
+    if not await sync_to_async(can_view_meeting)(request, pk):
+        raise Http404('No Meeting matches the given query.')
+    response = StreamingHttpResponse(_event_stream(pk), content_type='text/event-stream')
+    patch_cache_control(response, no_cache=True)
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,148 @@
+"""Bulk attendee invites in a fixed handful of statements."""
+import codecs
+import csv
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from . import caching, events
+from .models import Attendee
+
+BATCH_SIZE = 1000
+
+
+class BulkInviteResult:
+    """Which identifiers were added, were already attending, or matched no user"""
+
+    def __init__(self):
+        self.added = []
+        self.already_present = []
+        self.unknown = []
+
+    def as_dict(self):
+        return {
+            'added': self.added,
+            'already_present': self.already_present,
+            'unknown': self.unknown,
+        }
+
+
+def parse_identifiers(text):
+    """Split free text on commas, semicolons and whitespace"""
+    return [item for item in text.replace(',', ' ').replace(';', ' ').split() if item]
+
+
+def parse_csv(uploaded_file):
+    """Read identifiers from the first column of a CSV upload.
+
+    The file is decoded and parsed line by line, and a leading header row
+    naming the column ``username`` or ``email`` is skipped.
+    """
+    reader = csv.reader(codecs.iterdecode(uploaded_file, 'utf-8-sig'))
+    identifiers = []
+    for index, row in enumerate(reader):
+        if not row or not row[0].strip():
+            continue
+        value = row[0].strip()
+        if index == 0 and value.lower() in ('username', 'email', 'user'):
+            continue
+        identifiers.append(value)
+    return identifiers
+
+
+def _resolve_users(identifiers):
+    """Map each identifier to a user id with a single query.
+
+    Usernames may themselves contain ``@``, so every identifier is tried as
+    a username first and anything containing ``@`` also as an email.
+    """
+    usernames = set(identifiers)
+    emails = {i.lower() for i in identifiers if '@' in i}
+    rows = User.objects.annotate(email_lower=Lower('email')).filter(
+        Q(username__in=usernames) | Q(email_lower__in=emails)
+    )
+    by_username = {}
+    by_email = {}
+    for user_id, username, email in rows.values_list('pk', 'username', 'email_lower'):
+        by_username[username] = user_id
+        by_email.setdefault(email, user_id)
+    return {
+        identifier: by_username.get(identifier) or by_email.get(identifier.lower())
+        for identifier in identifiers
+    }
+
+
+def _insert(meeting, user_ids, status):
+    """Create attendees for ``user_ids`` and return the ids actually added.
+
+    Users added concurrently since they were looked up make the insert
+    fail on ``unique_together``; they are then looked up again and the
+    rest is retried, so the result (and the counter) only covers rows
+    inserted here.
+    """
+    # A fixed order keeps concurrent invites from deadlocking each other
+    pending = sorted(user_ids)
+    while pending:
+        try:
+            with transaction.atomic():
+                Attendee.objects.bulk_create(
+                    [Attendee(meeting=meeting, user_id=uid, status=status) for uid in pending],
+                    batch_size=BATCH_SIZE,
+                )
+            return set(pending)
+        except IntegrityError:
+            taken = set(
+                Attendee.objects.filter(meeting=meeting, user_id__in=pending)
+                .values_list('user_id', flat=True)
+            )
+            if not taken:
+                raise
+            pending = [uid for uid in pending if uid not in taken]
+    return set()
+
+
+def bulk_invite(meeting, identifiers, status='invited'):
+    """Add the users named by ``identifiers`` (usernames or emails) to ``meeting``.
+
+    Costs one query to resolve users, one to find existing attendees, one
+    ``INSERT`` per ``BATCH_SIZE`` new attendees and one counter update.
+    Users added concurrently cost one more lookup and ``INSERT``.
+    """
+    result = BulkInviteResult()
+    identifiers = list(dict.fromkeys(identifiers))
+    resolved = _resolve_users(identifiers)
+    existing = set(
+        Attendee.objects.filter(
+            meeting=meeting, user_id__in={uid for uid in resolved.values() if uid}
+        ).values_list('user_id', flat=True)
+    )
+    new_user_ids = {
+        user_id for user_id in resolved.values() if user_id and user_id not in existing
+    }
+    added = set()
+    if new_user_ids:
+        with transaction.atomic():
+            added = _insert(meeting, new_user_ids, status)
+            if added:
+                # bulk_create sends no signals, so bump counters and version
+                # and tell live watchers here
+                caching.touch_meeting(
+                    meeting.pk, attendee_count=len(added), calendar_version=1
+                )
+                events.publish(meeting.pk, {
+                    'type': 'attendee', 'action': 'bulk_created', 'count': len(added),
+                })
+
+    for identifier in identifiers:
+        user_id = resolved[identifier]
+        if user_id is None:
+            result.unknown.append(identifier)
+        elif user_id in added:
+            # Two identifiers of the same user only count once
+            added.discard(user_id)
+            result.added.append(identifier)
+        else:
+            result.already_present.append(identifier)
+    return result
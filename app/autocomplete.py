@@ -0,0 +1,55 @@
+"""Username prefix search for typeahead widgets.
+
+Lookups use ``username__istartswith``, which migration 0012 backs with a
+case-insensitive index on ``auth_user.username``, and results are cached per
+prefix. Cache keys include a generation number that is bumped whenever a
+user is saved or deleted, so stale entries are never served.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+GENERATION_KEY = 'user-autocomplete:generation'
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+
+
+def cache_timeout():
+    """Lifetime of cached prefix results, in seconds"""
+    return getattr(settings, 'USER_AUTOCOMPLETE_CACHE_TIMEOUT', 300)
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def invalidate():
+    """Make every cached prefix result unreachable"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def match_users(prefix, limit=DEFAULT_LIMIT):
+    """Return up to ``limit`` ``{'username', 'name'}`` dicts for users
+    whose username starts with ``prefix`` (case-insensitive)"""
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    digest = hashlib.md5(prefix.lower().encode()).hexdigest()
+    key = f'user-autocomplete:{_generation()}:{limit}:{digest}'
+    results = cache.get(key)
+    if results is None:
+        rows = User.objects.filter(
+            username__istartswith=prefix, is_active=True
+        ).order_by('username').values_list('username', 'first_name', 'last_name')[:limit]
+        results = [
+            {'username': username, 'name': f'{first} {last}'.strip()}
+            for username, first, last in rows
+        ]
+        cache.set(key, results, cache_timeout())
+    return results
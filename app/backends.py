@@ -0,0 +1,52 @@
+"""Authentication backend that caches the per-request user lookup.
+
+``AuthenticationMiddleware`` loads ``request.user`` through the backend's
+``get_user`` on every request. ``CachedModelBackend`` serves that lookup
+from the cache for ``AUTH_USER_CACHE_TIMEOUT`` seconds. Entries are dropped
+when the user is saved or deleted (which covers password, ``is_active`` and
+``is_staff`` changes) or when their groups or permissions change, and a
+generation number bumped on group permission changes retires them all.
+The session auth hash is still checked against the cached user, so a
+changed password logs other sessions out as before.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+GENERATION_KEY = 'auth-user:generation'
+
+
+def cache_timeout():
+    """Lifetime of cached users, in seconds"""
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+
+
+def _user_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def invalidate_user(*user_ids):
+    cache.delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+def invalidate_all():
+    """Make every cached user unreachable"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = _user_key(user_id)
+        # One cache round trip for both the entry and the current generation
+        cached = cache.get_many([GENERATION_KEY, key])
+        generation = cached.get(GENERATION_KEY, 0)
+        entry = cached.get(key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+        user = super().get_user(user_id)
+        if user is not None:
+            cache.set(key, (generation, user), cache_timeout())
+        return user
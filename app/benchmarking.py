@@ -0,0 +1,17 @@
+"""Helpers shared by the benchmarking management commands."""
+import statistics
+
+
+def percentiles(timings, points=(50, 95, 99)):
+    """Return ``{point: value}`` for the given percentiles of ``timings``"""
+    if len(timings) < 2:
+        value = timings[0] if timings else 0.0
+        return {point: value for point in points}
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    return {point: cuts[point - 1] for point in points}
+
+
+def format_percentiles(timings):
+    """Render p50/p95/p99 of millisecond ``timings`` for a report line"""
+    values = percentiles(timings)
+    return '  '.join(f'p{point} {value:8.2f} ms' for point, value in values.items())
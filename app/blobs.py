@@ -0,0 +1,203 @@
+"""Content-addressed storage for uploaded attachment files.
+
+Uploads are spooled to a temporary file and hashed chunk by chunk as they
+arrive (``HashingUploadHandler``), so a file is never held in memory.
+Content is stored in ``STORAGES['attachments']`` under its SHA-256 digest,
+which makes identical uploads share one stored file and one ``Blob`` row.
+Downloads honour single byte ranges and use the digest as a strong ETag.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+
+from .models import Blob
+
+CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def storage():
+    return storages['attachments']
+
+
+def max_upload_size():
+    """Largest accepted upload, in bytes"""
+    return getattr(settings, 'ATTACHMENT_MAX_UPLOAD_SIZE', 100 * 1024 * 1024)
+
+
+def blob_name(sha256):
+    """Storage name of the content with digest ``sha256``"""
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Spool uploaded files to disk and compute their SHA-256 on the way.
+
+    The digest is set as ``sha256`` on the uploaded file. Files larger than
+    ``max_upload_size()`` are dropped and flagged with ``too_large``.
+    """
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > max_upload_size():
+            self.too_large = True
+            self.file.close()
+            raise SkipFile
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.digest.hexdigest()
+        return uploaded
+
+
+def _digest(uploaded):
+    digest = hashlib.sha256()
+    for chunk in uploaded.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _save(name, uploaded):
+    """Store ``uploaded`` as ``name`` unless that file already exists"""
+    if storage().exists(name):
+        return
+    uploaded.seek(0)
+    saved = storage().save(name, uploaded)
+    if saved != name:
+        # Another upload of the same content created the file meanwhile and
+        # the storage picked an alternative name; the content is identical
+        storage().delete(saved)
+
+
+def store(uploaded):
+    """Return ``(blob, created)`` for an uploaded file, storing its content
+    only if no blob with the same digest exists yet.
+
+    Must run in the transaction that creates the attachment: the blob row
+    stays locked until then, so ``delete_orphans`` can't remove it first.
+    """
+    sha256 = getattr(uploaded, 'sha256', None) or _digest(uploaded)
+    blob = Blob.objects.select_for_update().filter(pk=sha256).first()
+    if blob is not None:
+        return blob, False
+    _save(blob_name(sha256), uploaded)
+    try:
+        with transaction.atomic():
+            blob = Blob.objects.create(
+                sha256=sha256,
+                size=uploaded.size,
+                content_type=uploaded.content_type or 'application/octet-stream',
+            )
+    except IntegrityError:
+        # Stored concurrently by another upload of the same content
+        return Blob.objects.select_for_update().get(pk=sha256), False
+    return blob, True
+
+
+def delete_orphans():
+    """Delete blobs no attachment refers to; return how many were removed"""
+    removed = 0
+    orphans = Blob.objects.filter(attachments__isnull=True).values_list('pk', flat=True)
+    for sha256 in list(orphans):
+        with transaction.atomic():
+            # Locking the row waits for an upload reusing the blob, and the
+            # check is repeated under the lock
+            locked = Blob.objects.select_for_update().filter(pk=sha256).first()
+            if locked is None or locked.attachments.exists():
+                continue
+            locked.delete()
+            # Removed before the lock is released, so an upload that finds
+            # the row gone stores the file again
+            storage().delete(blob_name(sha256))
+        removed += 1
+    return removed
+
+
+def parse_range(header, size):
+    """Return the inclusive ``(start, end)`` of a single byte range.
+
+    Returns ``None`` when the whole file should be sent instead (no header,
+    a malformed one or several ranges) and raises ``ValueError`` when the
+    range can't be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or int(last) == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if start >= size:
+        raise ValueError(header)
+    end = int(last) if last else size - 1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _read(name, start, length):
+    with storage().open(name, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve(request, blob, filename):
+    """Stream ``blob`` as a download named ``filename``"""
+    etag = f'"{blob.sha256}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), blob.size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{blob.size}'
+            return response
+
+    name = blob_name(blob.sha256)
+    if byte_range is None:
+        response = FileResponse(storage().open(name, 'rb'), content_type=blob.content_type)
+        response['Content-Length'] = blob.size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(name, start, end - start + 1), status=206, content_type=blob.content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{blob.size}'
+        response['Content-Length'] = end - start + 1
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
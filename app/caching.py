@@ -0,0 +1,106 @@
+"""Versioned caching for meeting pages.
+
+Every change to a meeting or one of its children bumps ``Meeting.version``
+(see ``app.signals``). Cache entries are keyed on ``Meeting.cache_key``, so
+a bump makes every stale entry unreachable without having to find and
+delete them, which works the same on locmem, file and Redis backends.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from . import counters
+from .models import Comment, Meeting, Note
+
+
+def fragment_timeout():
+    """Lifetime of cached meeting fragments, in seconds"""
+    return getattr(settings, 'MEETING_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def touch(meetings, **counter_deltas):
+    """Bump the version of ``meetings`` and apply counter deltas in one UPDATE"""
+    meetings.update(
+        version=F('version') + 1,
+        modified_at=Now(),
+        **counters.changes(**counter_deltas)
+    )
+
+
+def touch_meeting(meeting_id, **counter_deltas):
+    touch(Meeting.objects.filter(pk=meeting_id), **counter_deltas)
+    purge_public_page(meeting_id)
+
+
+def _note_meeting_key(note_id):
+    return f'note-meeting:{note_id}'
+
+
+def remember_note_meeting(note_id, meeting_id):
+    """Cache the meeting of a note, which never changes.
+
+    Only committed notes are remembered, as the id of a rolled back one
+    can be handed out again.
+    """
+    transaction.on_commit(
+        lambda: cache.set(_note_meeting_key(note_id), meeting_id, fragment_timeout())
+    )
+
+
+def comment_meeting_id(comment):
+    """Meeting of ``comment``, without loading its note where possible"""
+    if Comment.note.is_cached(comment):
+        return comment.note.meeting_id
+    meeting_id = cache.get(_note_meeting_key(comment.note_id))
+    if meeting_id is None:
+        meeting_id = Note.objects.filter(pk=comment.note_id).values_list(
+            'meeting_id', flat=True
+        ).get()
+        remember_note_meeting(comment.note_id, meeting_id)
+    return meeting_id
+
+
+def meeting_etag(meeting, user, session_key):
+    """Validator for the meeting page as rendered for ``user``"""
+    # The page embeds the user's id and a CSRF token that is rotated
+    # together with the session key on login, so both vary the tag
+    key = f'{meeting.cache_key}:{user.pk}:{session_key}'
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def public_page_timeout():
+    """Lifetime of cached public-link pages, in seconds"""
+    return getattr(settings, 'PUBLIC_PAGE_CACHE_TIMEOUT', 300)
+
+
+def _public_page_key(token):
+    return f'public-page:{token}'
+
+
+def _public_token_key(meeting_id):
+    return f'public-page-token:{meeting_id}'
+
+
+def get_public_page(token):
+    return cache.get(_public_page_key(token))
+
+
+def set_public_page(token, meeting_id, content):
+    """Cache a rendered public page and remember which meeting it belongs to"""
+    cache.set_many({
+        _public_page_key(token): content,
+        _public_token_key(meeting_id): token,
+    }, public_page_timeout())
+
+
+def purge_public_page(meeting_id, token=None):
+    """Drop the cached public page of a meeting, if there is one"""
+    keys = [_public_token_key(meeting_id)]
+    cached_token = cache.get(keys[0])
+    for candidate in {token, cached_token} - {None}:
+        keys.append(_public_page_key(candidate))
+    cache.delete_many(keys)
@@ -0,0 +1,53 @@
+"""Denormalized per-meeting activity counters.
+
+Counters are adjusted with atomic ``F()`` updates as child rows come and go
+(see ``app.caching.touch``), so list pages can show activity without ``COUNT``
+subqueries. ``recount`` recomputes them from scratch to repair drift.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Meeting, Note, Attendee, ActionItem, Comment
+
+COUNTER_FIELDS = [
+    'note_count',
+    'comment_count',
+    'attendee_count',
+    'action_item_count',
+    'open_action_item_count',
+]
+
+
+def changes(**deltas):
+    """Turn counter deltas into ``F()`` expressions for ``QuerySet.update``"""
+    return {field: F(field) + delta for field, delta in deltas.items() if delta}
+
+
+def _count(queryset, meeting_lookup):
+    subquery = queryset.filter(**{meeting_lookup: OuterRef('pk')}).order_by().values(
+        meeting_lookup
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(subquery), 0)
+
+
+def expected_counts():
+    """Correlated subqueries computing each counter for a meeting row"""
+    return {
+        'note_count': _count(Note.objects.all(), 'meeting'),
+        'comment_count': _count(Comment.objects.all(), 'note__meeting'),
+        'attendee_count': _count(Attendee.objects.all(), 'meeting'),
+        'action_item_count': _count(ActionItem.objects.all(), 'meeting'),
+        'open_action_item_count': _count(ActionItem.objects.filter(completed=False), 'meeting'),
+    }
+
+
+def recount(meetings):
+    """Recompute the counters of ``meetings``; return how many had drifted"""
+    expected = {f'expected_{field}': expr for field, expr in expected_counts().items()}
+    drift = Q()
+    for field in COUNTER_FIELDS:
+        drift |= ~Q(**{field: F(f'expected_{field}')})
+    drifted = list(meetings.annotate(**expected).filter(drift).values_list('pk', flat=True))
+    if drifted:
+        Meeting.objects.filter(pk__in=drifted).update(**expected_counts())
+    return len(drifted)
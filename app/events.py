@@ -0,0 +1,238 @@
+"""Live meeting updates published to Server-Sent Event streams.
+
+Signal receivers publish a small JSON delta after the saving transaction
+commits, and every open ``/meetings/<pk>/events/`` stream for that meeting
+receives it. The broker is chosen with the ``EVENTS_BACKEND`` setting:
+
+* ``LocalBroker`` (default) fans events out to subscribers in the same
+  process, so it only suits a single worker process.
+* ``RedisBroker`` uses Redis pub/sub (``EVENTS_REDIS_URL``, falling back to
+  ``REDIS_URL``) so events reach watchers connected to any worker.
+"""
+import asyncio
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import caching
+from .models import Note, Comment, Attendee, ActionItem
+
+QUEUE_SIZE = 100
+
+
+def heartbeat_interval():
+    """Seconds between keep-alive comments on an idle stream"""
+    return getattr(settings, 'EVENTS_HEARTBEAT_INTERVAL', 15)
+
+
+def stream_timeout():
+    """Seconds before a stream is closed so the browser reconnects.
+
+    Reconnecting re-runs the access check and releases streams whose
+    client went away without the server noticing.
+    """
+    return getattr(settings, 'EVENTS_STREAM_TIMEOUT', 300)
+
+
+def streams_enabled():
+    """Whether pages should open event streams.
+
+    Only an ASGI server (``ASYNC_VIEWS``) sends the stream as it is
+    produced; WSGI collects the whole response first, so a stream would
+    hold a worker for ``stream_timeout()`` seconds and deliver nothing.
+    """
+    return getattr(settings, 'ASYNC_VIEWS', False)
+
+
+class Broker:
+    """Deliver events for a meeting to its subscribers"""
+
+    def publish(self, meeting_id, event):
+        raise NotImplementedError
+
+    def subscribe(self, meeting_id):
+        """Async context manager yielding an object with ``async get()``"""
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """In-process fan-out to ``asyncio.Queue`` subscribers.
+
+    ``publish`` is called from sync code in any thread, so events are handed
+    to each subscriber's event loop with ``call_soon_threadsafe``. A
+    subscriber that falls ``QUEUE_SIZE`` events behind loses the overflow.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, meeting_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(meeting_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, event)
+
+    @staticmethod
+    def _deliver(queue, event):
+        if not queue.full():
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, meeting_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(meeting_id, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(meeting_id, set())
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(meeting_id, None)
+
+    def subscriber_count(self, meeting_id):
+        return len(self._subscribers.get(meeting_id, ()))
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self):
+        while True:
+            message = await self.pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=None
+            )
+            if message is not None:
+                return json.loads(message['data'])
+
+
+class RedisBroker(Broker):
+    """Redis pub/sub on one channel per meeting, shared by all workers"""
+
+    channel_prefix = 'meeting-events'
+
+    def __init__(self):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise ImproperlyConfigured('RedisBroker requires the redis package')
+        url = getattr(settings, 'EVENTS_REDIS_URL', None) or os.environ.get('REDIS_URL')
+        if not url:
+            raise ImproperlyConfigured('RedisBroker requires EVENTS_REDIS_URL or REDIS_URL')
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._async_redis = redis.asyncio
+
+    def channel(self, meeting_id):
+        return f'{self.channel_prefix}:{meeting_id}'
+
+    def publish(self, meeting_id, event):
+        self._client.publish(self.channel(meeting_id), json.dumps(event))
+
+    @asynccontextmanager
+    async def subscribe(self, meeting_id):
+        client = self._async_redis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel(meeting_id))
+        try:
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+            await client.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'EVENTS_BACKEND', 'app.events.LocalBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def _username(user):
+    return user.username if user else None
+
+
+def _note_data(note):
+    return {'content': note.content, 'created_by': _username(note.created_by)}
+
+
+def _comment_data(comment):
+    return {
+        'note_id': comment.note_id,
+        'content': comment.content,
+        'created_by': _username(comment.created_by),
+    }
+
+
+def _attendee_data(attendee):
+    return {
+        'user': _username(attendee.user),
+        'status': attendee.status,
+        'status_display': attendee.get_status_display(),
+    }
+
+
+def _action_item_data(item):
+    return {
+        'title': item.title,
+        'completed': item.completed,
+        'assigned_to': _username(item.assigned_to),
+    }
+
+
+SERIALIZERS = {
+    Note: _note_data,
+    Comment: _comment_data,
+    Attendee: _attendee_data,
+    ActionItem: _action_item_data,
+}
+
+
+def event_for(instance, action):
+    """Return ``(meeting_id, event)`` describing a change to ``instance``.
+
+    Deletions only carry the type and id of the removed object.
+    """
+    serializer = SERIALIZERS.get(type(instance))
+    if serializer is None:
+        raise TypeError(f'{type(instance).__name__} has no live events')
+    if isinstance(instance, Comment):
+        meeting_id = caching.comment_meeting_id(instance)
+    else:
+        meeting_id = instance.meeting_id
+    event = {'type': instance._meta.model_name, 'action': action, 'id': instance.pk}
+    if action != 'deleted':
+        event.update(serializer(instance))
+    return meeting_id, event
+
+
+def publish(meeting_id, event):
+    """Send ``event`` to the meeting's watchers once the transaction commits"""
+    transaction.on_commit(lambda: get_broker().publish(meeting_id, event))
+
+
+def publish_instance(instance, action):
+    publish(*event_for(instance, action))
+
+
+def format_event(event):
+    """Encode an event as an SSE message"""
+    return f'data: {json.dumps(event)}\n\n'
@@ -0,0 +1,197 @@
+"""Streaming export of meetings with all of their child data.
+
+Meetings are read with ``QuerySet.iterator(chunk_size=...)`` and their
+children prefetched one chunk at a time, and every serializer is a
+generator, so memory use stays flat and the first bytes can be sent before
+the whole result set has been read.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Meeting, Note, Attendee, ActionItem, Attachment, Comment
+
+CHUNK_SIZE = 200
+
+CSV_COLUMNS = [
+    'record_type', 'meeting_id', 'meeting_title', 'meeting_date', 'id',
+    'parent_id', 'user', 'status', 'title', 'content', 'url', 'created_at',
+]
+
+
+def export_queryset(user=None, start=None, end=None, visibility=None):
+    """Meetings to export with children prefetched; all meetings if no user.
+
+    ``start`` and ``end`` are inclusive dates.
+    """
+    meetings = Meeting.objects.all() if user is None else Meeting.objects.visible_to(user)
+    if start:
+        meetings = meetings.filter(
+            date__gte=timezone.make_aware(datetime.combine(start, time.min))
+        )
+    if end:
+        meetings = meetings.filter(
+            date__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+        )
+    if visibility:
+        meetings = meetings.filter(visibility=visibility)
+    notes = Note.objects.select_related('created_by').prefetch_related(
+        Prefetch('comments', queryset=Comment.objects.select_related('created_by'))
+    )
+    return meetings.select_related('created_by').prefetch_related(
+        Prefetch('notes', queryset=notes),
+        Prefetch('attendees', queryset=Attendee.objects.select_related('user')),
+        Prefetch('action_items', queryset=ActionItem.objects.select_related('assigned_to')),
+        Prefetch('attachments', queryset=Attachment.objects.select_related('uploaded_by')),
+    ).order_by('pk')
+
+
+def _username(user):
+    return user.username if user else None
+
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+def meeting_records(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one nested dict per meeting"""
+    for meeting in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': meeting.pk,
+            'title': meeting.title,
+            'date': _timestamp(meeting.date),
+            'location': meeting.location,
+            'description': meeting.description,
+            'visibility': meeting.visibility,
+            'created_by': _username(meeting.created_by),
+            'created_at': _timestamp(meeting.created_at),
+            'notes': [
+                {
+                    'id': note.pk,
+                    'content': note.content,
+                    'created_by': _username(note.created_by),
+                    'created_at': _timestamp(note.created_at),
+                    'comments': [
+                        {
+                            'id': comment.pk,
+                            'content': comment.content,
+                            'created_by': _username(comment.created_by),
+                            'created_at': _timestamp(comment.created_at),
+                        }
+                        for comment in note.comments.all()
+                    ],
+                }
+                for note in meeting.notes.all()
+            ],
+            'attendees': [
+                {
+                    'id': attendee.pk,
+                    'user': _username(attendee.user),
+                    'status': attendee.status,
+                    'created_at': _timestamp(attendee.created_at),
+                }
+                for attendee in meeting.attendees.all()
+            ],
+            'action_items': [
+                {
+                    'id': item.pk,
+                    'title': item.title,
+                    'description': item.description,
+                    'assigned_to': _username(item.assigned_to),
+                    'completed': item.completed,
+                    'created_at': _timestamp(item.created_at),
+                }
+                for item in meeting.action_items.all()
+            ],
+            'attachments': [
+                {
+                    'id': attachment.pk,
+                    'name': attachment.name,
+                    'file_url': attachment.file_url,
+                    'sha256': attachment.blob_id,
+                    'uploaded_by': _username(attachment.uploaded_by),
+                    'created_at': _timestamp(attachment.created_at),
+                }
+                for attachment in meeting.attachments.all()
+            ],
+        }
+
+
+def _csv_rows(record):
+    """Flatten a meeting record into one CSV row per object"""
+    base = {
+        'meeting_id': record['id'],
+        'meeting_title': record['title'],
+        'meeting_date': record['date'],
+    }
+    yield dict(base, record_type='meeting', id=record['id'], user=record['created_by'],
+               status=record['visibility'], title=record['title'],
+               content=record['description'], url=record['location'],
+               created_at=record['created_at'])
+    for note in record['notes']:
+        yield dict(base, record_type='note', id=note['id'], parent_id=record['id'],
+                   user=note['created_by'], content=note['content'],
+                   created_at=note['created_at'])
+        for comment in note['comments']:
+            yield dict(base, record_type='comment', id=comment['id'], parent_id=note['id'],
+                       user=comment['created_by'], content=comment['content'],
+                       created_at=comment['created_at'])
+    for attendee in record['attendees']:
+        yield dict(base, record_type='attendee', id=attendee['id'], parent_id=record['id'],
+                   user=attendee['user'], status=attendee['status'],
+                   created_at=attendee['created_at'])
+    for item in record['action_items']:
+        yield dict(base, record_type='action_item', id=item['id'], parent_id=record['id'],
+                   user=item['assigned_to'], status='done' if item['completed'] else 'open',
+                   title=item['title'], content=item['description'],
+                   created_at=item['created_at'])
+    for attachment in record['attachments']:
+        yield dict(base, record_type='attachment', id=attachment['id'], parent_id=record['id'],
+                   user=attachment['uploaded_by'], title=attachment['name'],
+                   url=attachment['file_url'], created_at=attachment['created_at'])
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(records):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for record in records:
+        for row in _csv_rows(record):
+            yield writer.writerow(row)
+
+
+def stream_ndjson(records):
+    for record in records:
+        yield json.dumps(record) + '\n'
+
+
+def stream_json(records):
+    yield '['
+    separator = ''
+    for record in records:
+        yield separator + json.dumps(record)
+        separator = ','
+    yield ']\n'
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    'json': (stream_json, 'application/json'),
+}
+
+
+def stream_export(queryset, export_format):
+    """Return ``(chunks, content_type)`` for an export format"""
+    serializer, content_type = FORMATS[export_format]
+    return serializer(meeting_records(queryset)), content_type
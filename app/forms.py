@@ -1,5 +1,27 @@
 from django import forms
-from .models import Meeting, Note, Attendee, Comment
+from django.contrib.auth.models import User
+from django.urls import reverse_lazy
+from django.utils import timezone
+from .models import Meeting, MeetingSeries, Note, Attendee, ActionItem, Comment
+from .recurrence import WEEKDAYS
+
+
+class UserTypeaheadInput(forms.TextInput):
+    """Text input that suggests usernames from the autocomplete endpoint"""
+    template_name = 'widgets/typeahead.html'
+
+    def __init__(self, attrs=None):
+        defaults = {
+            'class': 'form-control',
+            'autocomplete': 'off',
+            'data-autocomplete-url': reverse_lazy('user_autocomplete'),
+        }
+        super().__init__({**defaults, **(attrs or {})})
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['list'] = f"{context['widget']['attrs'].get('id', name)}-options"
+        return context
 
 
 class MeetingForm(forms.ModelForm):
@@ -27,11 +49,96 @@ class MeetingForm(forms.ModelForm):
         }
 
 
+class MeetingSeriesForm(forms.ModelForm):
+    """Form for creating recurring meetings"""
+    MAX_COUNT = 1000
+
+    visibility = forms.ChoiceField(
+        choices=[
+            (Meeting.VISIBILITY_TEAM, 'Team'),
+            (Meeting.VISIBILITY_PUBLIC, 'Public'),
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    weekdays = forms.MultipleChoiceField(
+        choices=[
+            ('MO', 'Mon'), ('TU', 'Tue'), ('WE', 'Wed'), ('TH', 'Thu'),
+            ('FR', 'Fri'), ('SA', 'Sat'), ('SU', 'Sun'),
+        ],
+        required=False,
+        help_text='Weekly series only; defaults to the weekday of the first meeting.',
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        model = MeetingSeries
+        fields = [
+            'title', 'start', 'frequency', 'interval', 'weekdays', 'count', 'until',
+            'location', 'description', 'visibility',
+        ]
+        labels = {
+            'start': 'First meeting',
+            'interval': 'Repeat every',
+            'count': 'Number of meetings',
+            'until': 'Repeat until',
+        }
+        help_texts = {
+            'interval': 'Days, weeks or months, depending on the frequency.',
+            'count': 'Leave both this and "Repeat until" empty to repeat indefinitely.',
+        }
+        widgets = {
+            'title': forms.TextInput(attrs={'class': 'form-control'}),
+            'start': forms.DateTimeInput(
+                attrs={'class': 'form-control', 'type': 'datetime-local'}
+            ),
+            'frequency': forms.Select(attrs={'class': 'form-control'}),
+            'interval': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'count': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'until': forms.DateTimeInput(
+                attrs={'class': 'form-control', 'type': 'datetime-local'}
+            ),
+            'location': forms.TextInput(attrs={'class': 'form-control'}),
+            'description': forms.Textarea(
+                attrs={'class': 'form-control', 'rows': 4}
+            ),
+        }
+
+    def clean_weekdays(self):
+        return ','.join(self.cleaned_data['weekdays'])
+
+    def clean_interval(self):
+        interval = self.cleaned_data['interval']
+        if interval < 1:
+            raise forms.ValidationError('Repeat at least every 1 period.')
+        return interval
+
+    def clean_count(self):
+        count = self.cleaned_data['count']
+        if count is not None and not 1 <= count <= self.MAX_COUNT:
+            raise forms.ValidationError(f'Choose between 1 and {self.MAX_COUNT} meetings.')
+        return count
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('count') and cleaned_data.get('until'):
+            raise forms.ValidationError('Set a number of meetings or an end date, not both.')
+        start, until = cleaned_data.get('start'), cleaned_data.get('until')
+        weekdays = cleaned_data.get('weekdays')
+        if cleaned_data.get('frequency') == MeetingSeries.FREQUENCY_WEEKLY and start and weekdays:
+            # RRULE always counts the first meeting, whatever its weekday
+            if WEEKDAYS[timezone.localtime(start).weekday()] not in weekdays.split(','):
+                self.add_error('weekdays', 'Include the weekday of the first meeting.')
+        if start and until and until < start:
+            self.add_error('until', 'The series must end after its first meeting.')
+        return cleaned_data
+
+
 class NoteForm(forms.ModelForm):
     """Form for creating and editing notes"""
     class Meta:
         model = Note
         fields = ['content']
+        help_texts = {'content': 'Markdown formatting is supported.'}
         widgets = {
             'content': forms.Textarea(
                 attrs={'class': 'form-control', 'rows': 6}
@@ -41,19 +148,131 @@ class NoteForm(forms.ModelForm):
 
 class AttendeeForm(forms.ModelForm):
     """Form for adding attendees to meetings"""
+    # Looked up by username, so rendering never loads the user table
+    user = forms.ModelChoiceField(
+        queryset=User.objects.filter(is_active=True),
+        to_field_name='username',
+        widget=UserTypeaheadInput(),
+        error_messages={'invalid_choice': 'No user with that username.'},
+    )
+
     class Meta:
         model = Attendee
         fields = ['user', 'status']
         widgets = {
-            'user': forms.Select(attrs={'class': 'form-control'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
         }
 
 
+class ActionItemForm(forms.ModelForm):
+    """Form for adding action items to meetings"""
+    assigned_to = forms.ModelChoiceField(
+        queryset=User.objects.filter(is_active=True),
+        to_field_name='username',
+        required=False,
+        widget=UserTypeaheadInput(),
+        error_messages={'invalid_choice': 'No user with that username.'},
+    )
+
+    class Meta:
+        model = ActionItem
+        fields = ['title', 'description', 'assigned_to']
+        widgets = {
+            'title': forms.TextInput(attrs={'class': 'form-control'}),
+            'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+        }
+
+
+class ItemIdsField(forms.Field):
+    """List of object ids from repeated form values"""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return [int(item) for item in value or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Enter a list of ids.', code='invalid')
+
+
+class ActionItemBulkForm(forms.Form):
+    """Bulk operation on action items picked from the inbox"""
+    action = forms.ChoiceField(
+        choices=[('complete', 'Mark done'), ('reopen', 'Reopen'), ('reassign', 'Reassign to')],
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    items = ItemIdsField(error_messages={'required': 'Select some action items.'})
+    assignee = forms.ModelChoiceField(
+        queryset=User.objects.filter(is_active=True),
+        to_field_name='username',
+        required=False,
+        widget=UserTypeaheadInput(attrs={'class': 'form-control form-control-sm'}),
+        error_messages={'invalid_choice': 'No user with that username.'},
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') == 'reassign' and not cleaned_data.get('assignee'):
+            self.add_error('assignee', 'Choose who to reassign the items to.')
+        return cleaned_data
+
+
+class AttendeeBulkForm(forms.Form):
+    """Form for inviting many users to a meeting at once"""
+    identifiers = forms.CharField(
+        required=False,
+        label='Usernames or emails',
+        help_text='Separate with commas, spaces or new lines.',
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 6}),
+    )
+    csv_file = forms.FileField(
+        required=False,
+        label='CSV file',
+        help_text='One username or email per row, in the first column.',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control'}),
+    )
+    status = forms.ChoiceField(
+        choices=Attendee._meta.get_field('status').choices,
+        initial='invited',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('identifiers') and not cleaned_data.get('csv_file'):
+            raise forms.ValidationError('Enter some usernames or upload a CSV file.')
+        return cleaned_data
+
+
+class AttachmentUploadForm(forms.Form):
+    """Form for uploading a file to a meeting"""
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control'}))
+    name = forms.CharField(
+        max_length=255,
+        required=False,
+        help_text='Defaults to the file name.',
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+    )
+
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ['content']
+        help_texts = {'content': 'Markdown formatting is supported.'}
         widgets = {
             'content': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+
+
+class ExportForm(forms.Form):
+    """Query parameters for the meeting export"""
+    format = forms.ChoiceField(
+        choices=[('csv', 'CSV'), ('ndjson', 'NDJSON'), ('json', 'JSON')],
+        required=False,
+    )
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    visibility = forms.ChoiceField(
+        choices=[('', 'Any')] + Meeting.VISIBILITY_CHOICES,
+        required=False,
+    )
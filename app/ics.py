@@ -0,0 +1,324 @@
+"""Per-user iCalendar feeds of the meetings a user created or attends.
+
+Each meeting's ``VEVENT`` is cached under a key that includes
+``Meeting.calendar_version``, which is bumped only when the meeting itself
+or its attendee rows change, so note and comment activity doesn't cost a
+rebuild. A feed is streamed in batches of ``BATCH_SIZE`` meetings: one
+query for the batch's keys, one cache ``get_many`` and, for the misses
+only, one query for the meetings and one for their attendees.
+
+Recurring meetings (``MeetingSeries``) are published as one VEVENT with an
+RRULE each, never expanded. Occurrences that were cancelled or stored as
+meetings of their own are listed as EXDATEs; the stored ones appear as
+ordinary events. Series events are few per user and rendered on every
+full response. Their times are given in the default time zone, described
+by a ``VTIMEZONE`` listing its UTC offset changes from the first series
+start to ``TIMEZONE_YEARS`` ahead.
+"""
+import functools
+import hashlib
+import zoneinfo
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, Max, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .caching import fragment_timeout
+from .models import Attendee, Meeting, MeetingSeries
+
+# Bump when the VEVENT output changes to retire cached blocks
+FORMAT_VERSION = 1
+BATCH_SIZE = 500
+EVENT_DURATION = 'PT1H'
+TIMEZONE_YEARS = 10
+
+PARTSTAT = {
+    'invited': 'NEEDS-ACTION',
+    'accepted': 'ACCEPTED',
+    'declined': 'DECLINED',
+    'tentative': 'TENTATIVE',
+}
+
+HEADER = (
+    'BEGIN:VCALENDAR\r\n'
+    'VERSION:2.0\r\n'
+    'PRODID:-//Meeting Notes//Calendar feed//EN\r\n'
+    'CALSCALE:GREGORIAN\r\n'
+    'METHOD:PUBLISH\r\n'
+    'X-WR-CALNAME:Meetings\r\n'
+)
+FOOTER = 'END:VCALENDAR\r\n'
+
+
+def uid_domain():
+    return getattr(settings, 'ICS_UID_DOMAIN', 'meeting-notes')
+
+
+def escape_text(value):
+    """Escape a TEXT property value (RFC 5545, 3.3.11)"""
+    return (
+        (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def escape_param(value):
+    """Quote a parameter value; DQUOTE itself can't be represented"""
+    return '"' + value.replace('"', "'") + '"'
+
+
+def fold(line):
+    """Fold a content line into CRLF-terminated lines of at most 75 octets"""
+    parts = []
+    current = ''
+    size = 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(current)
+            # Continuation lines start with a space, which counts too
+            current, size = ' ', 1
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local_datetime(name, value):
+    """A DTSTART-style property in the default time zone, which RRULE
+    expansion needs to keep wall-clock times across DST changes"""
+    tz_name = timezone.get_default_timezone_name()
+    if tz_name == 'UTC':
+        return f'{name}:{format_datetime(value)}'
+    local = timezone.localtime(value, timezone.get_default_timezone())
+    return f'{name};TZID={tz_name}:{local.strftime("%Y%m%dT%H%M%S")}'
+
+
+def _format_offset(offset):
+    seconds = int(offset.total_seconds())
+    sign = '-' if seconds < 0 else '+'
+    hours, rest = divmod(abs(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f'{sign}{hours:02}{minutes:02}' + (f'{seconds:02}' if seconds else '')
+
+
+def _transitions(tz, start, end):
+    """Yield the UTC instants in ``[start, end)`` at which ``tz`` changes
+    its UTC offset, assuming at most one change a day"""
+    moment = start
+    while moment < end:
+        following = moment + timedelta(days=1)
+        if moment.astimezone(tz).utcoffset() != following.astimezone(tz).utcoffset():
+            # Narrow down to the second
+            low, high = moment, following
+            while high - low > timedelta(seconds=1):
+                middle = low + (high - low) // 2
+                if middle.astimezone(tz).utcoffset() == low.astimezone(tz).utcoffset():
+                    low = middle
+                else:
+                    high = middle
+            yield high
+        moment = following
+
+
+def _observance(moment, offset_from, tz):
+    local = moment.astimezone(tz)
+    kind = 'DAYLIGHT' if local.dst() else 'STANDARD'
+    # An observance starts at the local time of the offset it replaces
+    start = (moment + offset_from).replace(tzinfo=None)
+    lines = [
+        f'BEGIN:{kind}',
+        f'DTSTART:{start.strftime("%Y%m%dT%H%M%S")}',
+        f'TZOFFSETFROM:{_format_offset(offset_from)}',
+        f'TZOFFSETTO:{_format_offset(local.utcoffset())}',
+    ]
+    if local.tzname():
+        lines.append(f'TZNAME:{escape_text(local.tzname())}')
+    lines.append(f'END:{kind}')
+    return lines
+
+
+@functools.lru_cache(maxsize=16)
+def render_timezone(tz_name, first_year, last_year):
+    """Return the VTIMEZONE of ``tz_name`` for the years given"""
+    tz = zoneinfo.ZoneInfo(tz_name)
+    start = datetime(first_year, 1, 1, tzinfo=dt_timezone.utc)
+    end = datetime(last_year + 1, 1, 1, tzinfo=dt_timezone.utc)
+    offset = start.astimezone(tz).utcoffset()
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{tz_name}']
+    lines.extend(_observance(start, offset, tz))
+    for moment in _transitions(tz, start, end):
+        lines.extend(_observance(moment, offset, tz))
+        offset = moment.astimezone(tz).utcoffset()
+    lines.append('END:VTIMEZONE')
+    return ''.join(fold(line) for line in lines)
+
+
+def _address(user):
+    if user.email:
+        return f'mailto:{user.email}'
+    return f'urn:x-meeting-notes:user:{user.pk}'
+
+
+def event_key(meeting):
+    """Cache key of the VEVENT for the current state of ``meeting``"""
+    return (
+        f'ics-event:{meeting.pk}.{meeting.calendar_version}'
+        f'.{meeting.created_at.timestamp():.6f}.{FORMAT_VERSION}'
+    )
+
+
+def render_event(meeting, attendees):
+    """Return the VEVENT block of ``meeting``"""
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:meeting-{meeting.pk}@{uid_domain()}',
+        f'DTSTAMP:{format_datetime(meeting.updated_at)}',
+        f'DTSTART:{format_datetime(meeting.date)}',
+        f'DURATION:{EVENT_DURATION}',
+        f'SEQUENCE:{meeting.calendar_version}',
+        f'SUMMARY:{escape_text(meeting.title)}',
+    ]
+    if meeting.location:
+        lines.append(f'LOCATION:{escape_text(meeting.location)}')
+    if meeting.description:
+        lines.append(f'DESCRIPTION:{escape_text(meeting.description)}')
+    organizer = meeting.created_by
+    lines.append(f'ORGANIZER;CN={escape_param(organizer.username)}:{_address(organizer)}')
+    for attendee in attendees:
+        lines.append(
+            f'ATTENDEE;CN={escape_param(attendee.user.username)}'
+            f';PARTSTAT={PARTSTAT.get(attendee.status, "NEEDS-ACTION")}'
+            f':{_address(attendee.user)}'
+        )
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def rrule(series):
+    """The RRULE value of ``series``"""
+    parts = [f'FREQ={series.frequency}', f'INTERVAL={series.interval}']
+    if series.frequency == MeetingSeries.FREQUENCY_WEEKLY and series.weekdays:
+        parts.append(f'BYDAY={series.weekdays}')
+    if series.count:
+        parts.append(f'COUNT={series.count}')
+    elif series.until:
+        parts.append(f'UNTIL={format_datetime(series.until)}')
+    return ';'.join(parts)
+
+
+def render_series_event(series, excluded):
+    """Return the VEVENT of ``series``, leaving out the ``excluded`` starts"""
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:series-{series.pk}@{uid_domain()}',
+        f'DTSTAMP:{format_datetime(series.updated_at)}',
+        _local_datetime('DTSTART', series.start),
+        f'DURATION:{EVENT_DURATION}',
+        f'RRULE:{rrule(series)}',
+    ]
+    lines.extend(_local_datetime('EXDATE', moment) for moment in sorted(excluded))
+    lines.append(f'SUMMARY:{escape_text(series.title)}')
+    if series.location:
+        lines.append(f'LOCATION:{escape_text(series.location)}')
+    if series.description:
+        lines.append(f'DESCRIPTION:{escape_text(series.description)}')
+    organizer = series.created_by
+    lines.append(f'ORGANIZER;CN={escape_param(organizer.username)}:{_address(organizer)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def feed_series(user):
+    """Recurring meetings in ``user``'s feed: the ones they created"""
+    return MeetingSeries.objects.filter(created_by=user)
+
+
+def feed_meetings(user):
+    """Meetings in ``user``'s feed: the ones they created or attend"""
+    return Meeting.objects.filter(
+        Q(created_by=user)
+        | Q(Exists(Attendee.objects.filter(meeting=OuterRef('pk'), user=user)))
+    )
+
+
+def feed_etag(user):
+    """Validator of ``user``'s feed, computed with two queries.
+
+    The meetings are hashed as their ordered ``(pk, calendar_version)``
+    pairs, so any meeting joining, leaving or changing alters the tag;
+    sums of those columns can cancel out. Series are saved, and so move
+    ``updated_at``, when they change, and only leave the feed when deleted.
+    """
+    digest = hashlib.md5(f'{FORMAT_VERSION}:{user.pk}'.encode(), usedforsecurity=False)
+    meetings = feed_meetings(user).order_by('pk').values_list('pk', 'calendar_version')
+    for pk, version in meetings.iterator(chunk_size=BATCH_SIZE):
+        digest.update(f':{pk}.{version}'.encode())
+    state = feed_series(user).aggregate(
+        count=Count('pk'), pks=Sum('pk'), updated=Max('updated_at'),
+    )
+    digest.update(f'|{state["count"]}:{state["pks"]}:{state["updated"]}'.encode())
+    return '"' + digest.hexdigest() + '"'
+
+
+def _render_missing(pks):
+    """Render the VEVENTs of the meetings ``pks`` and cache them"""
+    meetings = Meeting.objects.filter(pk__in=pks).select_related('created_by')
+    attendees = {}
+    for attendee in Attendee.objects.filter(meeting_id__in=pks).select_related('user'):
+        attendees.setdefault(attendee.meeting_id, []).append(attendee)
+    rendered = {
+        event_key(meeting): render_event(meeting, attendees.get(meeting.pk, []))
+        for meeting in meetings
+    }
+    cache.set_many(rendered, fragment_timeout())
+    return rendered
+
+
+def stream_feed(user):
+    """Yield ``user``'s feed as text chunks, one batch of events at a time"""
+    yield HEADER
+    keys = feed_meetings(user).order_by('pk').values_list(
+        'pk', 'calendar_version', 'created_at', named=True
+    )
+    last_pk = 0
+    while True:
+        batch = list(keys.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        wanted = {event_key(meeting): meeting.pk for meeting in batch}
+        events = cache.get_many(wanted)
+        missing = [pk for key, pk in wanted.items() if key not in events]
+        if missing:
+            events.update(_render_missing(missing))
+        # A meeting changed since its key was read is left out of this
+        # response; the next poll picks it up under its new key
+        yield ''.join(events[key] for key in wanted if key in events)
+    yield from _series_events(user)
+    yield FOOTER
+
+
+def _series_events(user):
+    series = list(feed_series(user).select_related('created_by'))
+    if not series:
+        return
+    excluded = {item.pk: set() for item in series}
+    for series_id, moment in Meeting.objects.filter(series__in=series).values_list(
+        'series_id', 'series_occurrence'
+    ):
+        excluded[series_id].add(moment)
+    tz_name = timezone.get_default_timezone_name()
+    if tz_name != 'UTC':
+        # DTSTART and EXDATE refer to it by TZID
+        first_year = min(item.start for item in series).astimezone(dt_timezone.utc).year
+        yield render_timezone(tz_name, first_year, timezone.now().year + TIMEZONE_YEARS)
+    for item in series:
+        excluded[item.pk].update(datetime.fromisoformat(value) for value in item.exdates)
+        yield render_series_event(item, excluded[item.pk])
@@ -0,0 +1,190 @@
+"""Per-request performance measurements and their Prometheus histograms.
+
+``PerformanceMiddleware`` (in ``app.middleware``) puts a ``RequestMetrics``
+in a context variable for the duration of each request. Database time is
+recorded by an execute wrapper installed on every connection, and template
+time by ``InstrumentedDjangoTemplates``, so both are attributed to the right
+request in sync and async views. Finished requests are aggregated per URL
+name into in-process histograms, which ``render_metrics`` exposes in the
+Prometheus text format; each worker process reports its own series.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters for the request being served"""
+
+    def __init__(self, capture_sql=False):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.capture_sql = capture_sql
+        self.statements = []
+        self._render_depth = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def slowest_statements(self, limit):
+        return sorted(self.statements, key=lambda s: s[0], reverse=True)[:limit]
+
+
+def start_request(capture_sql=False):
+    """Begin measuring; returns ``(metrics, token)`` for ``finish_request``"""
+    metrics = RequestMetrics(capture_sql)
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        metrics.queries += 1
+        metrics.db_time += duration
+        if metrics.capture_sql:
+            metrics.statements.append((duration, sql, params))
+
+
+def install_query_recorder(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_on_open_connections():
+    """Cover connections opened before this module was imported"""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+@receiver(connection_created)
+def _instrument_new_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Included templates render inside their parent; only time the outermost
+        if metrics is None or metrics._render_depth:
+            return super().render(context, request)
+        metrics._render_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.render_time += time.perf_counter() - start
+            metrics._render_depth -= 1
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend that records render time per request"""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
+
+
+class Histogram:
+    """Cumulative histogram with one series per value of a single label"""
+
+    def __init__(self, name, documentation, buckets, label='view'):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.setdefault(
+                label_value, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: dict(value, buckets=list(value['buckets']))
+                      for key, value in self._series.items()}
+        for label_value in sorted(series):
+            data = series[label_value]
+            label = f'{self.label}="{_escape(label_value)}"'
+            for bound, count in zip(self.buckets, data['buckets']):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {data["count"]}')
+            lines.append(f'{self.name}_sum{{{label}}} {data["sum"]:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {data["count"]}')
+        return lines
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_DURATION = Histogram(
+    'app_request_duration_seconds', 'Time to produce a response, per URL name.', SECONDS_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'app_request_db_seconds', 'Time spent in SQL per request, per URL name.', SECONDS_BUCKETS
+)
+REQUEST_RENDER_TIME = Histogram(
+    'app_request_render_seconds', 'Template render time per request, per URL name.',
+    SECONDS_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'app_request_queries', 'SQL queries per request, per URL name.',
+    (1, 2, 5, 10, 20, 50, 100, 200),
+)
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_RENDER_TIME, REQUEST_QUERIES]
+
+
+def observe(view_name, metrics, total_time):
+    REQUEST_DURATION.observe(view_name, total_time)
+    REQUEST_DB_TIME.observe(view_name, metrics.db_time)
+    REQUEST_RENDER_TIME.observe(view_name, metrics.render_time)
+    REQUEST_QUERIES.observe(view_name, metrics.queries)
+
+
+def render_metrics():
+    """All histograms in the Prometheus text exposition format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
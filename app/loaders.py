@@ -0,0 +1,49 @@
+"""Query loaders that fetch a whole page's object graph in a fixed number of queries."""
+from django.db.models import Count, Prefetch
+from django.shortcuts import get_object_or_404
+
+from .models import Meeting, Comment
+from .pagination import KeysetPaginator
+
+# Comments shown per note on the meeting page; older ones load on demand
+COMMENTS_PER_NOTE = 5
+COMMENT_ORDERING = ['-created_at', '-pk']
+
+
+def get_meeting(pk, user):
+    """Fetch a meeting with its header users and ``user``'s access to it"""
+    queryset = Meeting.objects.select_related(
+        'created_by', 'last_edited_by'
+    ).with_access(user)
+    return get_object_or_404(queryset, pk=pk)
+
+
+def meeting_sections(meeting):
+    """Return the related collections rendered on the meeting detail page.
+
+    Each section is a lazy queryset with its users joined in, so rendering
+    the page costs one query per section regardless of how many notes or
+    attendees the meeting has. Notes come with their ``comment_total`` and
+    their newest ``COMMENTS_PER_NOTE`` comments as ``latest_comments``,
+    fetched for every note at once by one windowed query.
+    """
+    latest = Comment.objects.select_related('created_by').order_by(*COMMENT_ORDERING)
+    return {
+        'notes': meeting.notes.select_related('created_by').annotate(
+            comment_total=Count('comments')
+        ).prefetch_related(
+            Prefetch('comments', queryset=latest[:COMMENTS_PER_NOTE], to_attr='latest_comments')
+        ),
+        'attendees': meeting.attendees.select_related('user'),
+        'action_items': meeting.action_items.select_related('assigned_to'),
+        'attachments': meeting.attachments.select_related('uploaded_by', 'blob'),
+    }
+
+
+def comment_paginator(note_id):
+    """Keyset paginator over a note's comments, newest first"""
+    return KeysetPaginator(
+        Comment.objects.filter(note_id=note_id).select_related('created_by'),
+        per_page=COMMENTS_PER_NOTE,
+        ordering=COMMENT_ORDERING,
+    )
@@ -0,0 +1,263 @@
+import json
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from app import urls as app_urls
+from app.benchmarking import format_percentiles, percentiles
+from app import recurrence
+from app.models import Attachment, CalendarToken, Meeting, MeetingSeries, Comment
+
+# URL names that can't be benchmarked with a plain GET
+SKIPPED = {
+    'logout': 'ends the session',
+    'meeting_events': 'open-ended event stream',
+}
+
+
+class SkipRequest(Exception):
+    """Raised by a request function when the data it needs doesn't exist"""
+
+
+def _download(s):
+    if s.upload is None:
+        raise SkipRequest('no uploaded attachments')
+    return s.upload.meeting.created_by, {'pk': s.upload.pk}, {}
+
+
+def _public_download(s):
+    if s.upload is None:
+        raise SkipRequest('no uploaded attachments')
+    s.upload.meeting.ensure_public_token()
+    return None, {'token': s.upload.meeting.public_token, 'pk': s.upload.pk}, {}
+
+
+def _public_comments(s):
+    s.note.meeting.ensure_public_token()
+    return None, {'token': s.note.meeting.public_token, 'pk': s.note.pk}, {}
+
+
+def _occurrence(s):
+    if s.series is None:
+        raise SkipRequest('no recurring meetings')
+    occurrence = next(recurrence.occurrences(s.series), None)
+    if occurrence is None:
+        raise SkipRequest('recurring meeting has no occurrences')
+    return s.series.created_by, {'pk': s.series.pk, 'stamp': recurrence.format_stamp(occurrence)}, {}
+
+
+def _meeting(s):
+    return s.owner, {'pk': s.meeting.pk}, {}
+
+
+def _meeting_id(s):
+    return s.owner, {'meeting_id': s.meeting.pk}, {}
+
+
+def _plain(s):
+    return s.owner, {}, {}
+
+
+# url name -> function(samples) returning (user or None, kwargs, query params)
+REQUESTS = {
+    'index': _plain,
+    'dashboard': _plain,
+    'login': lambda s: (None, {}, {}),
+    'register': lambda s: (None, {}, {}),
+    'metrics': _plain,
+    'meeting_list': _plain,
+    'search': lambda s: (s.owner, {}, {'q': s.meeting.title.split()[0]}),
+    'user_autocomplete': lambda s: (s.owner, {}, {'q': s.owner.username[:4]}),
+    'meeting_export': lambda s: (s.owner, {}, {
+        'format': 'ndjson',
+        'start': s.meeting.date.date().isoformat(),
+        'end': s.meeting.date.date().isoformat(),
+    }),
+    'meeting_create': _plain,
+    'series_create': _plain,
+    'occurrence_detail': _occurrence,
+    'meeting_detail': _meeting,
+    'meeting_edit': _meeting,
+    'meeting_public_toggle': _meeting,
+    'meeting_public': lambda s: (None, {'token': s.public_meeting.public_token}, {}),
+    'meeting_delete': _meeting,
+    'calendar_feed_settings': _plain,
+    'calendar_feed': lambda s: (None, {'token': s.calendar_token.token}, {}),
+    'note_create': _meeting_id,
+    'note_edit': lambda s: (s.note.created_by, {'pk': s.note.pk}, {}),
+    'note_delete': lambda s: (s.note.created_by, {'pk': s.note.pk}, {}),
+    'note_history': lambda s: (s.note.created_by, {'pk': s.note.pk}, {}),
+    'note_comments': lambda s: (s.owner, {'pk': s.note.pk}, {}),
+    'public_note_comments': _public_comments,
+    'comment_create': lambda s: (s.owner, {'note_id': s.note.pk}, {}),
+    'comment_edit': lambda s: (s.comment.created_by, {'pk': s.comment.pk}, {}),
+    'comment_delete': lambda s: (s.comment.created_by, {'pk': s.comment.pk}, {}),
+    'attendee_add': _meeting_id,
+    'attendee_bulk_add': _meeting_id,
+    'attendee_remove': lambda s: (s.owner, {'pk': s.attendee.pk}, {}),
+    'attendee_update_status': lambda s: (s.owner, {'pk': s.attendee.pk}, {}),
+    'action_item_create': _meeting_id,
+    'action_item_inbox': _plain,
+    'attachment_upload': _meeting_id,
+    'attachment_download': _download,
+    'public_attachment_download': _public_download,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every URL in app.urls against the current database (e.g. '
+        'after seed_data) and report latency percentiles and query counts. '
+        'Fails when a PERF_BUDGETS limit is exceeded, when a request errors '
+        'or when a URL has no benchmark request. Changes are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Clear the cache before every request',
+        )
+        parser.add_argument(
+            '--budgets',
+            help='JSON file of budgets to use instead of settings.PERF_BUDGETS',
+        )
+        parser.add_argument(
+            '--url-name', action='append', dest='url_names',
+            help='Only benchmark these URL names (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        budgets = self.load_budgets(options['budgets'])
+        failures = []
+        # The test client sends "Host: testserver" (over HTTPS, see measure)
+        allowed_hosts = ['testserver', *settings.ALLOWED_HOSTS]
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=allowed_hosts):
+                failures = self.run(options, budgets)
+                raise Rollback
+        except Rollback:
+            pass
+        if failures:
+            raise CommandError('Performance budget failed:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All views are within budget.'))
+
+    def load_budgets(self, path):
+        if path:
+            with open(path) as budget_file:
+                return json.load(budget_file)
+        return getattr(settings, 'PERF_BUDGETS', {})
+
+    def samples(self):
+        """Pick a large meeting and related objects to request"""
+        meeting = Meeting.objects.filter(
+            comment_count__gt=0, attendee_count__gt=0
+        ).select_related('created_by').order_by('-note_count', '-attendee_count', 'pk').first()
+        if meeting is None:
+            raise CommandError(
+                'Needs a meeting with notes, comments and attendees; run seed_data first.'
+            )
+        comment = Comment.objects.filter(note__meeting=meeting).select_related(
+            'note__created_by', 'created_by'
+        ).first()
+        public_meeting = Meeting.objects.filter(public_token__isnull=False).first()
+        if public_meeting is None:
+            meeting.ensure_public_token()
+            public_meeting = meeting
+        return SimpleNamespace(
+            meeting=meeting,
+            owner=meeting.created_by,
+            note=comment.note,
+            comment=comment,
+            attendee=meeting.attendees.first(),
+            public_meeting=public_meeting,
+            series=MeetingSeries.objects.select_related('created_by').first(),
+            calendar_token=CalendarToken.objects.get_or_create(user=meeting.created_by)[0],
+            upload=Attachment.objects.filter(blob__isnull=False).select_related(
+                'meeting__created_by'
+            ).first(),
+        )
+
+    def run(self, options, budgets):
+        samples = self.samples()
+        clients = {}
+        failures = []
+        wanted = options['url_names']
+        for pattern in app_urls.urlpatterns:
+            name = pattern.name
+            if wanted and name not in wanted:
+                continue
+            if name in SKIPPED:
+                self.stdout.write(f'{name:<26} skipped: {SKIPPED[name]}')
+                continue
+            if name not in REQUESTS:
+                failures.append(f'{name}: no benchmark request defined')
+                continue
+            try:
+                user, kwargs, params = REQUESTS[name](samples)
+            except SkipRequest as reason:
+                self.stdout.write(f'{name:<26} skipped: {reason}')
+                continue
+            if user not in clients:
+                clients[user] = Client(raise_request_exception=False)
+                if user is not None:
+                    clients[user].force_login(user)
+            url = reverse(name, kwargs=kwargs)
+            timings, queries, status = self.measure(clients[user], url, params, options)
+            budget = dict(budgets.get('default', {}), **budgets.get(name, {}))
+            p95 = percentiles(timings)[95]
+            problems = []
+            if status >= 400:
+                problems.append(f'status {status}')
+            if 'p95_ms' in budget and p95 > budget['p95_ms']:
+                problems.append(f"p95 {p95:.1f} ms > {budget['p95_ms']} ms")
+            if 'queries' in budget and queries > budget['queries']:
+                problems.append(f"{queries} queries > {budget['queries']}")
+            line = f'{name:<26} {status}  {format_percentiles(timings)}  {queries:4d} queries'
+            if problems:
+                failures.append(f"{name}: {', '.join(problems)}")
+                self.stdout.write(self.style.ERROR(f"{line}  FAIL: {', '.join(problems)}"))
+            else:
+                self.stdout.write(line)
+        return failures
+
+    def measure(self, client, url, params, options):
+        """Return millisecond timings, the query count and the status code"""
+        def request():
+            if options['cold']:
+                cache.clear()
+            response = client.get(url, params, secure=True)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+
+        for _ in range(options['warmup']):
+            request()
+        # Counted with an execute wrapper: the test client resets
+        # connection.queries at the start of every request
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        timings = []
+        with connection.execute_wrapper(count):
+            response = request()
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings, len(queries), response.status_code
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from app import revisions
+from app.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Thin out the revision history of notes: keep the first revision, the '
+        'latest --keep revisions and the last revision of each earlier day.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=20)
+        parser.add_argument(
+            '--min-revisions', type=int, default=None,
+            help='Only compact notes with more revisions than this (default: --keep)',
+        )
+
+    def handle(self, *args, **options):
+        threshold = options['min_revisions']
+        if threshold is None:
+            threshold = options['keep']
+        notes = Note.objects.alias(
+            revision_count=Count('revisions')
+        ).filter(revision_count__gt=threshold).only('pk').order_by('pk')
+        deleted = compacted = 0
+        for note in notes.iterator():
+            removed = revisions.compact(note, keep_latest=options['keep'])
+            deleted += removed
+            compacted += bool(removed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {compacted} notes, deleted {deleted} revisions.'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import blobs
+
+
+class Command(BaseCommand):
+    help = 'Delete stored attachment files that no attachment refers to any more.'
+
+    def handle(self, *args, **options):
+        removed = blobs.delete_orphans()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {removed} orphaned files.'))
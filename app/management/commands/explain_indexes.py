@@ -0,0 +1,117 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from app.models import Meeting, Note, Attendee, ActionItem, Attachment, Comment
+from app.seeding import seed_dataset
+
+INDEXED_MODELS = [Meeting, Note, Attendee, ActionItem, Attachment, Comment]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large dataset inside a transaction and print query plans and '
+        'timings for the hot lookup paths with and without the composite '
+        'indexes. Everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--meetings', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Use EXPLAIN ANALYZE (PostgreSQL only)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Rolled back seeded data.')
+
+    def run(self, options):
+        self.stdout.write(f'Seeding on {connection.vendor}...')
+        users, meetings = seed_dataset(users=options['users'], meetings=options['meetings'])
+        self.analyze_tables()
+        queries = self.hot_queries(users[0], meetings[0])
+
+        self.drop_indexes()
+        self.analyze_tables()
+        before = self.measure(queries, options)
+        self.create_indexes()
+        self.analyze_tables()
+        after = self.measure(queries, options)
+
+        for name, _ in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n== {name}'))
+            for label, results in (('without indexes', before), ('with indexes', after)):
+                plan, median = results[name]
+                self.stdout.write(f'-- {label}: {median:.3f} ms (median)')
+                self.stdout.write(plan)
+
+    def hot_queries(self, user, meeting):
+        note = Note.objects.filter(meeting__isnull=False).first()
+        return [
+            ('dashboard: your meetings',
+             Meeting.objects.filter(created_by=user).order_by('-date', '-pk')[:20]),
+            ('dashboard: meetings attending',
+             Meeting.objects.filter(attendees__user=user).order_by('-date', '-pk')[:20]),
+            ('meeting list page',
+             Meeting.objects.order_by('-date', '-pk')[:20]),
+            ('attendee check',
+             Attendee.objects.filter(user=user, meeting=meeting).order_by()),
+            ('meeting notes',
+             Note.objects.filter(meeting=meeting).order_by('created_at')),
+            ('note comments',
+             Comment.objects.filter(note=note).order_by('created_at')),
+            ('open action items for user',
+             ActionItem.objects.filter(assigned_to=user, completed=False).order_by('-created_at')),
+            ('meeting attachments',
+             Attachment.objects.filter(meeting=meeting).order_by('-created_at')),
+        ]
+
+    def measure(self, queries, options):
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        results = {}
+        for name, queryset in queries:
+            plan = queryset.explain(**explain_options)
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (plan, statistics.median(timings))
+        return results
+
+    def index_statements(self, action):
+        editor = connection.schema_editor()
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                if action == 'create':
+                    yield str(index.create_sql(model, editor))
+                else:
+                    yield str(index.remove_sql(model, editor))
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for sql in self.index_statements('remove'):
+                cursor.execute(sql)
+
+    def create_indexes(self):
+        with connection.cursor() as cursor:
+            for sql in self.index_statements('create'):
+                cursor.execute(sql)
+
+    def analyze_tables(self):
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                cursor.execute('ANALYZE %s' % connection.ops.quote_name(model._meta.db_table))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app import exports
+from app.models import Meeting
+
+
+class Command(BaseCommand):
+    help = 'Stream every meeting with its child data as CSV, NDJSON or JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='ndjson')
+        parser.add_argument('--start', help='First meeting date (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last meeting date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--visibility', choices=[choice for choice, _ in Meeting.VISIBILITY_CHOICES]
+        )
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        dates = {}
+        for name in ('start', 'end'):
+            value = options[name]
+            try:
+                dates[name] = parse_date(value) if value else None
+            except ValueError:
+                # Well formed but impossible, e.g. 2024-02-30
+                dates[name] = None
+            if value and dates[name] is None:
+                raise CommandError(f'Invalid --{name} date: {value}')
+        queryset = exports.export_queryset(
+            start=dates['start'], end=dates['end'], visibility=options['visibility']
+        )
+        chunks, _ = exports.stream_export(queryset, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
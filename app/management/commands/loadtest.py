@@ -0,0 +1,90 @@
+import http.cookiejar
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.benchmarking import format_percentiles
+
+DEFAULT_PATHS = ['/dashboard/', '/meetings/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Send concurrent requests to one or more running servers and report '
+        'latency percentiles, e.g. to compare the uvicorn ASGI worker '
+        '(ASYNC_VIEWS=True) of the Procfile web process with '
+        '`gunicorn meeting_notes.wsgi:application`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'base_urls', nargs='+',
+            help='Servers to test, e.g. http://127.0.0.1:8000 http://127.0.0.1:8001',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request (repeatable); defaults to the dashboard and meeting list',
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Requests per path')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--username', help='Log in as this user first')
+        parser.add_argument('--password', default='')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        for base_url in options['base_urls']:
+            base_url = base_url.rstrip('/')
+            opener = self.opener(base_url, options)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{base_url} ({options['concurrency']} concurrent)"
+            ))
+            for path in paths:
+                timings, errors, elapsed = self.run(opener, base_url + path, options)
+                self.stdout.write(
+                    f'{path:<30} {format_percentiles(timings)}  '
+                    f'{len(timings) / elapsed:7.1f} req/s  {errors} errors'
+                )
+
+    def opener(self, base_url, options):
+        """Build a URL opener, logged in when --username is given"""
+        jar = http.cookiejar.CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+        if options['username']:
+            login_url = base_url + '/login/'
+            page = opener.open(login_url, timeout=options['timeout']).read().decode()
+            match = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page)
+            if not match:
+                raise CommandError(f'No CSRF token on {login_url}')
+            data = urllib.parse.urlencode({
+                'csrfmiddlewaretoken': match.group(1),
+                'username': options['username'],
+                'password': options['password'],
+            }).encode()
+            request = urllib.request.Request(login_url, data, headers={'Referer': login_url})
+            response = opener.open(request, timeout=options['timeout'])
+            if response.geturl().rstrip('/') == login_url.rstrip('/'):
+                raise CommandError(f"Could not log in as {options['username']}")
+        return opener
+
+    def run(self, opener, url, options):
+        def fetch(_):
+            start = time.perf_counter()
+            try:
+                with opener.open(url, timeout=options['timeout']) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                return None
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+        timings = [result for result in results if result is not None]
+        return timings, len(results) - len(timings), elapsed
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app import search
+from app.models import Meeting, Note, Comment, SearchDocument
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search documents for every meeting, note and comment.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            SearchDocument.objects.all().delete()
+            total = 0
+            for queryset in (
+                Meeting.objects.all(),
+                Note.objects.all(),
+                Comment.objects.select_related('note'),
+            ):
+                batch = []
+                for instance in queryset.iterator(chunk_size=batch_size):
+                    kind, meeting_id, body = search.document_for(instance)
+                    batch.append(SearchDocument(
+                        kind=kind, object_id=instance.pk, meeting_id=meeting_id, body=body
+                    ))
+                    if len(batch) >= batch_size:
+                        total += len(SearchDocument.objects.bulk_create(batch))
+                        batch = []
+                total += len(SearchDocument.objects.bulk_create(batch))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} documents.'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from app import counters
+from app.models import Meeting
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized activity counters on meetings in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        repaired = checked = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Meeting.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            repaired += counters.recount(Meeting.objects.filter(pk__in=batch))
+            checked += len(batch)
+            last_pk = batch[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} meetings, repaired {repaired}.'
+        ))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from app import rendering
+from app.models import Comment, Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-render the stored Markdown HTML of notes and comments that were '
+        'rendered by an older renderer version, in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Re-render every row, not only stale ones',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Note, Comment):
+            queryset = model.objects.all()
+            if not options['all']:
+                queryset = queryset.exclude(content_renderer=rendering.RENDERER_VERSION)
+            rendered = self.rerender(queryset, options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: re-rendered {rendered}')
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def rerender(self, queryset, batch_size):
+        rendered = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')[:batch_size]
+            )
+            if not batch:
+                break
+            for obj in batch:
+                rendering.render_fields(obj)
+            # bulk_update skips save() and its signals: re-rendering isn't
+            # an edit, and pages pick it up through Meeting.cache_key
+            type(batch[0]).objects.bulk_update(batch, ['content_html', 'content_renderer'])
+            rendered += len(batch)
+            last_pk = batch[-1].pk
+        return rendered
@@ -0,0 +1,73 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.seeding import DISTRIBUTIONS, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large, reproducible dataset with bulk inserts for '
+        'benchmarking. Child counts are per-meeting averages.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--meetings', type=int, default=10000)
+        parser.add_argument('--notes', type=int, default=5)
+        parser.add_argument('--comments', type=int, default=3, help='Per note')
+        parser.add_argument('--attendees', type=int, default=8)
+        parser.add_argument('--action-items', type=int, default=3)
+        parser.add_argument('--attachments', type=int, default=1)
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='skewed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default=None,
+            help='Username prefix (default: seed<SEED>)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help="Don't rebuild the search index afterwards",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix'] or f"seed{options['seed']}"
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(
+                f'Users named {prefix}-* already exist; pass a different --prefix or --seed.'
+            )
+        start = time.perf_counter()
+        with transaction.atomic():
+            users, meetings = seed_dataset(
+                users=options['users'],
+                meetings=options['meetings'],
+                notes=options['notes'],
+                comments=options['comments'],
+                attendees=options['attendees'],
+                action_items=options['action_items'],
+                attachments=options['attachments'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                distribution=options['distribution'],
+                prefix=prefix,
+            )
+        self.stdout.write(
+            f'Seeded {len(users)} users, {len(meetings)} meetings, '
+            f'{sum(m.note_count for m in meetings)} notes, '
+            f'{sum(m.comment_count for m in meetings)} comments, '
+            f'{sum(m.attendee_count for m in meetings)} attendees and '
+            f'{sum(m.action_item_count for m in meetings)} action items '
+            f'in {time.perf_counter() - start:.1f}s.'
+        )
+        largest = max(meetings, key=lambda m: m.note_count, default=None)
+        if largest is not None:
+            self.stdout.write(
+                f'Largest meeting: #{largest.pk} with {largest.note_count} notes '
+                f'and {largest.attendee_count} attendees.'
+            )
+        if not options['skip_search_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
@@ -0,0 +1,154 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import instrumentation, routers
+
+logger = logging.getLogger('app.performance')
+
+
+class PerformanceMiddleware:
+    """Measure each request and report it in a ``Server-Timing`` header.
+
+    Records SQL query count and time, template render time and the
+    remaining view time, feeds them into the per-URL-name histograms served
+    at ``/metrics/``, and logs the slowest SQL of requests that take longer
+    than ``PERF_SLOW_REQUEST_MS``. Streaming responses are measured up to
+    the point the response object is returned, not until the stream ends.
+    Place it first in ``MIDDLEWARE`` so the other middleware is included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.slow_request_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', None)
+        self.slow_request_sql = getattr(settings, 'PERF_SLOW_REQUEST_SQL_LIMIT', 10)
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        instrumentation.install_on_open_connections()
+        metrics, token = instrumentation.start_request(capture_sql=bool(self.slow_request_ms))
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.finish_request(token)
+        return self.process(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = instrumentation.start_request(capture_sql=bool(self.slow_request_ms))
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.finish_request(token)
+        return self.process(request, response, metrics)
+
+    def process(self, request, response, metrics):
+        total = metrics.total_time
+        view_time = max(total - metrics.db_time - metrics.render_time, 0.0)
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or 'unmatched'
+        instrumentation.observe(view_name, metrics, total)
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f'render;dur={metrics.render_time * 1000:.1f}',
+                f'view;dur={view_time * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        if self.slow_request_ms and total * 1000 >= self.slow_request_ms:
+            self.log_slow_request(request, view_name, metrics, total)
+        return response
+
+    def log_slow_request(self, request, view_name, metrics, total):
+        statements = '\n'.join(
+            f'  {duration * 1000:8.1f} ms  {sql}  {params!r}'
+            for duration, sql, params in metrics.slowest_statements(self.slow_request_sql)
+        )
+        logger.warning(
+            'Slow request: %s %s (%s) took %.1f ms; %d queries in %.1f ms, '
+            'render %.1f ms. Slowest SQL:\n%s',
+            request.method, request.get_full_path(), view_name, total * 1000,
+            metrics.queries, metrics.db_time * 1000, metrics.render_time * 1000,
+            statements or '  (none)',
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """Serve the reads of read-only views from a replica database.
+
+    GET and HEAD requests to ``routers.READ_ONLY_VIEWS`` read from one of
+    ``DATABASE_REPLICAS`` unless the client carries the pin cookie. Any
+    request that writes sets that cookie for ``REPLICA_PIN_SECONDS``, so the
+    user reads their own writes from the primary until replication has
+    caught up. Place it right after ``PerformanceMiddleware``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = routers.begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.process(request, response, state)
+
+    async def __acall__(self, request):
+        state, token = routers.begin_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.process(request, response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = routers.current()
+        if (
+            state is not None
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.url_name in routers.READ_ONLY_VIEWS
+            and routers.PIN_COOKIE not in request.COOKIES
+        ):
+            state.use_replica()
+
+    def process(self, request, response, state):
+        if state.wrote and routers.replica_aliases():
+            response.set_cookie(
+                routers.PIN_COOKIE, '1',
+                max_age=routers.pin_seconds(),
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        if state.replica and response.streaming and not response.is_async:
+            response.streaming_content = self.stream(response.streaming_content, state)
+        return response
+
+    def stream(self, content, state):
+        """Keep routing the reads made while the response is iterated"""
+        content = iter(content)
+        while True:
+            token = routers.activate(state)
+            try:
+                chunk = next(content)
+            except StopIteration:
+                return
+            finally:
+                routers.end_request(token)
+            yield chunk
@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_comment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(fields=['meeting', '-created_at'], name='actionitem_meeting_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(fields=['assigned_to', 'completed', '-created_at'], name='actionitem_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['meeting', '-created_at'], name='attachment_meeting_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendee',
+            index=models.Index(fields=['user', 'meeting'], name='attendee_user_meeting_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['note', 'created_at'], name='comment_note_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['-date', '-id'], name='meeting_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['created_by', '-date', '-id'], name='meeting_creator_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['meeting', 'created_at'], name='note_meeting_created_idx'),
+        ),
+    ]
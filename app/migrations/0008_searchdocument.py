@@ -0,0 +1,93 @@
+# Generated by Django 4.2 on 2026-10-18 03:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'app_searchdocument_fts'
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX app_searchdocument_body_gin ON app_searchdocument "
+    "USING gin (to_tsvector('english'::regconfig, COALESCE(body, '')))",
+]
+POSTGRES_BACKWARD = ['DROP INDEX IF EXISTS app_searchdocument_body_gin']
+
+# External-content FTS5 table; the triggers keep it in step with every
+# insert, update and delete on app_searchdocument, including cascades.
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "body, content='app_searchdocument', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    f"CREATE TRIGGER app_searchdocument_ai AFTER INSERT ON app_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END",
+    f"CREATE TRIGGER app_searchdocument_ad AFTER DELETE ON app_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); END",
+    f"CREATE TRIGGER app_searchdocument_au AFTER UPDATE ON app_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); "
+    f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS app_searchdocument_ai',
+    'DROP TRIGGER IF EXISTS app_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS app_searchdocument_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {'postgresql': postgres, 'sqlite': sqlite}
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+def backfill(apps, schema_editor):
+    Meeting = apps.get_model('app', 'Meeting')
+    Note = apps.get_model('app', 'Note')
+    Comment = apps.get_model('app', 'Comment')
+    SearchDocument = apps.get_model('app', 'SearchDocument')
+    documents = [
+        SearchDocument(
+            kind='meeting', object_id=m.pk, meeting_id=m.pk,
+            body='\n'.join(filter(None, [m.title, m.description, m.location])),
+        )
+        for m in Meeting.objects.iterator()
+    ]
+    documents += [
+        SearchDocument(kind='note', object_id=n.pk, meeting_id=n.meeting_id, body=n.content)
+        for n in Note.objects.iterator()
+    ]
+    documents += [
+        SearchDocument(kind='comment', object_id=c.pk, meeting_id=c.note.meeting_id, body=c.content)
+        for c in Comment.objects.select_related('note').iterator()
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('meeting', 'Meeting'), ('note', 'Note'), ('comment', 'Comment')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('meeting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='app.meeting')),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
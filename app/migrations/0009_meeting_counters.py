@@ -0,0 +1,63 @@
+# Generated by Django 4.2 on 2026-10-18 03:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Meeting = apps.get_model('app', 'Meeting')
+    Note = apps.get_model('app', 'Note')
+    Comment = apps.get_model('app', 'Comment')
+    Attendee = apps.get_model('app', 'Attendee')
+    ActionItem = apps.get_model('app', 'ActionItem')
+
+    def count(queryset, lookup):
+        subquery = queryset.filter(**{lookup: OuterRef('pk')}).order_by().values(
+            lookup
+        ).annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(subquery), 0)
+
+    Meeting.objects.update(
+        note_count=count(Note.objects.all(), 'meeting'),
+        comment_count=count(Comment.objects.all(), 'note__meeting'),
+        attendee_count=count(Attendee.objects.all(), 'meeting'),
+        action_item_count=count(ActionItem.objects.all(), 'meeting'),
+        open_action_item_count=count(ActionItem.objects.filter(completed=False), 'meeting'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='action_item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='attendee_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='comment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='note_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='open_action_item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
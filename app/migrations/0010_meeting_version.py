@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_meeting_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 03:22
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def copy_updated_at(apps, schema_editor):
+    Meeting = apps.get_model('app', 'Meeting')
+    Meeting.objects.update(modified_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_meeting_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='modified_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+    ]
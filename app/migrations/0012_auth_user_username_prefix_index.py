@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Case-insensitive indexes matching what username__istartswith compiles to:
+# UPPER("username"::text) LIKE UPPER(%s) on PostgreSQL and a plain LIKE
+# (case-insensitive for ASCII) on SQLite.
+POSTGRES_FORWARD = [
+    'CREATE INDEX IF NOT EXISTS app_auth_user_username_upper_like '
+    'ON auth_user (UPPER(username::text) text_pattern_ops)',
+]
+POSTGRES_BACKWARD = ['DROP INDEX IF EXISTS app_auth_user_username_upper_like']
+
+SQLITE_FORWARD = [
+    'CREATE INDEX IF NOT EXISTS app_auth_user_username_nocase '
+    'ON auth_user (username COLLATE NOCASE)',
+]
+SQLITE_BACKWARD = ['DROP INDEX IF EXISTS app_auth_user_username_nocase']
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {'postgresql': postgres, 'sqlite': sqlite}
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('app', '0011_meeting_modified_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-18 04:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0016_calendar_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeetingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('location', models.CharField(blank=True, max_length=200, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('visibility', models.CharField(choices=[('private', 'Private'), ('team', 'Team'), ('public', 'Public Link')], default='private', max_length=20)),
+                ('start', models.DateTimeField()),
+                ('frequency', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly')], max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1)),
+                ('weekdays', models.CharField(blank=True, max_length=20)),
+                ('count', models.PositiveIntegerField(blank=True, null=True)),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('exdates', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'meeting series',
+                'ordering': ['start'],
+            },
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='series_occurrence',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='meetingseries',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meeting_series', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='meetings', to='app.meetingseries'),
+        ),
+        migrations.AddConstraint(
+            model_name='meeting',
+            constraint=models.UniqueConstraint(fields=('series', 'series_occurrence'), name='meeting_series_occurrence_unique'),
+        ),
+    ]
@@ -1,7 +1,45 @@
 from django.db import models
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
 from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
 import uuid
 
+from . import rendering
+
+
+class MeetingQuerySet(models.QuerySet):
+    """QuerySet that expresses the visibility rules as SQL"""
+
+    def visibility_condition(self, user):
+        """Return a Q that matches meetings ``user`` may view.
+
+        Public meetings are visible to everyone, team meetings to any
+        authenticated user, and private meetings to their creator and
+        attendees only.
+        """
+        condition = Q(visibility=Meeting.VISIBILITY_PUBLIC)
+        if user is None or not user.is_authenticated:
+            return condition
+        return (
+            condition
+            | Q(visibility=Meeting.VISIBILITY_TEAM)
+            | Q(created_by=user)
+            | Q(Exists(Attendee.objects.filter(meeting=OuterRef('pk'), user=user)))
+        )
+
+    def visible_to(self, user):
+        """Meetings ``user`` may view, filtered in a single query"""
+        return self.filter(self.visibility_condition(user))
+
+    def with_access(self, user):
+        """Annotate each meeting with ``can_view`` for ``user``"""
+        return self.annotate(can_view=Case(
+            When(self.visibility_condition(user), then=Value(True)),
+            default=Value(False),
+            output_field=models.BooleanField(),
+        ))
+
 
 class Meeting(models.Model):
     """Meeting model"""
@@ -31,6 +69,16 @@ class Meeting(models.Model):
     ]
     visibility = models.CharField(max_length=20, choices=VISIBILITY_CHOICES, default=VISIBILITY_PRIVATE)
     public_token = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    # Set on meetings materialized from an occurrence of a MeetingSeries;
+    # series_occurrence is the occurrence's scheduled start
+    series = models.ForeignKey(
+        'MeetingSeries',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='meetings'
+    )
+    series_occurrence = models.DateTimeField(null=True, blank=True)
 
     def ensure_public_token(self):
         if not self.public_token:
@@ -39,19 +87,156 @@ class Meeting(models.Model):
 
     def revoke_public_token(self):
         # rotate the token to immediately invalidate prior links
+        from .caching import purge_public_page
+        old_token = self.public_token
         self.public_token = uuid.uuid4().hex
         self.save(update_fields=['public_token'])
+        purge_public_page(self.pk, old_token)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized activity counters, maintained by app.counters
+    note_count = models.IntegerField(default=0, editable=False)
+    comment_count = models.IntegerField(default=0, editable=False)
+    attendee_count = models.IntegerField(default=0, editable=False)
+    action_item_count = models.IntegerField(default=0, editable=False)
+    open_action_item_count = models.IntegerField(default=0, editable=False)
+    # Bumped whenever the meeting or any of its children change
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Bumped when the meeting or its attendees change (see app.ics)
+    calendar_version = models.PositiveIntegerField(default=1, editable=False)
+    modified_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = MeetingQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # meeting_list and keyset pagination on (-date, -pk)
+            models.Index(fields=['-date', '-id'], name='meeting_date_idx'),
+            # dashboard "your meetings"
+            models.Index(
+                fields=['created_by', '-date', '-id'],
+                name='meeting_creator_date_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['series', 'series_occurrence'],
+                name='meeting_series_occurrence_unique',
+            ),
+        ]
+
+    # Stored meetings list alongside app.recurrence.Occurrence
+    is_virtual = False
+
+    def __str__(self):
+        return self.title
+
+    def get_absolute_url(self):
+        return reverse('meeting_detail', args=[self.pk])
+
+    # Only ever changed by app.caching.touch, so a full save of a loaded
+    # instance must not write back what it read. A stale version would
+    # name new content with a cache key that was already used.
+    DERIVED_FIELDS = frozenset([
+        'note_count', 'comment_count', 'attendee_count',
+        'action_item_count', 'open_action_item_count',
+        'version', 'calendar_version', 'modified_at',
+    ])
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def cache_key(self):
+        """Identify the current state of the meeting and its children.
+
+        ``created_at`` guards against primary keys being reused after a
+        database restore, and the renderer version retires pages holding
+        notes rendered by an older ``app.rendering``.
+        """
+        return (
+            f'{self.pk}.{self.version}.{self.created_at.timestamp():.6f}'
+            f'.{rendering.RENDERER_VERSION}'
+        )
+
+
+class MeetingSeriesQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Series ``user`` may view: team and public ones and their own"""
+        condition = Q(visibility=Meeting.VISIBILITY_PUBLIC)
+        if user is not None and user.is_authenticated:
+            condition |= Q(visibility=Meeting.VISIBILITY_TEAM) | Q(created_by=user)
+        return self.filter(condition)
+
+
+class MeetingSeries(models.Model):
+    """A recurring meeting, expanded into occurrences by app.recurrence"""
+    FREQUENCY_DAILY = 'DAILY'
+    FREQUENCY_WEEKLY = 'WEEKLY'
+    FREQUENCY_MONTHLY = 'MONTHLY'
+    FREQUENCY_CHOICES = [
+        (FREQUENCY_DAILY, 'Daily'),
+        (FREQUENCY_WEEKLY, 'Weekly'),
+        (FREQUENCY_MONTHLY, 'Monthly'),
+    ]
+    title = models.CharField(max_length=200)
+    location = models.CharField(max_length=200, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    visibility = models.CharField(
+        max_length=20, choices=Meeting.VISIBILITY_CHOICES, default=Meeting.VISIBILITY_PRIVATE
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='meeting_series'
+    )
+    # First occurrence; later ones keep its wall-clock time in TIME_ZONE
+    start = models.DateTimeField()
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1)
+    # Comma-separated RRULE BYDAY codes for weekly series, e.g. "MO,TH"
+    weekdays = models.CharField(max_length=20, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True)
+    until = models.DateTimeField(null=True, blank=True)
+    # ISO datetimes of cancelled occurrences
+    exdates = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MeetingSeriesQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['start']
+        verbose_name_plural = 'meeting series'
 
     def __str__(self):
         return self.title
 
 
-class Note(models.Model):
+class RenderedContent(models.Model):
+    """Markdown ``content`` stored with its HTML, rendered on save"""
+    content_html = models.TextField(blank=True, default='', editable=False)
+    content_renderer = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        rendering.render_fields(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_html', 'content_renderer'}
+        super().save(*args, **kwargs)
+
+
+class Note(RenderedContent):
     """Note model for meeting notes"""
     meeting = models.ForeignKey(
         Meeting,
@@ -69,11 +254,45 @@ class Note(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['meeting', 'created_at'], name='note_meeting_created_idx'),
+        ]
 
     def __str__(self):
         return f"Note for {self.meeting.title}"
 
 
+class NoteRevision(models.Model):
+    """One saved version of a note's content.
+
+    ``data`` holds either the full text (``is_snapshot``) or a delta against
+    the previous revision of the note; see ``app.revisions``.
+    """
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions'
+    )
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    data = models.TextField()
+    edited_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='note_revisions'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['number']
+        unique_together = ['note', 'number']
+
+    def __str__(self):
+        return f"Revision {self.number} of note {self.note_id}"
+
+
 class Attendee(models.Model):
     """Attendee model for tracking meeting participants"""
     meeting = models.ForeignKey(
@@ -101,6 +320,10 @@ class Attendee(models.Model):
     class Meta:
         unique_together = ['meeting', 'user']
         ordering = ['user__username']
+        indexes = [
+            # dashboard "attending" join and per-user attendee checks
+            models.Index(fields=['user', 'meeting'], name='attendee_user_meeting_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.meeting.title}"
@@ -125,15 +348,46 @@ class ActionItem(models.Model):
     completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so the counters can detect toggles
+        instance._loaded_completed = instance.__dict__.get('completed')
+        return instance
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['meeting', '-created_at'], name='actionitem_meeting_idx'),
+            # per-user open/done task lists
+            models.Index(
+                fields=['assigned_to', 'completed', '-created_at'],
+                name='actionitem_assignee_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} ({'Done' if self.completed else 'Open'})"
 
 
+class Blob(models.Model):
+    """Uploaded file content, stored once per distinct SHA-256 digest.
+
+    The bytes live in ``STORAGES['attachments']`` under a name derived from
+    the digest (see ``app.blobs``), so any number of attachments can share
+    one stored file.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100, default='application/octet-stream')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
 class Attachment(models.Model):
-    """Attachment linked to a meeting. Using a URL field for simplicity."""
+    """Attachment linked to a meeting: an uploaded file or a link"""
     meeting = models.ForeignKey(
         Meeting,
         on_delete=models.CASCADE,
@@ -141,6 +395,13 @@ class Attachment(models.Model):
     )
     name = models.CharField(max_length=255)
     file_url = models.URLField(blank=True, null=True)
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='attachments'
+    )
     uploaded_by = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -152,12 +413,15 @@ class Attachment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['meeting', '-created_at'], name='attachment_meeting_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Comment(models.Model):
+class Comment(RenderedContent):
     """Comment on a Note"""
     note = models.ForeignKey(
         'Note',
@@ -175,6 +439,64 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['note', 'created_at'], name='comment_note_created_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.created_by.username} on {self.note}"
+
+
+class SearchDocument(models.Model):
+    """Searchable text of a meeting, note or comment.
+
+    The full-text index over ``body`` lives outside the ORM: a GIN index on
+    ``to_tsvector(body)`` on PostgreSQL and an FTS5 table kept in sync by
+    triggers on SQLite (see migration 0008 and ``app.search``).
+    """
+    KIND_MEETING = 'meeting'
+    KIND_NOTE = 'note'
+    KIND_COMMENT = 'comment'
+    KIND_CHOICES = [
+        (KIND_MEETING, 'Meeting'),
+        (KIND_NOTE, 'Note'),
+        (KIND_COMMENT, 'Comment'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    meeting = models.ForeignKey(
+        Meeting,
+        on_delete=models.CASCADE,
+        related_name='search_documents'
+    )
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id}"
+
+
+def new_calendar_token():
+    return uuid.uuid4().hex
+
+
+class CalendarToken(models.Model):
+    """Secret token in the URL of a user's calendar feed"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_token'
+    )
+    token = models.CharField(max_length=64, unique=True, default=new_calendar_token)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def rotate(self):
+        """Replace the token, which invalidates the old feed URL"""
+        self.token = new_calendar_token()
+        self.save(update_fields=['token'])
+
+    def __str__(self):
+        return f"Calendar feed of {self.user.username}"
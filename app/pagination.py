@@ -0,0 +1,177 @@
+"""Keyset (cursor) pagination.
+
+Unlike offset pagination, every page is fetched with a ``WHERE`` clause that
+seeks past the last row of the previous page, so deep pages cost the same as
+the first one as long as the ordering is backed by an index.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor cannot be decoded for the paginator's ordering"""
+
+
+class KeysetPage:
+    """A single page of results with opaque cursors to its neighbours"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking on its ordering columns.
+
+    ``ordering`` defaults to the model's ``Meta.ordering`` with the primary
+    key appended as a tie-breaker, e.g. ``['-date', '-pk']`` for meetings.
+    Every ordering field must be non-nullable.
+    """
+
+    def __init__(self, queryset, per_page=20, ordering=None):
+        if ordering is None:
+            ordering = list(queryset.model._meta.ordering)
+            if not any(f.lstrip('-') in ('pk', 'id') for f in ordering):
+                descending = bool(ordering) and ordering[-1].startswith('-')
+                ordering.append('-pk' if descending else 'pk')
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.fields = [
+            (lookup.lstrip('-'), lookup.startswith('-'))
+            for lookup in self.ordering
+        ]
+
+    def cursor_after(self, obj):
+        """Cursor of the page that follows ``obj``"""
+        return self._encode(obj, False)
+
+    def get_page(self, cursor=None):
+        """Return the page for ``cursor``, falling back to the first page"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor=None):
+        """Return the page that starts after (or ends before) ``cursor``"""
+        if not cursor:
+            return self._forward(None)
+        values, backwards = self._decode(cursor)
+        if backwards:
+            return self._backward(values)
+        return self._forward(values)
+
+    def _forward(self, values):
+        queryset = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse=False))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(rows[-1], False) if has_more else None,
+            previous_cursor=(
+                self._encode(rows[0], True) if values is not None and rows else None
+            ),
+        )
+
+    def _backward(self, values):
+        reversed_ordering = [
+            lookup[1:] if lookup.startswith('-') else '-' + lookup
+            for lookup in self.ordering
+        ]
+        queryset = self.queryset.order_by(*reversed_ordering)
+        queryset = queryset.filter(self._seek(values, reverse=True))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(rows[-1], False) if rows else None,
+            previous_cursor=self._encode(rows[0], True) if has_more else None,
+        )
+
+    def _seek(self, values, reverse):
+        """Build ``(a, b) > (x, y)``-style row comparison as a Q object"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            operator = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{operator}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _resolve_field(self, lookup):
+        model = self.queryset.model
+        parts = lookup.split('__')
+        for part in parts[:-1]:
+            model = model._meta.get_field(part).related_model
+        if parts[-1] == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(parts[-1])
+
+    def _value(self, obj, lookup):
+        for part in lookup.split('__'):
+            obj = getattr(obj, part)
+        return obj
+
+    def _encode(self, obj, backwards):
+        values = []
+        for name, _ in self.fields:
+            field = self._resolve_field(name)
+            values.append(field.value_to_string(_Holder(field, self._value(obj, name))))
+        payload = json.dumps({'v': values, 'b': backwards}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            raw_values = payload['v']
+            backwards = bool(payload['b'])
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+        if not isinstance(raw_values, list) or len(raw_values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        values = []
+        for (name, _), raw in zip(self.fields, raw_values):
+            try:
+                field = self._resolve_field(name)
+                values.append(field.to_python(raw))
+            except (FieldDoesNotExist, ValidationError, TypeError):
+                raise InvalidCursor(cursor)
+        return values, backwards
+
+
+class _Holder:
+    """Minimal stand-in so ``Field.value_to_string`` can read a plain value"""
+
+    def __init__(self, field, value):
+        setattr(self, field.attname, value)
@@ -0,0 +1,25 @@
+"""Per-request memoized access checks built on ``Meeting.objects.visible_to``."""
+from .models import Meeting
+
+
+def _access_cache(request):
+    return request.__dict__.setdefault('_meeting_access', {})
+
+
+def remember_meeting_access(request, meeting):
+    """Record the ``can_view`` annotation of an already loaded meeting"""
+    _access_cache(request)[meeting.pk] = meeting.can_view
+
+
+def can_view_meeting(request, meeting_id):
+    """Return whether the requesting user may view the meeting.
+
+    The answer is computed with one ``EXISTS`` query the first time it is
+    asked for a meeting and reused for the rest of the request.
+    """
+    cache = _access_cache(request)
+    if meeting_id not in cache:
+        cache[meeting_id] = (
+            Meeting.objects.visible_to(request.user).filter(pk=meeting_id).exists()
+        )
+    return cache[meeting_id]
@@ -0,0 +1,374 @@
+"""Recurring meetings: lazy expansion of ``MeetingSeries`` rules.
+
+A series stores an RRULE-style rule (daily, weekly on some weekdays or
+monthly, every ``interval`` periods, optionally ending after ``count``
+occurrences or at ``until``). Occurrences are never stored up front:
+``occurrences`` computes them for a date window, skipping straight to the
+window for open-ended rules. An occurrence becomes a ``Meeting`` row only
+when ``materialize`` is called, i.e. when someone opens it to write notes;
+from then on the stored meeting is listed instead of the virtual one.
+Cancelled occurrences are kept in ``MeetingSeries.exdates``.
+
+``OccurrencePaginator`` keyset-paginates stored meetings merged with the
+virtual occurrences of a set of series, expanding only the window a page
+covers and nothing beyond ``horizon()``.
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Meeting, MeetingSeries
+from .pagination import InvalidCursor, KeysetPage
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+STAMP_FORMAT = '%Y%m%dT%H%M%SZ'
+
+# Sort keys put stored meetings before virtual occurrences at the same time
+MEETING, OCCURRENCE = 1, 0
+
+
+def horizon():
+    """Latest date up to which virtual occurrences are listed"""
+    days = getattr(settings, 'RECURRENCE_HORIZON_DAYS', 90)
+    return timezone.now() + timedelta(days=days)
+
+
+def weekday_numbers(series):
+    """Weekdays (Monday is 0) of a weekly series, defaulting to its start's"""
+    codes = [code for code in series.weekdays.split(',') if code]
+    if not codes:
+        return [timezone.localtime(series.start).weekday()]
+    return sorted(WEEKDAYS.index(code) for code in codes)
+
+
+def _period_start(series, first, period):
+    """Local start of period number ``period``, counted from ``first``"""
+    step = period * series.interval
+    if series.frequency == MeetingSeries.FREQUENCY_DAILY:
+        return first + timedelta(days=step)
+    if series.frequency == MeetingSeries.FREQUENCY_WEEKLY:
+        return first - timedelta(days=first.weekday()) + timedelta(weeks=step)
+    month = first.month - 1 + step
+    return first.replace(year=first.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def _period_candidates(series, first, period):
+    """Local occurrence times within period number ``period``"""
+    start = _period_start(series, first, period)
+    if series.frequency == MeetingSeries.FREQUENCY_DAILY:
+        return [start]
+    if series.frequency == MeetingSeries.FREQUENCY_WEEKLY:
+        days = (start + timedelta(days=day) for day in weekday_numbers(series))
+        return [day for day in days if day >= first]
+    try:
+        return [start.replace(day=first.day)]
+    except ValueError:
+        # Like RRULE, months without the day are skipped, not clamped
+        return []
+
+
+def _first_period(series, first, start):
+    """A period number at or just before the one containing ``start``"""
+    if series.frequency == MeetingSeries.FREQUENCY_MONTHLY:
+        elapsed = (start.year - first.year) * 12 + start.month - first.month
+    else:
+        elapsed = (start.date() - first.date()).days
+        if series.frequency == MeetingSeries.FREQUENCY_WEEKLY:
+            elapsed = (elapsed + first.weekday()) // 7
+    return max(elapsed // series.interval - 1, 0)
+
+
+def occurrences(series, start=None, end=None):
+    """Yield the scheduled starts of ``series`` in ``[start, end)``, ascending.
+
+    Occurrences keep the wall-clock time of ``series.start`` in the default
+    time zone across DST changes. Rules limited by ``count`` are walked
+    from their first occurrence; open-ended ones jump to ``start``.
+    """
+    tz = timezone.get_default_timezone()
+    # Whole seconds, so every occurrence can be named by its stamp
+    first = timezone.localtime(series.start, tz).replace(tzinfo=None, microsecond=0)
+    if series.count or start is None:
+        period = 0
+    else:
+        period = _first_period(series, first, timezone.localtime(start, tz).replace(tzinfo=None))
+    seen = 0
+    while True:
+        period_start = timezone.make_aware(_period_start(series, first, period), tz)
+        if end is not None and period_start >= end:
+            return
+        if series.until is not None and period_start > series.until:
+            return
+        for candidate in _period_candidates(series, first, period):
+            occurrence = timezone.make_aware(candidate, tz)
+            seen += 1
+            if series.count and seen > series.count:
+                return
+            if series.until is not None and occurrence > series.until:
+                return
+            if end is not None and occurrence >= end:
+                return
+            if start is None or occurrence >= start:
+                yield occurrence
+        period += 1
+
+
+def exdate(moment):
+    """How a cancelled occurrence is recorded in ``MeetingSeries.exdates``"""
+    return moment.astimezone(dt_timezone.utc).isoformat()
+
+
+def is_occurrence(series, moment):
+    """Whether ``moment`` is a scheduled, not cancelled, start of ``series``"""
+    if exdate(moment) in series.exdates:
+        return False
+    return next(occurrences(series, moment, moment + timedelta(microseconds=1)), None) == moment
+
+
+def format_stamp(moment):
+    return moment.astimezone(dt_timezone.utc).strftime(STAMP_FORMAT)
+
+
+def parse_stamp(stamp):
+    """Parse an occurrence stamp from a URL; raises ``ValueError``"""
+    return datetime.strptime(stamp, STAMP_FORMAT).replace(tzinfo=dt_timezone.utc)
+
+
+class Occurrence:
+    """An occurrence of a series that has no ``Meeting`` row yet.
+
+    Has the attributes the meeting list templates read, so both kinds can
+    be listed together.
+    """
+    is_virtual = True
+    note_count = comment_count = attendee_count = 0
+    action_item_count = open_action_item_count = 0
+
+    def __init__(self, series, date):
+        self.series = series
+        self.series_id = series.pk
+        self.date = date
+        self.title = series.title
+        self.location = series.location
+        self.description = series.description
+        self.visibility = series.visibility
+        self.created_by = series.created_by
+        self.created_by_id = series.created_by_id
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Occurrence)
+            and (self.series_id, self.date) == (other.series_id, other.date)
+        )
+
+    def __hash__(self):
+        return hash((self.series_id, self.date))
+
+    def __repr__(self):
+        return f'<Occurrence of series {self.series_id} at {self.date.isoformat()}>'
+
+    @property
+    def stamp(self):
+        return format_stamp(self.date)
+
+    def get_absolute_url(self):
+        return reverse('occurrence_detail', args=[self.series_id, self.stamp])
+
+
+def materialize(series, moment):
+    """Return the meeting for occurrence ``moment`` of ``series``, creating it.
+
+    The meeting copies the series' fields, belongs to the series' owner and
+    from then on replaces the virtual occurrence everywhere.
+    """
+    meeting = Meeting.objects.filter(series=series, series_occurrence=moment).first()
+    if meeting is not None:
+        return meeting
+    try:
+        with transaction.atomic():
+            return Meeting.objects.create(
+                series=series,
+                series_occurrence=moment,
+                title=series.title,
+                date=moment,
+                location=series.location,
+                description=series.description,
+                visibility=series.visibility,
+                created_by=series.created_by,
+            )
+    except IntegrityError:
+        # Materialized concurrently by another request
+        return Meeting.objects.get(series=series, series_occurrence=moment)
+
+
+def cancel(series, moment):
+    """Drop occurrence ``moment`` from ``series``"""
+    with transaction.atomic():
+        series = MeetingSeries.objects.select_for_update().get(pk=series.pk)
+        if exdate(moment) not in series.exdates:
+            series.exdates = sorted([*series.exdates, exdate(moment)])
+            series.save(update_fields=['exdates', 'updated_at'])
+    return series
+
+
+def _sort_key(item):
+    if item.is_virtual:
+        return item.date, OCCURRENCE, item.series_id
+    return item.date, MEETING, item.pk
+
+
+class OccurrencePaginator:
+    """Keyset pages over ``meetings`` merged with the virtual occurrences of
+    ``series``, newest first.
+
+    Items are ordered on ``(date, kind, id)``: stored meetings (by pk) sort
+    before virtual occurrences (by series pk) at the same time. A page costs
+    the same meeting query as ``KeysetPaginator`` plus one query for the
+    series and, if there are any, usually one for the occurrences already
+    materialized within the expanded window.
+    """
+
+    def __init__(self, meetings, series, per_page=20):
+        self.meetings = meetings
+        self.series = series
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        """Return the page for ``cursor``, falling back to the first page"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor=None):
+        key, backwards = self._decode(cursor) if cursor else (None, False)
+        rows = self._rows(key, descending=not backwards)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return KeysetPage(
+                rows,
+                next_cursor=self._encode(rows[-1], False) if rows else None,
+                previous_cursor=self._encode(rows[0], True) if has_more else None,
+            )
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(rows[-1], False) if has_more else None,
+            previous_cursor=self._encode(rows[0], True) if key is not None and rows else None,
+        )
+
+    def _rows(self, key, descending):
+        """Up to ``per_page + 1`` items after ``key`` in the given direction"""
+        limit = self.per_page + 1
+        order = ['-date', '-pk'] if descending else ['date', 'pk']
+        meetings = self.meetings.order_by(*order)
+        if key is not None:
+            meetings = meetings.filter(self._seek(key, descending))
+        meetings = list(meetings[:limit])
+        # Occurrences past the last meeting that fits can't make the page
+        bound = meetings[-1].date if len(meetings) == limit else None
+        virtual = self._virtual(key, descending, bound, limit)
+        return sorted(meetings + virtual, key=_sort_key, reverse=descending)[:limit]
+
+    @staticmethod
+    def _seek(key, descending):
+        date, kind, pk = key
+        operator = 'lt' if descending else 'gt'
+        if kind == MEETING:
+            return Q(**{f'date__{operator}': date}) | Q(date=date, **{f'pk__{operator}': pk})
+        # Meetings at the cursor's time sort before its occurrence
+        return Q(date__lt=date) if descending else Q(date__gte=date)
+
+    def _virtual(self, key, descending, bound, limit):
+        """Virtual occurrences after ``key`` up to ``bound``, at most ``limit``"""
+        series = list(self.series)
+        if not series:
+            return []
+        latest = horizon()
+        earliest = min(item.start for item in series)
+        if descending:
+            outer = key[0] if key is not None else latest
+            outer = min(outer, latest)
+            inner = max(bound, earliest) if bound is not None else earliest
+        else:
+            outer = key[0] if key is not None else earliest
+            inner = min(bound, latest) if bound is not None else latest
+        if (inner > outer) if descending else (inner < outer):
+            return []
+
+        # Expand a growing window from ``outer`` towards ``inner``
+        found = []
+        span = timedelta(days=31)
+        tick = timedelta(microseconds=1)
+        edge = outer + tick if descending else outer
+        while True:
+            if descending:
+                start, end = max(edge - span, inner), edge
+                edge, done = start, start <= inner
+            else:
+                start, end = edge, min(edge + span, inner + tick)
+                edge, done = end, end >= inner + tick
+            found.extend(
+                item for item in self._expand(series, start, end)
+                if key is None or self._after(item, key, descending)
+            )
+            if len(found) >= limit or done:
+                found = self._unmaterialized(series, found)
+                if len(found) >= limit or done:
+                    break
+            span *= 2
+        found.sort(key=_sort_key, reverse=descending)
+        return found[:limit]
+
+    @staticmethod
+    def _after(item, key, descending):
+        return _sort_key(item) < key if descending else _sort_key(item) > key
+
+    @staticmethod
+    def _expand(series, start, end):
+        """Scheduled, not cancelled occurrences of ``series`` in ``[start, end)``"""
+        found = []
+        for item in series:
+            cancelled = set(item.exdates)
+            found.extend(
+                Occurrence(item, moment) for moment in occurrences(item, start, end)
+                if exdate(moment) not in cancelled
+            )
+        return found
+
+    @staticmethod
+    def _unmaterialized(series, found):
+        """Drop the occurrences stored as meetings, with one query"""
+        if not found:
+            return found
+        dates = [item.date for item in found]
+        materialized = set(Meeting.objects.filter(
+            series__in=series, series_occurrence__range=(min(dates), max(dates))
+        ).values_list('series_id', 'series_occurrence'))
+        return [item for item in found if (item.series_id, item.date) not in materialized]
+
+    def _encode(self, item, backwards):
+        date, kind, pk = _sort_key(item)
+        payload = json.dumps(
+            {'v': [date.isoformat(), kind, pk], 'b': backwards}, separators=(',', ':')
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            date, kind, pk = payload['v']
+            date = datetime.fromisoformat(date)
+            if timezone.is_naive(date) or kind not in (MEETING, OCCURRENCE):
+                raise ValueError(cursor)
+            return (date, kind, int(pk)), bool(payload['b'])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise InvalidCursor(cursor)
@@ -0,0 +1,205 @@
+"""Markdown rendering for notes and comments.
+
+Content is rendered once when it is saved and stored as ``content_html``
+together with the ``RENDERER_VERSION`` that produced it, so page views
+never parse Markdown. Bump ``RENDERER_VERSION`` whenever ``render`` changes
+its output: stale rows are then re-rendered for the page that shows them,
+written back in a background thread, and can be backfilled in bulk with
+``manage.py rerender_content``.
+
+The renderer escapes all input before adding its own markup, so user
+content can't inject HTML; links are only kept for http(s), mailto and
+relative URLs. Supported syntax: paragraphs with hard line breaks,
+``#`` headings, ``-``/``1.`` lists, ``>`` quotes, fenced and inline code,
+``**strong**``, ``*em*``, ``~~strike~~``, ``[links](url)`` and ``---`` rules.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+from django.utils.html import escape
+
+RENDERER_VERSION = 3
+# Deeper ``>`` prefixes are rendered as text, which bounds the recursion
+MAX_QUOTE_DEPTH = 10
+
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*)$')
+_RULE_RE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_QUOTE_RE = re.compile(r'^\s*>\s?(.*)$')
+_BULLET_RE = re.compile(r'^\s*[-*+]\s+(.*)$')
+_NUMBER_RE = re.compile(r'^\s*\d{1,9}[.)]\s+(.*)$')
+
+_CODE_RE = re.compile(r'`([^`]+)`')
+_LINK_RE = re.compile(r'\[([^\[\]]+)\]\(([^()\s]+)\)')
+_SAFE_URL_RE = re.compile(r'^(https?://|mailto:|/|#)', re.IGNORECASE)
+# Spans can't contain their own delimiter, so a failed match gives up at
+# the next delimiter instead of backtracking over the rest of the line
+_INLINE = [
+    (re.compile(r'\*\*([^*]+)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'(?<!\w)__([^_]+)__(?!\w)'), r'<strong>\1</strong>'),
+    (re.compile(r'\*([^*]+)\*'), r'<em>\1</em>'),
+    (re.compile(r'(?<!\w)_([^_]+)_(?!\w)'), r'<em>\1</em>'),
+    (re.compile(r'~~([^~]+)~~'), r'<del>\1</del>'),
+]
+# Marks spans of finished HTML while the rest of a line is formatted
+_PLACEHOLDER_RE = re.compile('\x00(\\d+)\x00')
+
+
+def _inline(text):
+    """Format one block's text, escaping everything that isn't markup"""
+    spans = []
+
+    def hold(html):
+        spans.append(html)
+        return f'\x00{len(spans) - 1}\x00'
+
+    def code(match):
+        return hold(f'<code>{escape(match.group(1))}</code>')
+
+    def link(match):
+        label, url = match.groups()
+        if not _SAFE_URL_RE.match(url):
+            return _format(label)
+        return hold(f'<a href="{escape(url)}" rel="nofollow noopener">{_format(label)}</a>')
+
+    text = _CODE_RE.sub(code, text)
+    text = _LINK_RE.sub(link, text)
+    text = _format(text)
+    while _PLACEHOLDER_RE.search(text):
+        text = _PLACEHOLDER_RE.sub(lambda match: spans[int(match.group(1))], text)
+    return text
+
+
+def _format(text):
+    text = escape(text)
+    for pattern, replacement in _INLINE:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _paragraph(lines):
+    return '<p>' + '<br>\n'.join(_inline(line.strip()) for line in lines) + '</p>'
+
+
+def _list(tag, items):
+    body = ''.join(
+        '<li>' + '<br>\n'.join(_inline(line.strip()) for line in item) + '</li>'
+        for item in items
+    )
+    return f'<{tag}>{body}</{tag}>'
+
+
+def render(text, depth=0):
+    """Render Markdown ``text`` to HTML that is safe to include in a page.
+
+    ``depth`` is the number of quotes ``text`` is nested in.
+    """
+    lines = text.replace('\x00', '').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    blocks = []
+    paragraph = []
+    items, list_tag = [], None
+
+    def flush():
+        nonlocal items, list_tag
+        if paragraph:
+            blocks.append(_paragraph(paragraph))
+            paragraph.clear()
+        if items:
+            blocks.append(_list(list_tag, items))
+            items, list_tag = [], None
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        fence = _FENCE_RE.match(line)
+        if fence:
+            flush()
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                code.append(lines[i])
+                i += 1
+            blocks.append('<pre><code>' + escape('\n'.join(code)) + '</code></pre>')
+            i += 1
+            continue
+        if not line.strip():
+            flush()
+        elif depth < MAX_QUOTE_DEPTH and _QUOTE_RE.match(line):
+            flush()
+            quoted = []
+            while i < len(lines) and _QUOTE_RE.match(lines[i]):
+                quoted.append(_QUOTE_RE.match(lines[i]).group(1))
+                i += 1
+            blocks.append('<blockquote>' + render('\n'.join(quoted), depth + 1) + '</blockquote>')
+            continue
+        elif _HEADING_RE.match(line):
+            flush()
+            hashes, title = _HEADING_RE.match(line).groups()
+            # Closing hashes are optional; stripped here rather than by the
+            # pattern, where they would backtrack over trailing whitespace
+            title = title.rstrip().rstrip('#').rstrip()
+            blocks.append(f'<h{len(hashes)}>{_inline(title)}</h{len(hashes)}>')
+        elif _RULE_RE.match(line):
+            flush()
+            blocks.append('<hr>')
+        elif _BULLET_RE.match(line) or _NUMBER_RE.match(line):
+            bullet = _BULLET_RE.match(line)
+            tag = 'ul' if bullet else 'ol'
+            if paragraph or list_tag != tag:
+                flush()
+            list_tag = tag
+            items.append([(bullet or _NUMBER_RE.match(line)).group(1)])
+        elif items:
+            # A continuation line of the last list item
+            items[-1].append(line)
+        else:
+            paragraph.append(line)
+        i += 1
+    flush()
+    return '\n'.join(blocks)
+
+
+def render_fields(obj):
+    """Set ``content_html`` and ``content_renderer`` from ``obj.content``"""
+    obj.content_html = render(obj.content)
+    obj.content_renderer = RENDERER_VERSION
+
+
+def is_stale(obj):
+    return obj.content_renderer != RENDERER_VERSION
+
+
+_executor = None
+
+
+def _run_in_background(function, *args):
+    try:
+        function(*args)
+    finally:
+        # Worker threads have their own connections; don't leave them open
+        connections.close_all()
+
+
+def _submit(function, *args):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rerender')
+    _executor.submit(_run_in_background, function, *args)
+
+
+def _save_rendered(model, pk, source, html):
+    # Skipped if the content was edited (and so re-rendered) meanwhile
+    model.objects.filter(pk=pk, content=source).exclude(
+        content_renderer=RENDERER_VERSION
+    ).update(content_html=html, content_renderer=RENDERER_VERSION)
+
+
+def current_html(obj):
+    """Return the HTML of a note or comment, re-rendering it if it was
+    saved by an older renderer and saving the result in the background"""
+    if is_stale(obj):
+        render_fields(obj)
+        args = (type(obj), obj.pk, obj.content, obj.content_html)
+        transaction.on_commit(lambda: _submit(_save_rendered, *args))
+    return obj.content_html
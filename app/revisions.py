@@ -0,0 +1,163 @@
+"""Note revision history stored as periodic snapshots plus line deltas.
+
+Every ``SNAPSHOT_INTERVAL``-th revision of a note stores its full text;
+the ones in between store a delta against the previous revision, which
+for typical edits is a small fraction of the text. Reconstructing any
+revision reads one snapshot and at most ``SNAPSHOT_INTERVAL - 1`` deltas,
+in a single query. ``compact`` thins out old revisions of frequently
+edited notes and re-chains the ones it keeps.
+"""
+import difflib
+import json
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Max, Subquery
+
+from .models import Note, NoteRevision
+
+SNAPSHOT_INTERVAL = 10
+
+
+def make_delta(old, new):
+    """Encode ``new`` as line ranges copied from ``old`` plus inserted text"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return json.dumps(ops, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(
+        ''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in json.loads(delta)
+    )
+
+
+def _rebuild(revisions):
+    """Text of the last of ``revisions``, which must start with a snapshot"""
+    text = None
+    for revision in revisions:
+        text = revision.data if revision.is_snapshot else apply_delta(text, revision.data)
+    return text
+
+
+def _chain(note_id, number):
+    """The revisions needed to rebuild revision ``number``, in one query"""
+    last_snapshot = NoteRevision.objects.filter(
+        note_id=note_id, number__lte=number, is_snapshot=True
+    ).values('note_id').annotate(latest=Max('number')).values('latest')
+    return NoteRevision.objects.filter(
+        note_id=note_id, number__lte=number, number__gte=Subquery(last_snapshot)
+    ).order_by('number')
+
+
+def text_at(note, number):
+    """Return the content of revision ``number`` of ``note``"""
+    revisions = list(_chain(note.pk, number))
+    if not revisions or revisions[-1].number != number:
+        raise NoteRevision.DoesNotExist(f'Note {note.pk} has no revision {number}')
+    return _rebuild(revisions)
+
+
+def _revision(note, number, text, previous, since_snapshot, **fields):
+    """Build the revision ``number`` of ``note``, as a delta if worthwhile"""
+    if previous is not None and since_snapshot < SNAPSHOT_INTERVAL - 1:
+        delta = make_delta(previous, text)
+        if len(delta) < len(text):
+            return NoteRevision(note=note, number=number, data=delta, **fields)
+    return NoteRevision(note=note, number=number, data=text, is_snapshot=True, **fields)
+
+
+def record(note, user, previous=None):
+    """Add the current content of ``note`` as its newest revision.
+
+    ``previous`` is the content before the edit; it becomes revision 1,
+    credited to the note's author, when the note has no history yet.
+    """
+    with transaction.atomic():
+        # Serializes concurrent edits of the same note
+        Note.objects.select_for_update().values('pk').get(pk=note.pk)
+        recent = list(note.revisions.order_by('-number')[:SNAPSHOT_INTERVAL])
+        if not recent and previous is not None and previous != note.content:
+            recent = [NoteRevision.objects.create(
+                note=note, number=1, data=previous, is_snapshot=True,
+                edited_by_id=note.created_by_id, created_at=note.created_at,
+            )]
+        if not recent:
+            return NoteRevision.objects.create(
+                note=note, number=1, data=note.content, is_snapshot=True, edited_by=user
+            )
+        since_snapshot = next(
+            (i for i, revision in enumerate(recent) if revision.is_snapshot), None
+        )
+        if since_snapshot is None:
+            # Compaction leaves snapshots at most SNAPSHOT_INTERVAL apart,
+            # but don't rely on it for correctness
+            recent = list(_chain(note.pk, recent[0].number).reverse())
+            since_snapshot = len(recent) - 1
+        latest = _rebuild(reversed(recent[:since_snapshot + 1]))
+        if latest == note.content:
+            return recent[0]
+        revision = _revision(
+            note, recent[0].number + 1, note.content, latest, since_snapshot, edited_by=user
+        )
+        revision.save()
+        return revision
+
+
+def diff(old, new, old_label, new_label):
+    """Unified diff lines between two texts"""
+    return list(difflib.unified_diff(
+        old.splitlines(), new.splitlines(), old_label, new_label, lineterm=''
+    ))
+
+
+def _keep(revisions, keep_latest):
+    """Numbers of revisions kept by compaction: the first one, the latest
+    ``keep_latest`` and the last revision of each earlier day"""
+    latest = revisions[-keep_latest:] if keep_latest else []
+    older = revisions[:len(revisions) - len(latest)]
+    keep = {revisions[0].number}
+    keep.update(revision.number for revision in latest)
+    for _, day in groupby(older, key=lambda revision: revision.created_at.date()):
+        keep.add(list(day)[-1].number)
+    return keep
+
+
+def compact(note, keep_latest=20):
+    """Drop revisions of ``note`` outside the retention policy and re-chain
+    the rest; return how many revisions were deleted"""
+    with transaction.atomic():
+        Note.objects.select_for_update().values('pk').get(pk=note.pk)
+        revisions = list(note.revisions.order_by('number'))
+        if not revisions:
+            return 0
+        keep = _keep(revisions, keep_latest)
+        if len(keep) == len(revisions):
+            return 0
+        kept = []
+        text = None
+        since_snapshot = 0
+        previous = None
+        for revision in revisions:
+            text = revision.data if revision.is_snapshot else apply_delta(text, revision.data)
+            if revision.number not in keep:
+                continue
+            rebuilt = _revision(
+                note, revision.number, text, previous, since_snapshot,
+                edited_by_id=revision.edited_by_id, created_at=revision.created_at,
+            )
+            since_snapshot = 0 if rebuilt.is_snapshot else since_snapshot + 1
+            previous = text
+            kept.append(rebuilt)
+        note.revisions.all().delete()
+        NoteRevision.objects.bulk_create(kept)
+        return len(revisions) - len(kept)
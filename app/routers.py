@@ -0,0 +1,93 @@
+"""Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to one of the
+``DATABASE_REPLICAS`` aliases only while a read-only view is being served
+(see ``app.middleware.ReplicaRoutingMiddleware``) and nothing has been
+written yet in that request; everything else, including management
+commands and reads inside ``transaction.atomic()``, reads from the primary.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# URL names whose GET requests may read from a replica
+READ_ONLY_VIEWS = frozenset({
+    'calendar_feed', 'dashboard', 'meeting_list', 'meeting_detail', 'meeting_export',
+    'note_comments', 'public_note_comments', 'search',
+})
+
+# Set after a write so the user's next requests read from the primary
+PIN_COOKIE = 'primary_pin'
+
+_state = contextvars.ContextVar('replica_routing_state', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    """How long a user who wrote keeps reading from the primary"""
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+class RoutingState:
+    """Routing decisions for one request"""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+    def use_replica(self):
+        replicas = replica_aliases()
+        if replicas:
+            self.replica = random.choice(replicas)
+
+
+def begin_request():
+    state = RoutingState()
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def current():
+    return _state.get()
+
+
+def activate(state):
+    """Make ``state`` current again, e.g. while a streamed response is read"""
+    return _state.set(state)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        # Reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,135 @@
+"""Full-text search over meetings, notes and comments.
+
+Searchable text is copied into ``SearchDocument`` rows whenever a meeting,
+note or comment is saved (see ``app.signals``). The backend that queries the
+index is chosen by database vendor and can be overridden with the
+``SEARCH_BACKEND`` setting (a dotted path to a ``SearchBackend`` subclass).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from . import caching
+from .models import Meeting, Note, Comment, SearchDocument
+
+FTS_TABLE = 'app_searchdocument_fts'
+
+
+def _terms(query):
+    return re.findall(r'\w+', query)
+
+
+class SearchBackend:
+    """Filter and rank a ``SearchDocument`` queryset for a query string"""
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(SearchBackend):
+    """Unranked ``icontains`` matching, for databases without full-text support"""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for term in _terms(query):
+            condition &= Q(body__icontains=term)
+        return queryset.filter(condition).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        ).order_by('-updated_at')
+
+
+class PostgresSearchBackend(SearchBackend):
+    """``tsvector`` matching served by the GIN index on ``body``"""
+
+    config = 'english'
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = SearchVector('body', config=self.config)
+        search_query = SearchQuery(query, config=self.config, search_type='websearch')
+        return queryset.annotate(
+            document=vector,
+            rank=SearchRank(vector, search_query),
+        ).filter(document=search_query).order_by('-rank', '-updated_at')
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 matching ranked with ``bm25``"""
+
+    def search(self, queryset, query):
+        terms = _terms(query)
+        # Quote every term so user input can't inject FTS5 query syntax;
+        # the last term is a prefix match to support partial words.
+        match = ' '.join('"%s"' % term for term in terms) + '*'
+        table = SearchDocument._meta.db_table
+        # MATCH selects the documents once, as a list the outer query looks
+        # ids up in; bm25() is then only evaluated for those documents, by
+        # rowid, so visibility filters never trigger a full-text query.
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        ).annotate(
+            rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = "{table}"."id"',
+                [match],
+                output_field=FloatField(),
+            )
+        ).order_by('-rank', '-updated_at')
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)()
+
+
+def search(user, query, limit=50):
+    """Return the best matching documents in meetings ``user`` may view"""
+    if not _terms(query):
+        return SearchDocument.objects.none()
+    visible = Meeting.objects.visible_to(user).values('pk')
+    queryset = SearchDocument.objects.filter(meeting__in=visible).select_related('meeting')
+    return get_backend().search(queryset, query)[:limit]
+
+
+def document_for(instance):
+    """Return ``(kind, meeting_id, body)`` for a searchable model instance"""
+    if isinstance(instance, Meeting):
+        body = '\n'.join(filter(None, [instance.title, instance.description, instance.location]))
+        return SearchDocument.KIND_MEETING, instance.pk, body
+    if isinstance(instance, Note):
+        return SearchDocument.KIND_NOTE, instance.meeting_id, instance.content
+    if isinstance(instance, Comment):
+        return SearchDocument.KIND_COMMENT, caching.comment_meeting_id(instance), instance.content
+    raise TypeError(f'{type(instance).__name__} is not searchable')
+
+
+def index_instance(instance):
+    """Create or refresh the search document for a saved instance"""
+    kind, meeting_id, body = document_for(instance)
+    SearchDocument.objects.update_or_create(
+        kind=kind, object_id=instance.pk,
+        defaults={'meeting_id': meeting_id, 'body': body},
+    )
+
+
+def unindex_instance(instance):
+    """Remove the search document of a deleted instance"""
+    kind = {
+        Meeting: SearchDocument.KIND_MEETING,
+        Note: SearchDocument.KIND_NOTE,
+        Comment: SearchDocument.KIND_COMMENT,
+    }[type(instance)]
+    SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
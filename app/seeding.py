@@ -0,0 +1,167 @@
+"""Synthetic data generation for benchmarks, using bulk inserts throughout."""
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import rendering
+from .models import Meeting, Note, Attendee, ActionItem, Attachment, Comment
+
+WORDS = (
+    'agenda budget roadmap release hiring review sprint design launch customer '
+    'metrics risk migration security onboarding retro planning incident vendor '
+    'contract forecast feedback prototype deadline staffing quality support '
+    'pricing analytics infrastructure training compliance partnership'
+).split()
+
+DISTRIBUTIONS = ('uniform', 'skewed')
+
+# Mean of random.paretovariate(1.5), used to scale skewed sizes to the average
+PARETO_MEAN = 3.0
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _size_factor(rng, distribution):
+    """Multiplier applied to the average child counts of one meeting.
+
+    ``uniform`` spreads sizes evenly between zero and twice the average;
+    ``skewed`` follows a Pareto distribution, so most meetings are small and
+    a few are very large, like real usage.
+    """
+    if distribution == 'skewed':
+        return min(rng.paretovariate(1.5) / PARETO_MEAN, 50)
+    return rng.uniform(0, 2)
+
+
+def _rendered(instance):
+    # bulk_create skips save(), which renders the Markdown
+    rendering.render_fields(instance)
+    return instance
+
+
+def seed_dataset(users=200, meetings=2000, notes=5, comments=3, attendees=8,
+                 action_items=3, attachments=1, seed=0, batch_size=1000,
+                 distribution='uniform', prefix=None):
+    """Insert a synthetic dataset and return the created users and meetings.
+
+    Per-meeting child counts are averages, varied per meeting according to
+    ``distribution``. The same ``seed`` produces the same data; usernames
+    start with ``prefix`` (random by default, so repeated runs don't clash).
+    Meeting counters are filled in directly since bulk inserts skip signals.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f'Unknown distribution: {distribution}')
+    rng = random.Random(seed)
+    prefix = prefix or f'seed-{uuid.uuid4().hex[:8]}'
+    now = timezone.now()
+
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'{prefix}-{i}',
+                email=f'{prefix}-{i}@example.com',
+                first_name=rng.choice(WORDS).capitalize(),
+            )
+            for i in range(users)
+        ],
+        batch_size=batch_size,
+    )
+    user_list = list(User.objects.filter(username__startswith=f'{prefix}-').order_by('pk'))
+
+    # Decide every meeting's shape first so its counters can be inserted
+    # with it
+    plans = []
+    for i in range(meetings):
+        factor = _size_factor(rng, distribution)
+        note_comments = [
+            round(comments * rng.uniform(0, 2)) for _ in range(round(notes * factor))
+        ]
+        completed = [rng.random() < 0.5 for _ in range(round(action_items * factor))]
+        plans.append({
+            'note_comments': note_comments,
+            'attendees': rng.sample(user_list, min(round(attendees * factor), len(user_list))),
+            'completed': completed,
+            'attachments': round(attachments * factor),
+        })
+
+    visibilities = [choice for choice, _ in Meeting.VISIBILITY_CHOICES]
+    meeting_list = []
+    for i, plan in enumerate(plans):
+        visibility = rng.choice(visibilities)
+        meeting_list.append(Meeting(
+            title=_text(rng, 3),
+            date=now - timedelta(minutes=rng.randrange(60 * 24 * 365 * 3)),
+            location='Room %d' % rng.randrange(20),
+            description=_text(rng, 12),
+            created_by=rng.choice(user_list),
+            visibility=visibility,
+            # Share tokens are secrets, so they don't come from the seeded RNG
+            public_token=(
+                uuid.uuid4().hex if visibility == Meeting.VISIBILITY_PUBLIC else None
+            ),
+            note_count=len(plan['note_comments']),
+            comment_count=sum(plan['note_comments']),
+            attendee_count=len(plan['attendees']),
+            action_item_count=len(plan['completed']),
+            open_action_item_count=plan['completed'].count(False),
+        ))
+    meeting_list = Meeting.objects.bulk_create(meeting_list, batch_size=batch_size)
+
+    note_list = Note.objects.bulk_create(
+        [
+            _rendered(Note(meeting=meeting, content=_text(rng, 40), created_by=rng.choice(user_list)))
+            for meeting, plan in zip(meeting_list, plans)
+            for _ in plan['note_comments']
+        ],
+        batch_size=batch_size,
+    )
+    comment_counts = [count for plan in plans for count in plan['note_comments']]
+    Comment.objects.bulk_create(
+        [
+            _rendered(Comment(note=note, content=_text(rng, 15), created_by=rng.choice(user_list)))
+            for note, count in zip(note_list, comment_counts)
+            for _ in range(count)
+        ],
+        batch_size=batch_size,
+    )
+    statuses = ['invited', 'accepted', 'declined', 'tentative']
+    Attendee.objects.bulk_create(
+        [
+            Attendee(meeting=meeting, user=user, status=rng.choice(statuses))
+            for meeting, plan in zip(meeting_list, plans)
+            for user in plan['attendees']
+        ],
+        batch_size=batch_size,
+    )
+    ActionItem.objects.bulk_create(
+        [
+            ActionItem(
+                meeting=meeting,
+                title=_text(rng, 4),
+                assigned_to=rng.choice(user_list),
+                completed=completed,
+            )
+            for meeting, plan in zip(meeting_list, plans)
+            for completed in plan['completed']
+        ],
+        batch_size=batch_size,
+    )
+    Attachment.objects.bulk_create(
+        [
+            Attachment(
+                meeting=meeting,
+                name=f'{_text(rng, 2)}.pdf',
+                file_url=f'https://example.com/{meeting.pk}/{j}',
+                uploaded_by=rng.choice(user_list),
+            )
+            for meeting, plan in zip(meeting_list, plans)
+            for j in range(plan['attachments'])
+        ],
+        batch_size=batch_size,
+    )
+    return user_list, meeting_list
@@ -0,0 +1,191 @@
+"""Signal receivers that keep derived data in step with the core models."""
+from collections import Counter
+
+from django.contrib.auth.models import Group, User
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from . import autocomplete, backends, caching, events, search
+from .models import Meeting, Note, Attendee, ActionItem, Attachment, Comment
+
+
+def _cascaded_from(origin, model):
+    """Whether a delete started at a ``model`` instance or queryset.
+
+    Children deleted with their meeting skip their touch and search and
+    event bookkeeping, and comments deleted with their note leave their
+    count to the note's single touch.
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is model
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(post_save, sender=Note)
+@receiver(post_save, sender=Comment)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_instance(instance)
+
+
+# A meeting's documents, its notes' and comments' included, go with it
+# through the cascade on SearchDocument.meeting; notes and comments deleted
+# on their own need removing explicitly.
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=Comment)
+def remove_search_document(sender, instance, origin=None, **kwargs):
+    if not _cascaded_from(origin, Meeting):
+        search.unindex_instance(instance)
+
+
+@receiver(post_save, sender=Meeting)
+def touch_edited_meeting(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        caching.touch_meeting(instance.pk, calendar_version=1)
+
+
+@receiver(post_delete, sender=Meeting)
+def purge_deleted_meeting(sender, instance, **kwargs):
+    caching.purge_public_page(instance.pk, instance.public_token)
+
+
+@receiver(post_save, sender=Note)
+def remember_note_meeting(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        caching.remember_note_meeting(instance.pk, instance.meeting_id)
+
+
+@receiver(post_save, sender=Note)
+def touch_note_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        caching.touch_meeting(instance.meeting_id, note_count=1 if created else 0)
+
+
+@receiver(post_delete, sender=Note)
+def touch_note_deleted(sender, instance, origin=None, **kwargs):
+    if _cascaded_from(origin, Meeting):
+        return
+    # Comments are deleted first and count themselves on the origin
+    comments = getattr(origin, '_deleted_comments', {}).pop(instance.pk, 0)
+    caching.touch_meeting(instance.meeting_id, note_count=-1, comment_count=-comments)
+
+
+@receiver(post_save, sender=Comment)
+def touch_comment_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        caching.touch_meeting(
+            caching.comment_meeting_id(instance), comment_count=1 if created else 0
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def touch_comment_deleted(sender, instance, origin=None, **kwargs):
+    if _cascaded_from(origin, Meeting):
+        return
+    if _cascaded_from(origin, Note):
+        deleted = origin.__dict__.setdefault('_deleted_comments', Counter())
+        deleted[instance.note_id] += 1
+        return
+    caching.touch_meeting(caching.comment_meeting_id(instance), comment_count=-1)
+
+
+@receiver(post_save, sender=Attendee)
+def touch_attendee_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        caching.touch_meeting(
+            instance.meeting_id, attendee_count=1 if created else 0, calendar_version=1
+        )
+
+
+@receiver(post_delete, sender=Attendee)
+def touch_attendee_deleted(sender, instance, origin=None, **kwargs):
+    if _cascaded_from(origin, Meeting):
+        return
+    caching.touch_meeting(instance.meeting_id, attendee_count=-1, calendar_version=1)
+
+
+@receiver(post_save, sender=ActionItem)
+def touch_action_item_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        deltas = {
+            'action_item_count': 1,
+            'open_action_item_count': 0 if instance.completed else 1,
+        }
+    else:
+        was_completed = getattr(instance, '_loaded_completed', instance.completed)
+        deltas = {}
+        if was_completed != instance.completed:
+            deltas['open_action_item_count'] = 1 if was_completed else -1
+    caching.touch_meeting(instance.meeting_id, **deltas)
+    instance._loaded_completed = instance.completed
+
+
+@receiver(post_delete, sender=ActionItem)
+def touch_action_item_deleted(sender, instance, origin=None, **kwargs):
+    if _cascaded_from(origin, Meeting):
+        return
+    caching.touch_meeting(
+        instance.meeting_id,
+        action_item_count=-1,
+        open_action_item_count=0 if instance.completed else -1,
+    )
+
+
+@receiver(post_save, sender=Attachment)
+@receiver(post_delete, sender=Attachment)
+def touch_attachment_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and not _cascaded_from(origin, Meeting):
+        caching.touch_meeting(instance.meeting_id)
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Attendee)
+@receiver(post_save, sender=ActionItem)
+def publish_saved_event(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.publish_instance(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Attendee)
+@receiver(post_delete, sender=ActionItem)
+def publish_deleted_event(sender, instance, origin=None, **kwargs):
+    # Watchers of a deleted meeting get one event for the meeting instead
+    if not _cascaded_from(origin, Meeting):
+        events.publish_instance(instance, 'deleted')
+
+
+@receiver(post_delete, sender=Meeting)
+def publish_deleted_meeting(sender, instance, **kwargs):
+    events.publish(instance.pk, {'type': 'meeting', 'action': 'deleted', 'id': instance.pk})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_autocomplete(sender, **kwargs):
+    autocomplete.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    backends.invalidate_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_cached_permissions(sender, instance, action, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, User):
+        backends.invalidate_user(instance.pk)
+    else:
+        # Changed from the group or permission side, which can affect any
+        # number of users
+        backends.invalidate_all()
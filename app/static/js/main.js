@@ -1,4 +1,99 @@
-﻿document.addEventListener('DOMContentLoaded', function() {
+﻿// Cached page fragments are shared between users, so per-user controls
+// and CSRF tokens are filled in here rather than on the server.
+function personalize(root) {
+    const userId = document.body.dataset.userId;
+    if (userId) {
+        root.querySelectorAll('[data-owner-id="' + userId + '"]').forEach(el => {
+            el.classList.remove('d-none');
+        });
+    }
+    const csrfMeta = document.querySelector('meta[name="csrf-token"]');
+    if (csrfMeta) {
+        root.querySelectorAll('input[name="csrfmiddlewaretoken"]:not([value])').forEach(input => {
+            input.value = csrfMeta.content;
+        });
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    personalize(document);
+
+    // Earlier comments are fetched a page at a time; each page replaces
+    // the button that loaded it and brings its own button for the next.
+    document.addEventListener('click', event => {
+        const button = event.target.closest('[data-load-comments]');
+        if (!button) {
+            return;
+        }
+        button.disabled = true;
+        fetch(button.dataset.loadComments, {credentials: 'same-origin'})
+            .then(response => response.ok ? response.text() : Promise.reject(response))
+            .then(html => {
+                const fragment = document.createRange().createContextualFragment(html);
+                personalize(fragment);
+                button.replaceWith(fragment);
+            })
+            .catch(() => {
+                button.disabled = false;
+            });
+    });
+
+    // Username typeahead: fill the input's <datalist> from the autocomplete
+    // endpoint as the user types, debounced to one request per pause.
+    document.querySelectorAll('input[data-autocomplete-url]').forEach(input => {
+        const datalist = document.getElementById(input.getAttribute('list'));
+        let timer = null;
+        let lastPrefix = null;
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                const prefix = input.value.trim();
+                if (!prefix || prefix === lastPrefix) {
+                    return;
+                }
+                lastPrefix = prefix;
+                const url = input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(prefix);
+                fetch(url, {credentials: 'same-origin'})
+                    .then(response => response.json())
+                    .then(data => {
+                        datalist.replaceChildren(...data.results.map(user => {
+                            const option = document.createElement('option');
+                            option.value = user.username;
+                            if (user.name) {
+                                option.label = user.name;
+                            }
+                            return option;
+                        }));
+                    });
+            }, 200);
+        });
+    });
+
+    // Live meeting updates: attendee status changes are applied in place,
+    // a deleted meeting ends the stream and anything else offers a reload.
+    // EventSource reconnects by itself.
+    const eventsRoot = document.querySelector('[data-events-url]');
+    if (eventsRoot && window.EventSource) {
+        const notice = document.getElementById('live-updates');
+        const source = new EventSource(eventsRoot.dataset.eventsUrl);
+        source.onmessage = message => {
+            const event = JSON.parse(message.data);
+            const status = event.type === 'attendee' && event.action === 'updated'
+                && document.querySelector('[data-attendee-status="' + event.id + '"]');
+            if (event.type === 'meeting' && event.action === 'deleted') {
+                source.close();
+                if (notice) {
+                    notice.textContent = 'This meeting has been deleted.';
+                    notice.classList.remove('d-none');
+                }
+            } else if (status) {
+                status.textContent = event.status_display;
+            } else if (notice) {
+                notice.classList.remove('d-none');
+            }
+        };
+    }
+
     const alerts = document.querySelectorAll('.alert');
     alerts.forEach(alert => {
         setTimeout(() => {
@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from app import loaders, rendering
+
+register = template.Library()
+
+
+@register.filter
+def rendered(obj):
+    """The stored HTML of a note or comment (see ``app.rendering``)"""
+    return mark_safe(rendering.current_html(obj))
+
+
+@register.filter
+def comment_cursor(comment):
+    """Cursor of the comments posted before ``comment`` on its note"""
+    return loaders.comment_paginator(comment.note_id).cursor_after(comment)
@@ -0,0 +1,11 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def query_replace(context, param, value):
+    """Return the current query string with ``param`` set to ``value``"""
+    query = context['request'].GET.copy()
+    query[param] = value
+    return query.urlencode()
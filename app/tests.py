@@ -1,8 +1,36 @@
-from django.test import TestCase, Client
+import asyncio
+import base64
+import csv
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import (
+	TestCase, TransactionTestCase, SimpleTestCase, Client, RequestFactory, AsyncRequestFactory,
+	override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from django.db import connection, connections
+from django.http import Http404
 from django.urls import reverse
-from django.contrib.auth.models import User
-from .models import Meeting, Note, Attendee, ActionItem, Attachment
+from django.contrib.auth.models import AnonymousUser, Group, Permission, User
+from django.contrib.sessions.backends.db import SessionStore
+from .models import Meeting, Note, NoteRevision, Attendee, ActionItem, Attachment, Blob, CalendarToken, Comment, MeetingSeries, SearchDocument
+from .pagination import KeysetPaginator, InvalidCursor
+from .permissions import can_view_meeting
+from . import action_items, async_views, attendees as bulk_attendees, backends, blobs, ics, loaders, counters, recurrence, rendering, revisions, routers, events, exports, instrumentation, search as search_index, views
 from django.utils import timezone
+from asgiref.sync import async_to_sync
 
 
 class MeetingDetailTests(TestCase):
@@ -266,3 +294,1615 @@ class MeetingDeleteTests(TestCase):
 			self.assertEqual(resp.status_code, 403)
 			resp = self.client.post(reverse('comment_delete', args=[comment.pk]))
 			self.assertEqual(resp.status_code, 403)
+
+
+# Queries for session, user, meeting (with access check) and the four sections
+MEETING_DETAIL_QUERY_BUDGET = 8
+
+
+class MeetingDetailQueryBudgetTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(
+			title='Budget Meeting', date=timezone.now(), created_by=self.owner
+		)
+
+	def populate(self, size):
+		start = Note.objects.count()
+		for i in range(start, start + size):
+			user = User.objects.create(username=f'member{i}')
+			Attendee.objects.create(meeting=self.meeting, user=user, status='accepted')
+			note = Note.objects.create(meeting=self.meeting, content=f'Note {i}', created_by=user)
+			for j in range(3):
+				Comment.objects.create(note=note, content=f'Comment {j}', created_by=user)
+			ActionItem.objects.create(meeting=self.meeting, title=f'Task {i}', assigned_to=user)
+			Attachment.objects.create(meeting=self.meeting, name=f'File {i}', uploaded_by=user)
+
+	def count_detail_queries(self):
+		self.client.login(username='owner', password='pass')
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		self.assertEqual(resp.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def test_detail_stays_within_query_budget(self):
+		self.populate(5)
+		self.assertLessEqual(self.count_detail_queries(), MEETING_DETAIL_QUERY_BUDGET)
+
+	def test_query_count_does_not_grow_with_meeting_size(self):
+		self.populate(2)
+		small = self.count_detail_queries()
+		self.populate(20)
+		self.assertEqual(self.count_detail_queries(), small)
+
+
+class KeysetPaginationTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		base = timezone.now()
+		# pairs of meetings share a date so the pk tie-breaker is exercised
+		for i in range(25):
+			Meeting.objects.create(
+				title=f'Meeting {i}', date=base - timezone.timedelta(days=i // 2), created_by=self.owner
+			)
+		self.expected = list(Meeting.objects.order_by('-date', '-pk'))
+
+	def test_walks_forward_and_back_without_gaps_or_duplicates(self):
+		paginator = KeysetPaginator(Meeting.objects.all(), per_page=7)
+		pages = [paginator.page()]
+		while pages[-1].has_next:
+			pages.append(paginator.page(pages[-1].next_cursor))
+		self.assertEqual([m for page in pages for m in page], self.expected)
+		self.assertFalse(pages[0].has_previous)
+
+		back = [pages[-1]]
+		while back[-1].has_previous:
+			back.append(paginator.page(back[-1].previous_cursor))
+		self.assertEqual([m for page in reversed(back) for m in page], self.expected)
+
+	def test_invalid_cursor_falls_back_to_first_page(self):
+		paginator = KeysetPaginator(Meeting.objects.all(), per_page=5)
+		self.assertEqual(list(paginator.get_page('not-a-cursor')), self.expected[:5])
+		with self.assertRaises(InvalidCursor):
+			paginator.page('not-a-cursor')
+
+	def test_wrongly_typed_cursor_values_fall_back_to_first_page(self):
+		payload = json.dumps({'v': [{'a': 1}, 1], 'b': False}).encode()
+		cursor = base64.urlsafe_b64encode(payload).decode().rstrip('=')
+		with self.assertRaises(InvalidCursor):
+			KeysetPaginator(Meeting.objects.all(), per_page=5).page(cursor)
+		self.client.login(username='owner', password='pass')
+		resp = self.client.get(reverse('dashboard'), {'attending': cursor})
+		self.assertEqual(resp.status_code, 200)
+
+	def test_meeting_list_follows_cursor(self):
+		self.client.login(username='owner', password='pass')
+		resp = self.client.get(reverse('meeting_list'))
+		page = resp.context['meetings']
+		self.assertEqual(len(page), 20)
+		resp = self.client.get(reverse('meeting_list'), {'cursor': page.next_cursor})
+		self.assertEqual(list(resp.context['meetings']), self.expected[20:])
+
+	def test_dashboard_paginates_each_list_independently(self):
+		self.client.login(username='owner', password='pass')
+		resp = self.client.get(reverse('dashboard'))
+		page = resp.context['meetings']
+		self.assertContains(resp, 'created=' + page.next_cursor)
+		resp = self.client.get(reverse('dashboard'), {'created': page.next_cursor})
+		self.assertEqual(list(resp.context['meetings']), self.expected[20:])
+
+
+class ExplainIndexesCommandTests(TestCase):
+	def test_reports_plans_and_rolls_back(self):
+		out = StringIO()
+		call_command('explain_indexes', users=5, meetings=20, repeat=1, stdout=out)
+		self.assertIn('with indexes', out.getvalue())
+		self.assertIn('meeting_creator_date_idx', out.getvalue())
+		self.assertFalse(Meeting.objects.exists())
+
+
+class SeedAndBenchmarkCommandTests(TestCase):
+	def seed(self, **options):
+		call_command(
+			'seed_data', users=15, meetings=25, skip_search_index=True, stdout=StringIO(), **options
+		)
+
+	def test_seed_data_is_reproducible_with_consistent_counters(self):
+		self.seed(seed=7, prefix='first')
+		self.seed(seed=7, prefix='second')
+		titles = list(Meeting.objects.order_by('pk').values_list('title', flat=True))
+		self.assertEqual(titles[:25], titles[25:])
+		self.assertEqual(counters.recount(Meeting.objects.all()), 0)
+		self.assertTrue(Comment.objects.exists())
+		with self.assertRaises(CommandError):
+			self.seed(seed=7, prefix='first')
+
+	def test_benchmark_covers_every_url_and_enforces_budgets(self):
+		self.seed()
+		out = StringIO()
+		call_command('benchmark_views', repeat=1, warmup=1, stdout=out)
+		for name in ('meeting_detail', 'comment_edit', 'attendee_update_status'):
+			self.assertIn(name, out.getvalue())
+		self.assertIn('All views are within budget.', out.getvalue())
+		self.assertEqual(Meeting.objects.filter(public_token__isnull=False).count(),
+			Meeting.objects.filter(visibility=Meeting.VISIBILITY_PUBLIC).count())
+		with override_settings(PERF_BUDGETS={'meeting_detail': {'queries': 0}}):
+			with self.assertRaisesMessage(CommandError, 'meeting_detail: 1 queries > 0'):
+				call_command('benchmark_views', repeat=1, warmup=1, url_names=['meeting_detail'], stdout=StringIO())
+
+
+class MeetingVisibleToTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.attendee = User.objects.create_user('attendee', password='pass')
+		self.other = User.objects.create_user('other', password='pass')
+		now = timezone.now()
+		self.private = Meeting.objects.create(title='Private', date=now, created_by=self.owner)
+		self.team = Meeting.objects.create(
+			title='Team', date=now, created_by=self.owner, visibility=Meeting.VISIBILITY_TEAM
+		)
+		self.public = Meeting.objects.create(
+			title='Public', date=now, created_by=self.owner, visibility=Meeting.VISIBILITY_PUBLIC
+		)
+		Attendee.objects.create(meeting=self.private, user=self.attendee)
+
+	def visible(self, user):
+		return set(Meeting.objects.visible_to(user))
+
+	def test_rules_for_each_kind_of_user(self):
+		everything = {self.private, self.team, self.public}
+		self.assertEqual(self.visible(self.owner), everything)
+		self.assertEqual(self.visible(self.attendee), everything)
+		self.assertEqual(self.visible(self.other), {self.team, self.public})
+		self.assertEqual(self.visible(AnonymousUser()), {self.public})
+
+	def test_visible_to_is_a_single_query(self):
+		with self.assertNumQueries(1):
+			list(Meeting.objects.visible_to(self.attendee))
+
+	def test_meeting_list_hides_private_meetings(self):
+		self.client.login(username='other', password='pass')
+		resp = self.client.get(reverse('meeting_list'))
+		self.assertEqual(set(resp.context['meetings']), {self.team, self.public})
+
+	def test_access_check_is_memoized_per_request(self):
+		request = RequestFactory().get('/')
+		request.user = self.other
+		with self.assertNumQueries(1):
+			self.assertFalse(can_view_meeting(request, self.private.pk))
+			self.assertFalse(can_view_meeting(request, self.private.pk))
+
+
+class SearchTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.other = User.objects.create_user('other', password='pass')
+		now = timezone.now()
+		self.team = Meeting.objects.create(
+			title='Roadmap planning', date=now, created_by=self.owner,
+			visibility=Meeting.VISIBILITY_TEAM, description='Quarterly goals',
+		)
+		self.private = Meeting.objects.create(title='Salary review', date=now, created_by=self.owner)
+		self.note = Note.objects.create(meeting=self.team, content='Discussed the budget forecast', created_by=self.owner)
+		Note.objects.create(meeting=self.private, content='Budget for raises', created_by=self.owner)
+
+	def kinds(self, user, query):
+		return [(doc.kind, doc.object_id) for doc in search_index.search(user, query)]
+
+	def test_finds_meetings_notes_and_comments(self):
+		comment = Comment.objects.create(note=self.note, content='Forecast looks optimistic', created_by=self.other)
+		self.assertEqual(self.kinds(self.other, 'roadmap'), [('meeting', self.team.pk)])
+		self.assertEqual(
+			set(self.kinds(self.other, 'forecast')),
+			{('note', self.note.pk), ('comment', comment.pk)},
+		)
+		# stemming and prefix matching
+		self.assertIn(('meeting', self.team.pk), self.kinds(self.other, 'plan'))
+
+	def test_respects_visibility(self):
+		self.assertEqual(self.kinds(self.other, 'budget'), [('note', self.note.pk)])
+		self.assertEqual(len(self.kinds(self.owner, 'budget')), 2)
+
+	def test_index_follows_edits_and_deletes(self):
+		self.note.content = 'Hiring plan'
+		self.note.save()
+		self.assertEqual(self.kinds(self.owner, 'forecast'), [])
+		self.assertEqual(self.kinds(self.owner, 'hiring'), [('note', self.note.pk)])
+		self.note.delete()
+		self.assertEqual(self.kinds(self.owner, 'hiring'), [])
+
+	def test_meeting_delete_removes_documents_through_the_cascade(self):
+		for i in range(3):
+			Comment.objects.create(note=self.note, content=f'Reply {i}', created_by=self.owner)
+		meeting_id = self.team.pk
+		with CaptureQueriesContext(connection) as ctx:
+			self.team.delete()
+		deletes = [q for q in ctx.captured_queries if q['sql'].startswith('DELETE FROM "app_searchdocument"')]
+		self.assertEqual(len(deletes), 1)
+		self.assertFalse(SearchDocument.objects.filter(meeting_id=meeting_id).exists())
+
+	def test_query_syntax_is_not_interpreted(self):
+		self.assertEqual(self.kinds(self.owner, 'budget" OR "x'), [])
+		self.assertEqual(self.kinds(self.owner, '"*()'), [])
+
+	def test_search_view(self):
+		self.client.login(username='other', password='pass')
+		resp = self.client.get(reverse('search'), {'q': 'roadmap'})
+		self.assertContains(resp, 'Roadmap planning')
+		self.assertNotContains(resp, 'Salary review')
+
+	@skipUnless(connection.vendor == 'sqlite', 'FTS5 backend')
+	def test_fts_query_runs_once_regardless_of_matches(self):
+		def plan(query):
+			with CaptureQueriesContext(connection) as ctx:
+				list(search_index.search(self.owner, query))
+			self.assertEqual(len(ctx.captured_queries), 1)
+			sql = ctx.captured_queries[0]['sql']
+			with connection.cursor() as cursor:
+				cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+				return [row[-1] for row in cursor.fetchall()]
+
+		few = plan('roadmap')
+		Note.objects.bulk_create(
+			Note(meeting=self.team, content=f'Roadmap item {i}', created_by=self.owner)
+			for i in range(80)
+		)
+		for note in Note.objects.filter(content__startswith='Roadmap item'):
+			search_index.index_instance(note)
+		self.assertEqual(len(search_index.search(self.owner, 'roadmap')), 50)
+		self.assertEqual(plan('roadmap'), few)
+		# One full-text query builds the id list that drives the lookup;
+		# bm25() is only read back for those documents, by rowid
+		self.assertEqual(sum(search_index.FTS_TABLE in step for step in few), 2)
+		self.assertEqual(few[0], 'SEARCH app_searchdocument USING INTEGER PRIMARY KEY (rowid=?)')
+
+
+class MeetingCounterTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.member = User.objects.create_user('member', password='pass')
+		self.meeting = Meeting.objects.create(title='Counted', date=timezone.now(), created_by=self.owner)
+
+	def counts(self):
+		self.meeting.refresh_from_db()
+		return {field: getattr(self.meeting, field) for field in counters.COUNTER_FIELDS}
+
+	def test_counters_follow_creates_toggles_and_deletes(self):
+		note = Note.objects.create(meeting=self.meeting, content='N', created_by=self.owner)
+		Comment.objects.create(note=note, content='C1', created_by=self.member)
+		Comment.objects.create(note=note, content='C2', created_by=self.member)
+		attendee = Attendee.objects.create(meeting=self.meeting, user=self.member)
+		item = ActionItem.objects.create(meeting=self.meeting, title='T')
+		ActionItem.objects.create(meeting=self.meeting, title='Done', completed=True)
+		self.assertEqual(self.counts(), {
+			'note_count': 1, 'comment_count': 2, 'attendee_count': 1,
+			'action_item_count': 2, 'open_action_item_count': 1,
+		})
+
+		item = ActionItem.objects.get(pk=item.pk)
+		item.completed = True
+		item.save()
+		item.save()
+		self.assertEqual(self.counts()['open_action_item_count'], 0)
+
+		note.delete()
+		attendee.delete()
+		item.delete()
+		self.assertEqual(self.counts(), {
+			'note_count': 0, 'comment_count': 0, 'attendee_count': 0,
+			'action_item_count': 1, 'open_action_item_count': 0,
+		})
+
+	def test_cascades_touch_the_meeting_once(self):
+		def meeting_updates(ctx):
+			return [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "app_meeting"')]
+
+		cache.clear()
+		with self.captureOnCommitCallbacks(execute=True):
+			notes = [Note.objects.create(meeting=self.meeting, content='N', created_by=self.owner) for _ in range(2)]
+		for note in notes:
+			for i in range(3):
+				Comment.objects.create(note=note, content=f'C{i}', created_by=self.member)
+		Attendee.objects.create(meeting=self.meeting, user=self.member)
+		ActionItem.objects.create(meeting=self.meeting, title='T')
+
+		comment = Comment.objects.filter(note=notes[0]).first()
+		with CaptureQueriesContext(connection) as ctx:
+			comment.delete()
+		self.assertFalse([q for q in ctx.captured_queries if 'FROM "app_note"' in q['sql']])
+
+		with CaptureQueriesContext(connection) as ctx:
+			notes[0].delete()
+		self.assertEqual(len(meeting_updates(ctx)), 1)
+		self.assertEqual(self.counts()['comment_count'], 3)
+		with CaptureQueriesContext(connection) as ctx:
+			Note.objects.filter(pk=notes[1].pk).delete()
+		self.assertEqual(len(meeting_updates(ctx)), 1)
+		self.assertEqual(self.counts(), {
+			'note_count': 0, 'comment_count': 0, 'attendee_count': 1,
+			'action_item_count': 1, 'open_action_item_count': 1,
+		})
+
+		note = Note.objects.create(meeting=self.meeting, content='N', created_by=self.owner)
+		Comment.objects.create(note=note, content='C', created_by=self.member)
+		with CaptureQueriesContext(connection) as ctx:
+			self.meeting.delete()
+		self.assertEqual(meeting_updates(ctx), [])
+
+	def test_saving_a_loaded_meeting_keeps_concurrent_counter_changes(self):
+		loaded = Meeting.objects.get(pk=self.meeting.pk)
+		# A child is written after the edit form loaded the meeting
+		Note.objects.create(meeting=self.meeting, content='N', created_by=self.owner)
+		loaded.title = 'Renamed'
+		loaded.save()
+		self.assertEqual(self.counts()['note_count'], 1)
+		self.assertEqual(self.meeting.title, 'Renamed')
+
+	def test_edits_after_concurrent_changes_get_a_new_cache_key(self):
+		loaded = Meeting.objects.get(pk=self.meeting.pk)
+		Note.objects.create(meeting=self.meeting, content='N', created_by=self.owner)
+		self.meeting.refresh_from_db()
+		before = self.meeting.cache_key
+		loaded.title = 'Renamed'
+		loaded.save()
+		self.meeting.refresh_from_db()
+		self.assertNotEqual(self.meeting.cache_key, before)
+		self.assertEqual(self.meeting.version, 3)
+
+	def test_recount_repairs_drift(self):
+		Note.objects.create(meeting=self.meeting, content='N', created_by=self.owner)
+		Meeting.objects.filter(pk=self.meeting.pk).update(note_count=42, attendee_count=-3)
+		out = StringIO()
+		call_command('recount_meetings', batch_size=1, stdout=out)
+		self.assertIn('repaired 1', out.getvalue())
+		self.assertEqual(self.counts()['note_count'], 1)
+		self.assertEqual(self.counts()['attendee_count'], 0)
+
+	def test_meeting_list_shows_counts(self):
+		Note.objects.create(meeting=self.meeting, content='N', created_by=self.owner)
+		self.client.login(username='owner', password='pass')
+		resp = self.client.get(reverse('meeting_list'))
+		self.assertContains(resp, '1 note &middot; 0 open action items')
+
+
+class MeetingFragmentCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.member = User.objects.create_user('member', password='pass')
+		self.meeting = Meeting.objects.create(
+			title='Cached', date=timezone.now(), created_by=self.owner, visibility=Meeting.VISIBILITY_TEAM
+		)
+		self.note = Note.objects.create(meeting=self.meeting, content='First note', created_by=self.owner)
+		self.url = reverse('meeting_detail', args=[self.meeting.pk])
+
+	def get(self, username):
+		self.client.login(username=username, password='pass')
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(self.url)
+		return resp, len(ctx.captured_queries)
+
+	def test_sections_are_served_from_cache_across_users(self):
+		_, cold = self.get('owner')
+		resp, warm = self.get('member')
+		# user (refreshed by the login) and meeting only; the session is cached
+		self.assertEqual(warm, 2)
+		self.assertLess(warm, cold)
+		self.assertContains(resp, 'First note')
+		self.assertContains(resp, f'data-user-id="{self.member.pk}"')
+		self.assertContains(resp, f'data-owner-id="{self.owner.pk}"')
+
+	def test_child_changes_bump_version_and_refresh_sections(self):
+		self.get('owner')
+		version = Meeting.objects.get(pk=self.meeting.pk).version
+		note = Note.objects.create(meeting=self.meeting, content='Second note', created_by=self.member)
+		Comment.objects.create(note=note, content='A reply', created_by=self.owner)
+		Attendee.objects.create(meeting=self.meeting, user=self.member)
+		self.assertEqual(Meeting.objects.get(pk=self.meeting.pk).version, version + 3)
+		resp, _ = self.get('owner')
+		self.assertContains(resp, 'Second note')
+		self.assertContains(resp, 'A reply')
+
+	def test_cached_fragments_contain_no_csrf_token(self):
+		resp, _ = self.get('member')
+		self.assertContains(resp, '<input type="hidden" name="csrfmiddlewaretoken">', html=False)
+		self.assertNotContains(resp, 'name="csrfmiddlewaretoken" value=')
+
+
+class MeetingConditionalGetTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.member = User.objects.create_user('member', password='pass')
+		self.outsider = User.objects.create_user('outsider', password='pass')
+		self.meeting = Meeting.objects.create(title='Polled', date=timezone.now(), created_by=self.owner)
+		Attendee.objects.create(meeting=self.meeting, user=self.member)
+		self.url = reverse('meeting_detail', args=[self.meeting.pk])
+
+	def test_unchanged_meeting_returns_304_cheaply(self):
+		self.client.login(username='owner', password='pass')
+		first = self.client.get(self.url)
+		self.assertEqual(first['Cache-Control'], 'private, no-cache')
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+		self.assertEqual(resp.status_code, 304)
+		# Session and user come from the cache, leaving the meeting itself
+		self.assertEqual(len(ctx.captured_queries), 1)
+		resp = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+		self.assertEqual(resp.status_code, 304)
+
+	def test_child_change_invalidates_validators(self):
+		self.client.login(username='owner', password='pass')
+		first = self.client.get(self.url)
+		Note.objects.create(meeting=self.meeting, content='New', created_by=self.member)
+		resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+		self.assertEqual(resp.status_code, 200)
+		self.assertNotEqual(resp['ETag'], first['ETag'])
+
+	def test_etag_varies_by_user_and_ignored_without_access(self):
+		self.client.login(username='owner', password='pass')
+		owner_etag = self.client.get(self.url)['ETag']
+		self.client.login(username='member', password='pass')
+		resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=owner_etag)
+		self.assertEqual(resp.status_code, 200)
+		self.client.login(username='outsider', password='pass')
+		resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=owner_etag)
+		self.assertEqual(resp.status_code, 403)
+
+
+class PublicLinkTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(title='Shared', date=timezone.now(), created_by=self.owner)
+		Note.objects.create(meeting=self.meeting, content='Shared note', created_by=self.owner)
+		self.meeting.ensure_public_token()
+		self.url = reverse('meeting_public', args=[self.meeting.public_token])
+
+	def test_anonymous_view_is_cacheable_by_shared_caches(self):
+		resp = Client().get(self.url)
+		self.assertEqual(resp.status_code, 200)
+		self.assertContains(resp, 'Shared note')
+		self.assertIn('public', resp['Cache-Control'])
+		self.assertIn('s-maxage', resp['Cache-Control'])
+		self.assertNotIn('Cookie', resp.get('Vary', ''))
+		self.assertFalse(resp.cookies)
+
+	def test_repeat_views_skip_the_database(self):
+		Client().get(self.url)
+		with self.assertNumQueries(0):
+			resp = Client().get(self.url)
+		self.assertContains(resp, 'Shared note')
+
+	def test_changes_and_revocation_purge_the_cache(self):
+		Client().get(self.url)
+		Note.objects.create(meeting=self.meeting, content='Late addition', created_by=self.owner)
+		self.assertContains(Client().get(self.url), 'Late addition')
+
+		self.client.login(username='owner', password='pass')
+		self.client.post(reverse('meeting_public_toggle', args=[self.meeting.pk]), {'action': 'revoke'})
+		self.assertEqual(Client().get(self.url).status_code, 404)
+
+	def test_unknown_token_is_404(self):
+		self.assertEqual(Client().get(reverse('meeting_public', args=['nope'])).status_code, 404)
+
+
+class ExportTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.other = User.objects.create_user('other', password='pass')
+		now = timezone.now()
+		self.meeting = Meeting.objects.create(
+			title='Exported', date=now, created_by=self.owner, visibility=Meeting.VISIBILITY_TEAM
+		)
+		self.old = Meeting.objects.create(
+			title='Old', date=now - timezone.timedelta(days=30), created_by=self.owner,
+			visibility=Meeting.VISIBILITY_TEAM,
+		)
+		Meeting.objects.create(title='Secret', date=now, created_by=self.owner)
+		note = Note.objects.create(meeting=self.meeting, content='Exported note', created_by=self.owner)
+		Comment.objects.create(note=note, content='Exported comment', created_by=self.other)
+		Attendee.objects.create(meeting=self.meeting, user=self.other, status='accepted')
+		ActionItem.objects.create(meeting=self.meeting, title='Exported task', assigned_to=self.other)
+		Attachment.objects.create(meeting=self.meeting, name='Deck', file_url='http://example.com/deck')
+
+	def export(self, **params):
+		self.client.login(username='other', password='pass')
+		resp = self.client.get(reverse('meeting_export'), params)
+		self.assertTrue(resp.streaming)
+		return resp, b''.join(resp.streaming_content).decode()
+
+	def test_ndjson_nests_children_and_respects_visibility(self):
+		_, body = self.export(format='ndjson')
+		records = {r['title']: r for r in map(json.loads, body.splitlines())}
+		self.assertEqual(set(records), {'Exported', 'Old'})
+		record = records['Exported']
+		self.assertEqual(record['notes'][0]['comments'][0]['content'], 'Exported comment')
+		self.assertEqual(record['attendees'][0]['status'], 'accepted')
+		self.assertEqual(record['action_items'][0]['assigned_to'], 'other')
+		self.assertEqual(record['attachments'][0]['name'], 'Deck')
+
+	def test_json_and_csv_formats_with_date_filter(self):
+		start = (timezone.now() - timezone.timedelta(days=1)).date()
+		_, body = self.export(format='json', start=start.isoformat())
+		self.assertEqual([r['title'] for r in json.loads(body)], ['Exported'])
+		resp, body = self.export(format='csv', start=start.isoformat())
+		self.assertEqual(resp['Content-Type'], 'text/csv')
+		rows = list(csv.DictReader(StringIO(body)))
+		self.assertEqual(
+			[row['record_type'] for row in rows],
+			['meeting', 'note', 'comment', 'attendee', 'action_item', 'attachment'],
+		)
+
+	def test_invalid_parameters_are_rejected(self):
+		self.client.login(username='other', password='pass')
+		resp = self.client.get(reverse('meeting_export'), {'format': 'xml'})
+		self.assertEqual(resp.status_code, 400)
+
+	def test_children_are_fetched_per_chunk(self):
+		queryset = exports.export_queryset()
+		with self.assertNumQueries(6):
+			list(exports.meeting_records(queryset))
+
+	def test_management_command(self):
+		out = StringIO()
+		call_command('export_meetings', format='ndjson', visibility='private', stdout=out)
+		self.assertEqual([json.loads(line)['title'] for line in out.getvalue().splitlines()], ['Secret'])
+
+	def test_command_rejects_impossible_dates(self):
+		for value in ('2024-02-30', 'soon'):
+			with self.assertRaisesMessage(CommandError, f'Invalid --start date: {value}'):
+				call_command('export_meetings', start=value, stdout=StringIO())
+
+
+class BulkInviteTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.present = User.objects.create_user('present', password='pass')
+		self.alice = User.objects.create_user('alice', email='Alice@example.com', password='pass')
+		self.bob = User.objects.create_user('bob', password='pass')
+		self.meeting = Meeting.objects.create(title='Bulk', date=timezone.now(), created_by=self.owner)
+		Attendee.objects.create(meeting=self.meeting, user=self.present)
+		self.url = reverse('attendee_bulk_add', args=[self.meeting.pk])
+		self.client.login(username='owner', password='pass')
+
+	def test_json_api_reports_each_outcome(self):
+		version = Meeting.objects.get(pk=self.meeting.pk).version
+		payload = {'users': ['alice@example.COM', 'bob', 'present', 'ghost', 'bob'], 'status': 'accepted'}
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.post(self.url, json.dumps(payload), content_type='application/json')
+		self.assertEqual(resp.json(), {
+			'added': ['alice@example.COM', 'bob'],
+			'already_present': ['present'],
+			'unknown': ['ghost'],
+		})
+		writes = [q for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+		self.assertEqual(len(writes), 2)
+		meeting = Meeting.objects.get(pk=self.meeting.pk)
+		self.assertEqual(meeting.attendee_count, 3)
+		self.assertEqual(meeting.version, version + 1)
+		self.assertEqual(
+			set(meeting.attendees.filter(status='accepted').values_list('user__username', flat=True)),
+			{'alice', 'bob'},
+		)
+
+	def test_users_added_concurrently_are_not_counted_twice(self):
+		insert = bulk_attendees._insert
+
+		def racing_insert(meeting, user_ids, status):
+			# Another request adds bob after the existing attendees were read
+			Attendee.objects.create(meeting=meeting, user=self.bob)
+			return insert(meeting, user_ids, status)
+
+		with mock.patch.object(bulk_attendees, '_insert', racing_insert):
+			result = bulk_attendees.bulk_invite(self.meeting, ['alice', 'bob'])
+		self.assertEqual(result.added, ['alice'])
+		self.assertEqual(result.already_present, ['bob'])
+		meeting = Meeting.objects.get(pk=self.meeting.pk)
+		self.assertEqual(meeting.attendee_count, meeting.attendees.count())
+
+	def test_csv_upload(self):
+		upload = SimpleUploadedFile('people.csv', b'username\nalice\nbob\n', content_type='text/csv')
+		resp = self.client.post(self.url, {'identifiers': '', 'csv_file': upload, 'status': 'invited'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.context['result'].added, ['alice', 'bob'])
+		self.assertEqual(self.meeting.attendees.count(), 3)
+
+	def test_only_owner_can_bulk_invite(self):
+		self.client.login(username='bob', password='pass')
+		resp = self.client.post(self.url, json.dumps({'users': ['bob']}), content_type='application/json')
+		self.assertEqual(resp.status_code, 404)
+
+
+class UserAutocompleteTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.owner = User.objects.create_user('owner', password='pass')
+		User.objects.create_user('Alice', first_name='Alice', last_name='Smith')
+		User.objects.create_user('alex')
+		User.objects.create_user('bob')
+		self.client.login(username='owner', password='pass')
+		self.url = reverse('user_autocomplete')
+
+	def test_prefix_match_is_case_insensitive_and_cached(self):
+		resp = self.client.get(self.url, {'q': 'AL'})
+		self.assertEqual(resp.json()['results'], [
+			{'username': 'Alice', 'name': 'Alice Smith'},
+			{'username': 'alex', 'name': ''},
+		])
+		with CaptureQueriesContext(connection) as ctx:
+			self.client.get(self.url, {'q': 'al'})
+		self.assertFalse([q for q in ctx.captured_queries if 'auth_user' in q['sql'] and 'LIKE' in q['sql']])
+
+	def test_new_users_invalidate_cached_prefixes(self):
+		self.assertEqual(len(self.client.get(self.url, {'q': 'b'}).json()['results']), 1)
+		User.objects.create_user('bea')
+		self.assertEqual(len(self.client.get(self.url, {'q': 'b'}).json()['results']), 2)
+
+	def test_limit_is_capped(self):
+		resp = self.client.get(self.url, {'q': 'a', 'limit': '1'})
+		self.assertEqual(len(resp.json()['results']), 1)
+		self.assertEqual(self.client.get(self.url, {'q': 'a', 'limit': 'x'}).status_code, 400)
+
+	def test_attendee_form_uses_username_typeahead(self):
+		meeting = Meeting.objects.create(title='Typeahead', date=timezone.now(), created_by=self.owner)
+		url = reverse('attendee_add', args=[meeting.pk])
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url)
+		self.assertContains(resp, 'data-autocomplete-url="%s"' % self.url)
+		self.assertNotContains(resp, '<option value="%d"' % self.owner.pk)
+		self.assertFalse([q for q in ctx.captured_queries if 'FROM "auth_user"' in q['sql'] and 'WHERE' not in q['sql']])
+		resp = self.client.post(url, {'user': 'bob', 'status': 'invited'})
+		self.assertRedirects(resp, reverse('meeting_detail', args=[meeting.pk]))
+		self.assertTrue(meeting.attendees.filter(user__username='bob').exists())
+		resp = self.client.post(url, {'user': 'nobody', 'status': 'invited'})
+		self.assertContains(resp, 'No user with that username.')
+
+
+class AsyncViewTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.stranger = User.objects.create_user('stranger', password='pass')
+		self.meeting = Meeting.objects.create(title='Async meeting', date=timezone.now(), created_by=self.owner)
+		Note.objects.create(meeting=self.meeting, content='Async note', created_by=self.owner)
+		Attendee.objects.create(meeting=self.meeting, user=self.owner, status='accepted')
+		self.factory = AsyncRequestFactory()
+
+	def request(self, path, user, headers=None):
+		request = self.factory.get(path, headers=headers)
+		request.user = user
+		request.session = SessionStore()
+		return request
+
+	async def test_anonymous_users_are_redirected_to_login(self):
+		response = await async_views.dashboard(self.request('/dashboard/', AnonymousUser()))
+		self.assertEqual(response.status_code, 302)
+		self.assertIn(reverse('login'), response.url)
+
+	async def test_dashboard_and_list_render(self):
+		response = await async_views.dashboard(self.request('/dashboard/', self.owner))
+		self.assertContains(response, 'Async meeting')
+		response = await async_views.meeting_list(self.request('/meetings/', self.owner))
+		self.assertContains(response, 'Async meeting')
+
+	async def test_detail_loads_sections_and_answers_conditional_get(self):
+		path = reverse('meeting_detail', args=[self.meeting.pk])
+		response = await async_views.meeting_detail(self.request(path, self.owner), pk=self.meeting.pk)
+		self.assertContains(response, 'Async note')
+		request = self.request(path, self.owner, headers={'If-None-Match': response['ETag']})
+		response = await async_views.meeting_detail(request, pk=self.meeting.pk)
+		self.assertEqual(response.status_code, 304)
+
+	def test_detail_sends_the_same_validators_as_the_sync_view(self):
+		path = reverse('meeting_detail', args=[self.meeting.pk])
+		request = RequestFactory().get(path)
+		request.user, request.session = self.owner, SessionStore()
+		sync = views.meeting_detail(request, pk=self.meeting.pk)
+		response = async_to_sync(async_views.meeting_detail)(self.request(path, self.owner), pk=self.meeting.pk)
+		for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+			self.assertEqual(response[header], sync[header])
+
+	def test_cached_fragments_skip_section_queries(self):
+		path = reverse('meeting_detail', args=[self.meeting.pk])
+		detail = async_to_sync(async_views.meeting_detail)
+		with CaptureQueriesContext(connection) as cold:
+			detail(self.request(path, self.owner), pk=self.meeting.pk)
+		with CaptureQueriesContext(connection) as warm:
+			response = detail(self.request(path, self.owner), pk=self.meeting.pk)
+		self.assertContains(response, 'Async note')
+		self.assertEqual(len(cold.captured_queries), 6)
+		self.assertEqual(len(warm.captured_queries), 1)
+
+	async def test_stranger_is_denied(self):
+		path = reverse('meeting_detail', args=[self.meeting.pk])
+		response = await async_views.meeting_detail(self.request(path, self.stranger), pk=self.meeting.pk)
+		self.assertEqual(response.status_code, 403)
+
+
+class LiveEventTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.stranger = User.objects.create_user('stranger', password='pass')
+		self.meeting = Meeting.objects.create(title='Live', date=timezone.now(), created_by=self.owner)
+		self.broker = events.LocalBroker()
+		patcher = mock.patch.object(events, '_broker', self.broker)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_changes_are_published_after_commit(self):
+		published = []
+		self.broker.publish = lambda meeting_id, event: published.append((meeting_id, event))
+		with self.captureOnCommitCallbacks(execute=True):
+			note = Note.objects.create(meeting=self.meeting, content='Live note', created_by=self.owner)
+			self.assertEqual(published, [])
+		self.assertEqual(published, [(self.meeting.pk, {
+			'type': 'note', 'action': 'created', 'id': note.pk,
+			'content': 'Live note', 'created_by': 'owner',
+		})])
+		with self.captureOnCommitCallbacks(execute=True):
+			attendee = Attendee.objects.create(meeting=self.meeting, user=self.stranger)
+			attendee.status = 'accepted'
+			attendee.save()
+			attendee.delete()
+		self.assertEqual(
+			[(event['type'], event['action']) for _, event in published[1:]],
+			[('attendee', 'created'), ('attendee', 'updated'), ('attendee', 'deleted')],
+		)
+		self.assertEqual(published[2][1]['status_display'], 'Accepted')
+
+	def test_meeting_delete_publishes_one_event(self):
+		published = []
+		self.broker.publish = lambda meeting_id, event: published.append((meeting_id, event))
+		note = Note.objects.create(meeting=self.meeting, content='Live note', created_by=self.owner)
+		Comment.objects.create(note=note, content='Reply', created_by=self.owner)
+		Attendee.objects.create(meeting=self.meeting, user=self.stranger)
+		meeting_id = self.meeting.pk
+		with self.captureOnCommitCallbacks(execute=True):
+			self.meeting.delete()
+		self.assertEqual(published, [(meeting_id, {'type': 'meeting', 'action': 'deleted', 'id': meeting_id})])
+
+	def test_streams_only_open_under_asgi(self):
+		self.client.login(username='owner', password='pass')
+		detail = reverse('meeting_detail', args=[self.meeting.pk])
+		stream = reverse('meeting_events', args=[self.meeting.pk])
+		with override_settings(ASYNC_VIEWS=False):
+			self.assertNotContains(self.client.get(detail), 'data-events-url')
+			self.assertEqual(self.client.get(stream).status_code, 204)
+		with override_settings(ASYNC_VIEWS=True):
+			self.assertContains(self.client.get(detail), f'data-events-url="{stream}"')
+
+	@override_settings(ASYNC_VIEWS=True)
+	async def test_stream_delivers_events_published_from_other_threads(self):
+		request = AsyncRequestFactory().get(f'/meetings/{self.meeting.pk}/events/')
+		request.user = self.owner
+		response = await async_views.meeting_events(request, pk=self.meeting.pk)
+		self.assertEqual(response['Content-Type'], 'text/event-stream')
+		stream = response.streaming_content
+		self.assertTrue((await anext(stream)).startswith(b'retry:'))
+		next_chunk = asyncio.ensure_future(anext(stream))
+		while not self.broker.subscriber_count(self.meeting.pk):
+			await asyncio.sleep(0)
+		event = {'type': 'comment', 'action': 'deleted', 'id': 1}
+		await asyncio.to_thread(self.broker.publish, self.meeting.pk, event)
+		self.assertEqual(await next_chunk, events.format_event(event).encode())
+		await stream.aclose()
+
+	@override_settings(ASYNC_VIEWS=True)
+	async def test_stream_requires_access(self):
+		request = AsyncRequestFactory().get(f'/meetings/{self.meeting.pk}/events/')
+		request.user = self.stranger
+		with self.assertRaises(Http404):
+			await async_views.meeting_events(request, pk=self.meeting.pk)
+
+
+class PerformanceMiddlewareTests(TestCase):
+	def setUp(self):
+		for histogram in instrumentation.HISTOGRAMS:
+			histogram.reset()
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(title='Timed', date=timezone.now(), created_by=self.owner)
+		self.client.login(username='owner', password='pass')
+
+	def test_server_timing_header_reports_queries_and_render_time(self):
+		resp = self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		timing = dict(
+			part.strip().split(';', 1) for part in resp['Server-Timing'].split(',')
+		)
+		self.assertEqual(set(timing), {'db', 'render', 'view', 'total'})
+		self.assertRegex(timing['db'], r'desc="[1-9]\d* queries"')
+
+	def test_requests_are_aggregated_per_url_name(self):
+		self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		self.client.get(reverse('dashboard'))
+		resp = self.client.get(reverse('metrics'))
+		self.assertEqual(resp['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+		body = resp.content.decode()
+		self.assertIn('app_request_duration_seconds_count{view="meeting_detail"} 2', body)
+		self.assertIn('app_request_duration_seconds_count{view="dashboard"} 1', body)
+		self.assertIn('app_request_queries_bucket{view="dashboard",le="+Inf"} 1', body)
+
+	@override_settings(METRICS_TOKEN='secret')
+	def test_metrics_token(self):
+		self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+		resp = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+		self.assertEqual(resp.status_code, 200)
+
+	@override_settings(PERF_SLOW_REQUEST_MS=0.001)
+	def test_slow_requests_are_logged_with_their_sql(self):
+		with self.assertLogs('app.performance', 'WARNING') as logs:
+			self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		self.assertIn('(meeting_detail)', logs.output[0])
+		self.assertIn('SELECT', logs.output[0])
+
+
+# The pre-caching configuration, for comparing the per-request query floor
+UNCACHED_AUTH = {
+	'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+	'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+}
+
+
+class CachedAuthTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(title='Floor', date=timezone.now(), created_by=self.owner)
+
+	def count_queries(self, url):
+		client = Client()
+		client.login(username='owner', password='pass')
+		client.get(url)
+		with CaptureQueriesContext(connection) as ctx:
+			resp = client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def test_query_floor_drops_for_dashboard_and_meeting_detail(self):
+		for url in (reverse('dashboard'), reverse('meeting_detail', args=[self.meeting.pk])):
+			with self.subTest(url=url):
+				with override_settings(**UNCACHED_AUTH):
+					uncached = self.count_queries(url)
+				# No session read and no user fetch
+				self.assertEqual(self.count_queries(url), uncached - 2)
+
+	def test_password_change_ends_other_sessions(self):
+		self.client.login(username='owner', password='pass')
+		self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+		self.owner.set_password('new')
+		self.owner.save()
+		self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
+
+	def test_sessions_from_the_plain_model_backend_stay_signed_in(self):
+		self.client.force_login(self.owner, backend='django.contrib.auth.backends.ModelBackend')
+		self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+		self.client.logout()
+		self.client.login(username='owner', password='pass')
+		self.assertEqual(
+			self.client.session['_auth_user_backend'], 'app.backends.CachedModelBackend'
+		)
+
+	def test_permission_changes_refresh_cached_user(self):
+		backend = backends.CachedModelBackend()
+		group = Group.objects.create(name='editors')
+		permission = Permission.objects.get(codename='change_meeting')
+		backend.get_user(self.owner.pk)
+		with self.assertNumQueries(0):
+			backend.get_user(self.owner.pk)
+		self.owner.groups.add(group)
+		with self.assertNumQueries(1):
+			backend.get_user(self.owner.pk)
+		group.permissions.add(permission)
+		with self.assertNumQueries(1):
+			user = backend.get_user(self.owner.pk)
+		self.assertTrue(user.has_perm('app.change_meeting'))
+
+	def test_messages_are_kept_out_of_the_session(self):
+		self.client.login(username='owner', password='pass')
+		resp = self.client.post(reverse('meeting_create'), {
+			'title': 'New', 'date': '2030-01-01T10:00', 'visibility': Meeting.VISIBILITY_TEAM,
+		})
+		self.assertEqual(resp.status_code, 302)
+		self.assertIn('messages', resp.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+	def setUp(self):
+		self.router = routers.PrimaryReplicaRouter()
+		self.state, token = routers.begin_request()
+		self.addCleanup(routers.end_request, token)
+
+	def test_reads_stay_on_primary_outside_read_only_views(self):
+		self.assertIsNone(self.router.db_for_read(Meeting))
+
+	def test_read_only_views_read_from_replica_until_a_write(self):
+		self.state.use_replica()
+		self.assertEqual(self.router.db_for_read(Meeting), 'replica_1')
+		self.assertEqual(self.router.db_for_write(Meeting), 'default')
+		self.assertIsNone(self.router.db_for_read(Meeting))
+
+	def test_replicas_are_not_migrated(self):
+		self.assertFalse(self.router.allow_migrate('replica_1', 'app'))
+		self.assertIsNone(self.router.allow_migrate('default', 'app'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingMiddlewareTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(title='Routed', date=timezone.now(), created_by=self.owner)
+		self.client.login(username='owner', password='pass')
+
+	def test_read_only_views_use_replica_unless_pinned(self):
+		url = reverse('meeting_detail', args=[self.meeting.pk])
+		with mock.patch.object(routers.RoutingState, 'use_replica') as use_replica:
+			self.client.get(url)
+			use_replica.assert_called_once()
+			self.client.get(reverse('meeting_edit', args=[self.meeting.pk]))
+			use_replica.assert_called_once()
+			self.client.cookies[routers.PIN_COOKIE] = '1'
+			self.client.get(url)
+			use_replica.assert_called_once()
+
+	def test_writes_pin_the_user_to_the_primary(self):
+		resp = self.client.post(
+			reverse('note_create', args=[self.meeting.pk]), {'content': 'Fresh note'}
+		)
+		self.assertEqual(resp.cookies[routers.PIN_COOKIE]['max-age'], routers.pin_seconds())
+		resp = self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		self.assertNotIn(routers.PIN_COOKIE, resp.cookies)
+
+
+# Run with REPLICA_DATABASE_URLS=sqlite:///replica.sqlite3; the replica then
+# mirrors the test database, which only sees committed data
+@skipUnless(settings.DATABASE_REPLICAS, 'needs REPLICA_DATABASE_URLS')
+class ReplicaReadsTests(TransactionTestCase):
+	databases = '__all__'
+
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(title='Replicated', date=timezone.now(), created_by=self.owner)
+		self.client.login(username='owner', password='pass')
+		self.url = reverse('meeting_detail', args=[self.meeting.pk])
+
+	def replica_queries(self, request):
+		replica = connections[settings.DATABASE_REPLICAS[0]]
+		with CaptureQueriesContext(replica) as ctx:
+			resp = request()
+		self.assertLess(resp.status_code, 400)
+		return len(ctx.captured_queries)
+
+	def test_reads_follow_the_replica_until_the_user_writes(self):
+		with override_settings(DATABASE_REPLICAS=settings.DATABASE_REPLICAS[:1]):
+			self.assertGreater(self.replica_queries(lambda: self.client.get(self.url)), 0)
+			self.assertEqual(self.replica_queries(lambda: self.client.post(
+				reverse('note_create', args=[self.meeting.pk]), {'content': 'Mine'}
+			)), 0)
+			self.assertEqual(self.replica_queries(lambda: self.client.get(self.url)), 0)
+			self.assertContains(self.client.get(self.url), 'Mine')
+
+
+class AttachmentBlobTests(TestCase):
+	def setUp(self):
+		location = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, location)
+		storages = dict(settings.STORAGES, attachments={
+			'BACKEND': 'django.core.files.storage.FileSystemStorage',
+			'OPTIONS': {'location': location},
+		})
+		override = override_settings(STORAGES=storages)
+		override.enable()
+		self.addCleanup(override.disable)
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meetings = [
+			Meeting.objects.create(title=f'Weekly {i}', date=timezone.now(), created_by=self.owner)
+			for i in range(2)
+		]
+		self.client.login(username='owner', password='pass')
+
+	def upload(self, meeting, content=b'0123456789', name='deck.pdf'):
+		return self.client.post(reverse('attachment_upload', args=[meeting.pk]), {
+			'file': SimpleUploadedFile(name, content, content_type='application/pdf'),
+		})
+
+	def test_identical_uploads_are_stored_once(self):
+		for meeting in self.meetings:
+			self.assertEqual(self.upload(meeting).status_code, 302)
+		blob = Blob.objects.get()
+		self.assertEqual(blob.pk, hashlib.sha256(b'0123456789').hexdigest())
+		self.assertEqual(blob.size, 10)
+		self.assertEqual(blob.attachments.count(), 2)
+		self.assertTrue(blobs.storage().exists(blobs.blob_name(blob.pk)))
+		self.assertEqual(blobs.delete_orphans(), 0)
+		Attachment.objects.all().delete()
+		self.assertEqual(blobs.delete_orphans(), 1)
+		self.assertFalse(blobs.storage().exists(blobs.blob_name(blob.pk)))
+
+	def test_concurrent_store_of_the_same_content_keeps_one_file(self):
+		content = b'0123456789'
+		name = blobs.blob_name(hashlib.sha256(content).hexdigest())
+		storage = blobs.storage()
+		exists = storage.exists
+
+		def other_upload_finishes_first(path):
+			# The other upload's file appears just after the existence check
+			storage.exists = exists
+			storage.save(name, ContentFile(content))
+			return False
+
+		with mock.patch.object(storage, 'exists', other_upload_finishes_first):
+			self.assertEqual(self.upload(self.meetings[0], content).status_code, 302)
+		directory = name.rsplit('/', 1)[0]
+		self.assertEqual(blobs.storage().listdir(directory)[1], [name.rsplit('/', 1)[1]])
+
+	def test_orphan_cleanup_rechecks_under_the_row_lock(self):
+		self.upload(self.meetings[0])
+		attachment = Attachment.objects.get()
+		blob = attachment.blob
+		attachment.delete()
+		select_for_update = Blob.objects.select_for_update
+
+		def reused_meanwhile(*args, **kwargs):
+			Attachment.objects.create(meeting=self.meetings[1], name='again', blob=blob)
+			return select_for_update(*args, **kwargs)
+
+		with mock.patch.object(Blob.objects, 'select_for_update', reused_meanwhile):
+			self.assertEqual(blobs.delete_orphans(), 0)
+		self.assertTrue(blobs.storage().exists(blobs.blob_name(blob.pk)))
+
+	def test_download_supports_ranges_and_strong_etags(self):
+		self.upload(self.meetings[0])
+		attachment = Attachment.objects.get()
+		url = reverse('attachment_download', args=[attachment.pk])
+		resp = self.client.get(url)
+		self.assertEqual(b''.join(resp.streaming_content), b'0123456789')
+		self.assertEqual(resp['ETag'], f'"{attachment.blob_id}"')
+		self.assertEqual(resp['Accept-Ranges'], 'bytes')
+		self.assertIn('attachment; filename="deck.pdf"', resp['Content-Disposition'])
+
+		resp = self.client.get(url, HTTP_RANGE='bytes=2-5')
+		self.assertEqual(resp.status_code, 206)
+		self.assertEqual(resp['Content-Range'], 'bytes 2-5/10')
+		self.assertEqual(b''.join(resp.streaming_content), b'2345')
+		resp = self.client.get(url, HTTP_RANGE='bytes=-3')
+		self.assertEqual(b''.join(resp.streaming_content), b'789')
+		resp = self.client.get(url, HTTP_RANGE='bytes=20-')
+		self.assertEqual(resp.status_code, 416)
+		self.assertEqual(resp['Content-Range'], 'bytes */10')
+		resp = self.client.get(url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+		self.assertEqual(resp.status_code, 200)
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{attachment.blob_id}"')
+		self.assertEqual(resp.status_code, 304)
+
+	@override_settings(ATTACHMENT_MAX_UPLOAD_SIZE=5)
+	def test_oversized_uploads_are_rejected(self):
+		resp = self.upload(self.meetings[0])
+		self.assertContains(resp, 'Files can be at most')
+		self.assertFalse(Attachment.objects.exists())
+
+	def test_downloads_follow_meeting_visibility(self):
+		self.upload(self.meetings[0])
+		User.objects.create_user('stranger', password='pass')
+		self.client.login(username='stranger', password='pass')
+		url = reverse('attachment_download', args=[Attachment.objects.get().pk])
+		self.assertEqual(self.client.get(url).status_code, 403)
+
+	def test_public_link_authorizes_downloads(self):
+		self.upload(self.meetings[0])
+		attachment = Attachment.objects.get()
+		self.meetings[0].ensure_public_token()
+		self.client.logout()
+		resp = self.client.get(reverse('meeting_public', args=[self.meetings[0].public_token]))
+		url = reverse('public_attachment_download', args=[self.meetings[0].public_token, attachment.pk])
+		self.assertContains(resp, url)
+		resp = self.client.get(url)
+		self.assertEqual(b''.join(resp.streaming_content), b'0123456789')
+		self.meetings[1].ensure_public_token()
+		url = reverse('public_attachment_download', args=[self.meetings[1].public_token, attachment.pk])
+		self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class RenderedContentTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(
+			title='Formatted', date=timezone.now(), created_by=self.owner, visibility=Meeting.VISIBILITY_TEAM
+		)
+
+	def test_markdown_is_rendered_safely(self):
+		html = rendering.render(
+			'# Agenda\n\n- **Budget** review\n- `code` <b>\n\n'
+			'<script>alert(1)</script> [docs](https://example.com/?a=1&b=2) '
+			'[bad](javascript:alert(1))\n\n```\n<i>raw</i>\n```'
+		)
+		self.assertIn('<h1>Agenda</h1>', html)
+		self.assertIn('<li><strong>Budget</strong> review</li>', html)
+		self.assertIn('<code>code</code> &lt;b&gt;', html)
+		self.assertIn('&lt;script&gt;alert(1)&lt;/script&gt;', html)
+		self.assertIn('<a href="https://example.com/?a=1&amp;b=2" rel="nofollow noopener">docs</a>', html)
+		self.assertNotIn('href="javascript', html)
+		self.assertIn('<pre><code>&lt;i&gt;raw&lt;/i&gt;</code></pre>', html)
+
+	def test_deeply_nested_quotes_are_capped(self):
+		note = Note.objects.create(meeting=self.meeting, content='>' * 1500 + ' x', created_by=self.owner)
+		self.assertEqual(note.content_html.count('<blockquote>'), rendering.MAX_QUOTE_DEPTH)
+		self.assertIn('&gt;&gt;', note.content_html)
+
+	def test_unclosed_markup_renders_in_linear_time(self):
+		for text in ['_a ' * 20000, '__a ' * 15000, '[a' * 20000, '[a](b' * 12000, '# a' + ' ' * 30000 + 'b']:
+			started = time.perf_counter()
+			rendering.render(text)
+			self.assertLess(time.perf_counter() - started, 1, text[:10])
+		self.assertEqual(rendering.render('_a_ __b__ snake_case_name'), '<p><em>a</em> <strong>b</strong> snake_case_name</p>')
+		self.assertEqual(rendering.render('## C# notes ##'), '<h2>C# notes</h2>')
+
+	def test_content_is_rendered_on_save(self):
+		note = Note.objects.create(meeting=self.meeting, content='*hello*', created_by=self.owner)
+		comment = Comment.objects.create(note=note, content='~~old~~', created_by=self.owner)
+		note.content = '**hello**'
+		note.save(update_fields=['content'])
+		note.refresh_from_db()
+		comment.refresh_from_db()
+		self.assertEqual(note.content_html, '<p><strong>hello</strong></p>')
+		self.assertEqual(note.content_renderer, rendering.RENDERER_VERSION)
+		self.assertEqual(comment.content_html, '<p><del>old</del></p>')
+
+	def test_stale_rows_are_rerendered_once_and_saved_in_the_background(self):
+		note = Note.objects.create(meeting=self.meeting, content='*fresh*', created_by=self.owner)
+		Note.objects.filter(pk=note.pk).update(content_html='<p>old</p>', content_renderer=0)
+		self.client.login(username='owner', password='pass')
+		with mock.patch.object(rendering, '_submit', lambda function, *args: function(*args)):
+			with self.captureOnCommitCallbacks(execute=True):
+				resp = self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		self.assertContains(resp, '<em>fresh</em>')
+		note.refresh_from_db()
+		self.assertEqual(note.content_html, '<p><em>fresh</em></p>')
+		self.assertEqual(note.content_renderer, rendering.RENDERER_VERSION)
+
+	def test_rerender_command_backfills_stale_rows(self):
+		note = Note.objects.create(meeting=self.meeting, content='_a_', created_by=self.owner)
+		Comment.objects.create(note=note, content='b', created_by=self.owner)
+		Note.objects.update(content_html='', content_renderer=0)
+		out = StringIO()
+		call_command('rerender_content', stdout=out)
+		self.assertIn('notes: re-rendered 1', out.getvalue())
+		self.assertIn('comments: re-rendered 0', out.getvalue())
+		self.assertEqual(Note.objects.get().content_html, '<p><em>a</em></p>')
+
+
+class NoteRevisionTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(title='Edited', date=timezone.now(), created_by=self.owner)
+		self.note = Note.objects.create(meeting=self.meeting, content='line 0\n', created_by=self.owner)
+
+	def edit(self, count):
+		self.note.content = ''.join(f'Agenda item {i} for the weekly sync\n' for i in range(20))
+		texts = [self.note.content]
+		revisions.record(self.note, self.owner)
+		for i in range(1, count):
+			lines = texts[-1].splitlines(keepends=True)
+			lines.insert(i % (len(lines) + 1), f'line {i}\n')
+			if i % 3 == 0:
+				lines[0] = f'changed {i}\n'
+			self.note.content = ''.join(lines)
+			self.note.save()
+			revisions.record(self.note, self.owner)
+			texts.append(self.note.content)
+		return texts
+
+	def test_every_revision_is_rebuilt_from_a_nearby_snapshot(self):
+		texts = self.edit(25)
+		stored = list(self.note.revisions.all())
+		self.assertEqual([revision.number for revision in stored], list(range(1, 26)))
+		self.assertEqual([r.number for r in stored if r.is_snapshot], [1, 11, 21])
+		for number, text in enumerate(texts, start=1):
+			with self.assertNumQueries(1):
+				self.assertEqual(revisions.text_at(self.note, number), text)
+
+	def test_edit_view_records_history_and_diffs_any_two_revisions(self):
+		self.client.login(username='owner', password='pass')
+		self.client.post(reverse('note_edit', args=[self.note.pk]), {'content': 'line 0\nline 1\n'})
+		self.client.post(reverse('note_edit', args=[self.note.pk]), {'content': 'line 1\nline 2\n'})
+		self.assertEqual(
+			[r.edited_by for r in self.note.revisions.all()], [self.owner, self.owner, self.owner]
+		)
+		resp = self.client.get(reverse('note_history', args=[self.note.pk]), {'from': 1, 'to': 3})
+		self.assertEqual(resp.context['diff'][2:], ['@@ -1 +1,2 @@', '-line 0', '+line 1', '+line 2'])
+		resp = self.client.get(reverse('note_history', args=[self.note.pk]), {'from': 1, 'to': 9})
+		self.assertEqual(resp.status_code, 400)
+
+	def test_compaction_keeps_daily_and_latest_revisions_rebuildable(self):
+		texts = self.edit(30)
+		start = timezone.now() - timezone.timedelta(days=10)
+		for revision in self.note.revisions.all():
+			NoteRevision.objects.filter(pk=revision.pk).update(
+				created_at=start + timezone.timedelta(hours=8 * revision.number)
+			)
+		out = StringIO()
+		call_command('compact_note_revisions', keep=5, stdout=out)
+		kept = list(self.note.revisions.all())
+		self.assertIn(f'deleted {30 - len(kept)} revisions', out.getvalue())
+		self.assertLess(len(kept), 20)
+		self.assertEqual(kept[0].number, 1)
+		self.assertEqual([r.number for r in kept[-5:]], list(range(26, 31)))
+		for revision in kept:
+			self.assertEqual(revisions.text_at(self.note, revision.number), texts[revision.number - 1])
+		revisions.record(self.note, self.owner)
+		self.note.content += 'after compaction\n'
+		revisions.record(self.note, self.owner)
+		self.assertEqual(revisions.text_at(self.note, 31), self.note.content)
+
+
+class CommentThreadTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.meeting = Meeting.objects.create(title='Chatty', date=timezone.now(), created_by=self.owner)
+		self.note = Note.objects.create(meeting=self.meeting, content='Busy note', created_by=self.owner)
+		self.comments = [
+			Comment.objects.create(note=self.note, content=f'Comment {i}', created_by=self.owner)
+			for i in range(12)
+		]
+
+	def test_page_shows_latest_comments_oldest_first(self):
+		self.client.login(username='owner', password='pass')
+		resp = self.client.get(reverse('meeting_detail', args=[self.meeting.pk]))
+		content = resp.content.decode()
+		shown = [f'Comment {i}' for i in range(7, 12)]
+		self.assertEqual(
+			[c for c in (f'Comment {i}' for i in range(12)) if f'<p>{c}</p>' in content], shown
+		)
+		self.assertLess(content.index('<p>Comment 7</p>'), content.index('<p>Comment 11</p>'))
+		self.assertContains(resp, 'data-load-comments=')
+
+	def test_first_comments_of_all_notes_take_one_query(self):
+		for i in range(4):
+			note = Note.objects.create(meeting=self.meeting, content=f'Note {i}', created_by=self.owner)
+			Comment.objects.create(note=note, content='Reply', created_by=self.owner)
+		notes = loaders.meeting_sections(self.meeting)['notes']
+		with self.assertNumQueries(2):
+			notes = list(notes)
+		self.assertEqual(
+			sorted((note.comment_total, len(note.latest_comments)) for note in notes),
+			[(1, 1)] * 4 + [(12, loaders.COMMENTS_PER_NOTE)],
+		)
+
+	def test_load_more_walks_every_comment_once(self):
+		self.client.login(username='owner', password='pass')
+		url = reverse('note_comments', args=[self.note.pk])
+		resp = self.client.get(url)
+		seen = list(resp.context['comments'])
+		while resp.context['page'].has_next:
+			resp = self.client.get(url, {'cursor': resp.context['page'].next_cursor})
+			seen = list(resp.context['comments']) + seen
+		self.assertEqual(seen, self.comments)
+
+	def test_outsider_cannot_load_comments(self):
+		User.objects.create_user('outsider', password='pass')
+		self.client.login(username='outsider', password='pass')
+		resp = self.client.get(reverse('note_comments', args=[self.note.pk]))
+		self.assertEqual(resp.status_code, 403)
+
+	def test_public_link_visitors_can_load_earlier_comments(self):
+		self.meeting.ensure_public_token()
+		token = self.meeting.public_token
+		resp = self.client.get(reverse('meeting_public', args=[token]))
+		self.assertContains(resp, 'data-load-comments="%s' % reverse('public_note_comments', args=[token, self.note.pk]))
+		url = reverse('public_note_comments', args=[token, self.note.pk])
+		resp = self.client.get(url)
+		seen = list(resp.context['comments'])
+		while resp.context['page'].has_next:
+			resp = self.client.get(url, {'cursor': resp.context['page'].next_cursor})
+			self.assertNotContains(resp, reverse('comment_edit', args=[self.comments[0].pk]))
+			seen = list(resp.context['comments']) + seen
+		self.assertEqual(seen, self.comments)
+		other = Meeting.objects.create(title='Other', date=timezone.now(), created_by=self.owner)
+		other.ensure_public_token()
+		url = reverse('public_note_comments', args=[other.public_token, self.note.pk])
+		self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ActionItemInboxTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.other = User.objects.create_user('other', password='pass')
+		self.meetings = [
+			Meeting.objects.create(
+				title=f'Sync {i}', date=timezone.now(), created_by=self.other, visibility=Meeting.VISIBILITY_TEAM
+			)
+			for i in range(2)
+		]
+		self.items = [
+			ActionItem.objects.create(meeting=self.meetings[i % 2], title=f'Task {i}', assigned_to=self.owner)
+			for i in range(4)
+		]
+		self.foreign = ActionItem.objects.create(meeting=self.meetings[0], title='Not mine', assigned_to=self.other)
+
+	def counts(self):
+		return [
+			Meeting.objects.values_list('open_action_item_count', 'version').get(pk=meeting.pk)
+			for meeting in self.meetings
+		]
+
+	def test_inbox_groups_the_users_items_by_meeting(self):
+		self.client.login(username='owner', password='pass')
+		resp = self.client.get(reverse('action_item_inbox'))
+		groups = resp.context['groups']
+		self.assertEqual([meeting for meeting, _ in groups], [self.meetings[1], self.meetings[0]])
+		self.assertEqual(
+			[[item.title for item in items] for _, items in groups],
+			[['Task 3', 'Task 1'], ['Task 2', 'Task 0']],
+		)
+		self.assertNotContains(resp, 'Not mine')
+
+	def test_bulk_complete_is_one_update_and_keeps_counters(self):
+		before = self.counts()
+		ids = [item.pk for item in self.items[:3]] + [self.foreign.pk]
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(action_items.complete(self.owner, ids), 3)
+		updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "app_actionitem"')]
+		self.assertEqual(len(updates), 1)
+		after = self.counts()
+		self.assertEqual([a[0] - b[0] for a, b in zip(after, before)], [-2, -1])
+		self.assertTrue(all(a[1] > b[1] for a, b in zip(after, before)))
+		self.assertFalse(ActionItem.objects.get(pk=self.foreign.pk).completed)
+		self.assertEqual(counters.recount(Meeting.objects.all()), 0)
+
+		self.assertEqual(action_items.reopen(self.owner, ids), 3)
+		self.assertEqual(self.counts()[0][0], before[0][0])
+		self.assertEqual(counters.recount(Meeting.objects.all()), 0)
+
+	def test_bulk_reassign_view(self):
+		self.client.login(username='owner', password='pass')
+		resp = self.client.post(reverse('action_item_inbox'), {
+			'action': 'reassign', 'items': [self.items[0].pk, self.items[1].pk], 'assignee': 'other',
+		})
+		self.assertEqual(resp.status_code, 302)
+		self.assertEqual(
+			list(ActionItem.objects.filter(assigned_to=self.owner).order_by('pk')), self.items[2:]
+		)
+		resp = self.client.post(reverse('action_item_inbox'), {'action': 'reassign', 'items': [self.items[2].pk]})
+		self.assertEqual(resp.status_code, 200)
+		self.assertTrue(resp.context['form'].errors['assignee'])
+
+	def test_create_view_assigns_and_counts(self):
+		self.client.login(username='owner', password='pass')
+		meeting = self.meetings[0]
+		resp = self.client.post(reverse('action_item_create', args=[meeting.pk]), {
+			'title': 'Write minutes', 'assigned_to': 'other',
+		})
+		self.assertRedirects(resp, reverse('meeting_detail', args=[meeting.pk]))
+		item = ActionItem.objects.get(title='Write minutes')
+		self.assertEqual(item.assigned_to, self.other)
+		self.assertEqual(Meeting.objects.get(pk=meeting.pk).open_action_item_count, 4)
+
+
+class CalendarFeedTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.owner = User.objects.create_user('owner', email='owner@example.com', password='pass')
+		self.guest = User.objects.create_user('guest', password='pass')
+		self.created = Meeting.objects.create(
+			title='Planning, Q3', date=timezone.now(), created_by=self.owner, location='Room; 4'
+		)
+		other = Meeting.objects.create(title='Retro', date=timezone.now(), created_by=self.guest)
+		self.attending = Attendee.objects.create(meeting=other, user=self.owner, status='tentative')
+		Meeting.objects.create(title='Unrelated', date=timezone.now(), created_by=self.guest)
+		self.token = CalendarToken.objects.create(user=self.owner)
+		self.url = reverse('calendar_feed', args=[self.token.token])
+
+	def fetch(self, **headers):
+		resp = self.client.get(self.url, **headers)
+		body = b''.join(resp.streaming_content).decode() if resp.streaming else ''
+		return resp, body
+
+	def test_feed_lists_created_and_attended_meetings(self):
+		resp, body = self.fetch()
+		self.assertEqual(resp['Content-Type'], 'text/calendar; charset=utf-8')
+		self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n'))
+		self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+		self.assertIn('SUMMARY:Planning\\, Q3\r\n', body)
+		self.assertIn('LOCATION:Room\\; 4\r\n', body)
+		self.assertIn('ATTENDEE;CN="owner";PARTSTAT=TENTATIVE:mailto:owner@example.com\r\n', body)
+		self.assertNotIn('Unrelated', body)
+		self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+	def test_unchanged_feed_revalidates_with_304(self):
+		resp, _ = self.fetch()
+		resp, body = self.fetch(HTTP_IF_NONE_MATCH=resp['ETag'])
+		self.assertEqual(resp.status_code, 304)
+		self.attending.status = 'accepted'
+		self.attending.save()
+		resp, body = self.fetch(HTTP_IF_NONE_MATCH=resp['ETag'])
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('PARTSTAT=ACCEPTED', body)
+
+	def test_etag_changes_when_meetings_swap_places_in_the_feed(self):
+		meetings = [
+			Meeting.objects.create(title=f'Swap {i}', date=timezone.now(), created_by=self.guest)
+			for i in range(5)
+		]
+		# Stays in the feed, so the newest meeting doesn't change either
+		Attendee.objects.create(meeting=meetings[4], user=self.owner)
+
+		def attend(*indexes):
+			Attendee.objects.filter(user=self.owner, meeting__in=meetings[:4]).delete()
+			for i in indexes:
+				Attendee.objects.create(meeting=meetings[i], user=self.owner)
+			# Same count, pk sum and version sum either way
+			Meeting.objects.update(calendar_version=5)
+			return ics.feed_etag(self.owner)
+
+		self.assertNotEqual(attend(0, 3), attend(1, 2))
+
+	def test_events_are_rebuilt_only_for_changed_meetings(self):
+		self.fetch()
+		Note.objects.create(meeting=self.created, content='Not in the feed', created_by=self.owner)
+		with mock.patch('app.ics.render_event', wraps=ics.render_event) as render_event:
+			self.fetch()
+			self.assertEqual(render_event.call_count, 0)
+			self.attending.delete()
+			_, body = self.fetch()
+			self.assertEqual(render_event.call_count, 0)
+			self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+			Attendee.objects.create(meeting=self.created, user=self.guest)
+			_, body = self.fetch()
+			self.assertEqual(render_event.call_count, 1)
+			self.assertIn('CN="guest";PARTSTAT=NEEDS-ACTION', body)
+
+	def test_feed_is_read_in_batches(self):
+		for i in range(5):
+			Meeting.objects.create(title=f'Standup {i}', date=timezone.now(), created_by=self.owner)
+		with mock.patch.object(ics, 'BATCH_SIZE', 2):
+			_, body = self.fetch()
+		self.assertEqual(body.count('BEGIN:VEVENT'), 7)
+
+	def test_rotated_token_stops_working(self):
+		self.client.login(username='owner', password='pass')
+		self.client.post(reverse('calendar_feed_settings'), {'action': 'rotate'})
+		self.assertEqual(self.client.get(self.url).status_code, 404)
+		resp = self.client.get(reverse('calendar_feed_settings'))
+		self.assertContains(resp, CalendarToken.objects.get(user=self.owner).token)
+
+
+class RecurrenceTests(TestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user('owner', password='pass')
+		self.start = timezone.now().replace(microsecond=0) - timezone.timedelta(days=60)
+
+	def series(self, **fields):
+		fields = {
+			'title': 'Standup', 'start': self.start, 'frequency': MeetingSeries.FREQUENCY_DAILY,
+			'created_by': self.owner, 'visibility': Meeting.VISIBILITY_TEAM, **fields,
+		}
+		return MeetingSeries.objects.create(**fields)
+
+	def test_windowed_expansion_matches_full_expansion(self):
+		weekday = recurrence.WEEKDAYS[self.start.weekday()]
+		rules = [
+			{'interval': 3},
+			{'frequency': MeetingSeries.FREQUENCY_WEEKLY, 'interval': 2, 'weekdays': f'{weekday},SU'},
+			{'frequency': MeetingSeries.FREQUENCY_MONTHLY, 'start': self.start.replace(month=1, day=31)},
+		]
+		for fields in rules:
+			series = self.series(**fields)
+			end = series.start + timezone.timedelta(days=800)
+			everything = list(recurrence.occurrences(series, None, end))
+			self.assertEqual(everything[0], series.start)
+			for offset in (0, 1, 45, 200, 613):
+				window_start = series.start + timezone.timedelta(days=offset, hours=5)
+				window_end = window_start + timezone.timedelta(days=70)
+				self.assertEqual(
+					list(recurrence.occurrences(series, window_start, window_end)),
+					[moment for moment in everything if window_start <= moment < window_end],
+				)
+		monthly = list(recurrence.occurrences(series, None, series.start + timezone.timedelta(days=365)))
+		self.assertTrue(all(moment.day == 31 for moment in monthly))
+		self.assertEqual(len(monthly), 7)
+
+	def test_count_and_until_end_the_series(self):
+		counted = self.series(count=4)
+		self.assertEqual(len(list(recurrence.occurrences(counted))), 4)
+		self.assertEqual(list(recurrence.occurrences(counted, self.start + timezone.timedelta(days=2))), [
+			self.start + timezone.timedelta(days=2), self.start + timezone.timedelta(days=3),
+		])
+		until = self.series(until=self.start + timezone.timedelta(days=6, hours=1))
+		self.assertEqual(len(list(recurrence.occurrences(until))), 7)
+
+	@override_settings(TIME_ZONE='Europe/Berlin')
+	def test_occurrences_keep_local_time_across_dst(self):
+		start = timezone.make_aware(timezone.datetime(2026, 3, 23, 9, 0))
+		series = self.series(start=start, frequency=MeetingSeries.FREQUENCY_WEEKLY, count=3)
+		self.assertEqual(
+			[timezone.localtime(moment).hour for moment in recurrence.occurrences(series)], [9, 9, 9]
+		)
+		self.assertEqual(
+			[moment.utcoffset().total_seconds() / 3600 for moment in recurrence.occurrences(series)],
+			[1, 2, 2],
+		)
+
+	def test_pages_merge_meetings_and_occurrences_in_both_directions(self):
+		series = self.series(interval=2)
+		for days in range(-60, 100, 7):
+			Meeting.objects.create(
+				title='One-off', date=timezone.now() + timezone.timedelta(days=days), created_by=self.owner
+			)
+		opened = recurrence.materialize(series, self.start + timezone.timedelta(days=4))
+		recurrence.cancel(series, self.start + timezone.timedelta(days=6))
+		series.refresh_from_db()
+		paginator = recurrence.OccurrencePaginator(
+			Meeting.objects.filter(created_by=self.owner), MeetingSeries.objects.all(), per_page=7
+		)
+		pages = [paginator.page()]
+		while pages[-1].has_next:
+			pages.append(paginator.page(pages[-1].next_cursor))
+		items = [item for page in pages for item in page]
+		keys = [(item.date, not item.is_virtual) for item in items]
+		self.assertEqual(keys, sorted(keys, reverse=True))
+		virtual = [item.date for item in items if item.is_virtual]
+		horizon = recurrence.horizon()
+		self.assertLessEqual(virtual[0], horizon)
+		self.assertEqual(
+			virtual[::-1],
+			[m for m in recurrence.occurrences(series, None, horizon) if m not in (opened.date, self.start + timezone.timedelta(days=6))],
+		)
+		self.assertIn(opened, items)
+		self.assertEqual(len(items), len(virtual) + Meeting.objects.count())
+		backwards = [pages[-1]]
+		while backwards[-1].has_previous:
+			backwards.append(paginator.page(backwards[-1].previous_cursor))
+		self.assertEqual(
+			[list(page) for page in backwards[::-1]], [list(page) for page in pages]
+		)
+
+	def test_occurrence_is_stored_only_when_opened(self):
+		series = self.series()
+		moment = self.start + timezone.timedelta(days=3)
+		url = reverse('occurrence_detail', args=[series.pk, recurrence.format_stamp(moment)])
+		User.objects.create_user('guest', password='pass')
+		self.client.login(username='guest', password='pass')
+		self.assertEqual(self.client.get(url).status_code, 200)
+		self.assertFalse(Meeting.objects.exists())
+		self.assertEqual(self.client.post(url, {'action': 'cancel'}).status_code, 403)
+		resp = self.client.post(url, {'action': 'open'})
+		meeting = Meeting.objects.get(series=series)
+		self.assertRedirects(resp, reverse('meeting_detail', args=[meeting.pk]))
+		self.assertEqual((meeting.date, meeting.created_by), (moment, self.owner))
+		self.assertRedirects(self.client.get(url), reverse('meeting_detail', args=[meeting.pk]))
+		off_schedule = reverse('occurrence_detail', args=[series.pk, recurrence.format_stamp(moment + timezone.timedelta(hours=1))])
+		self.assertEqual(self.client.get(off_schedule).status_code, 404)
+
+	def test_owner_cancels_an_occurrence(self):
+		series = self.series()
+		moment = self.start + timezone.timedelta(days=1)
+		self.client.login(username='owner', password='pass')
+		url = reverse('occurrence_detail', args=[series.pk, recurrence.format_stamp(moment)])
+		self.client.post(url, {'action': 'cancel'})
+		self.assertEqual(self.client.get(url).status_code, 404)
+		resp = self.client.get(reverse('dashboard'))
+		self.assertTrue(all(item.date != moment for item in resp.context['meetings']))
+
+	def test_calendar_feed_publishes_rule_and_exceptions(self):
+		series = self.series(count=10)
+		recurrence.materialize(series, self.start + timezone.timedelta(days=2))
+		recurrence.cancel(series, self.start + timezone.timedelta(days=5))
+		token = CalendarToken.objects.create(user=self.owner)
+		resp = self.client.get(reverse('calendar_feed', args=[token.token]))
+		body = b''.join(resp.streaming_content).decode()
+		self.assertIn('RRULE:FREQ=DAILY;INTERVAL=1;COUNT=10\r\n', body)
+		self.assertEqual(body.count('EXDATE:'), 2)
+		self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+
+	@override_settings(TIME_ZONE='Europe/Berlin')
+	def test_calendar_feed_defines_the_time_zone_it_refers_to(self):
+		self.series(start=timezone.make_aware(timezone.datetime(2026, 3, 23, 9, 0)))
+		token = CalendarToken.objects.create(user=self.owner)
+		resp = self.client.get(reverse('calendar_feed', args=[token.token]))
+		body = b''.join(resp.streaming_content).decode()
+		self.assertIn('DTSTART;TZID=Europe/Berlin:20260323T090000\r\n', body)
+		self.assertEqual(body.count('BEGIN:VTIMEZONE'), 1)
+		self.assertIn('TZID:Europe/Berlin\r\n', body)
+		self.assertIn(
+			'BEGIN:DAYLIGHT\r\nDTSTART:20260329T020000\r\nTZOFFSETFROM:+0100\r\nTZOFFSETTO:+0200\r\n', body
+		)
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import async_views, views
+
+# Read-heavy pages can be served by coroutine views under ASGI
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.index, name='index'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', read_views.dashboard, name='dashboard'),
     path(
         'login/',
         auth_views.LoginView.as_view(template_name='login.html'),
@@ -12,14 +16,39 @@ urlpatterns = [
     ),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('register/', views.register, name='register'),
-    path('meetings/', views.meeting_list, name='meeting_list'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('meetings/', read_views.meeting_list, name='meeting_list'),
+    path('search/', views.search, name='search'),
+    path('users/autocomplete/', views.user_autocomplete, name='user_autocomplete'),
+    path('meetings/export/', views.meeting_export, name='meeting_export'),
     path('meetings/create/', views.meeting_create, name='meeting_create'),
-    path('meetings/<int:pk>/', views.meeting_detail, name='meeting_detail'),
+    path('series/create/', views.series_create, name='series_create'),
+    path('series/<int:pk>/<str:stamp>/', views.occurrence_detail, name='occurrence_detail'),
+    path('meetings/<int:pk>/', read_views.meeting_detail, name='meeting_detail'),
+    path('meetings/<int:pk>/events/', async_views.meeting_events, name='meeting_events'),
     path(
         'meetings/<int:pk>/edit/',
         views.meeting_edit,
         name='meeting_edit'
     ),
+    path(
+        'meetings/<int:pk>/public/',
+        views.meeting_public_toggle,
+        name='meeting_public_toggle'
+    ),
+    path('p/<str:token>/', views.meeting_public, name='meeting_public'),
+    path(
+        'p/<str:token>/attachments/<int:pk>/',
+        views.public_attachment_download,
+        name='public_attachment_download'
+    ),
+    path(
+        'p/<str:token>/notes/<int:pk>/comments/',
+        views.public_note_comments,
+        name='public_note_comments'
+    ),
+    path('calendar/', views.calendar_feed_settings, name='calendar_feed_settings'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     path(
         'meetings/<int:pk>/delete/',
         views.meeting_delete,
@@ -31,6 +60,8 @@ urlpatterns = [
         name='note_create'
     ),
     path('notes/<int:pk>/edit/', views.note_edit, name='note_edit'),
+    path('notes/<int:pk>/history/', views.note_history, name='note_history'),
+    path('notes/<int:pk>/comments/', views.note_comments, name='note_comments'),
     path('notes/<int:pk>/delete/', views.note_delete, name='note_delete'),
     path('notes/<int:note_id>/comments/add/', views.comment_create, name='comment_create'),
     path('comments/<int:pk>/edit/', views.comment_edit, name='comment_edit'),
@@ -40,6 +71,11 @@ urlpatterns = [
         views.attendee_add,
         name='attendee_add'
     ),
+    path(
+        'meetings/<int:meeting_id>/attendees/bulk/',
+        views.attendee_bulk_add,
+        name='attendee_bulk_add'
+    ),
     path(
         'attendees/<int:pk>/remove/',
         views.attendee_remove,
@@ -50,4 +86,20 @@ urlpatterns = [
         views.attendee_update_status,
         name='attendee_update_status'
     ),
+    path(
+        'meetings/<int:meeting_id>/action-items/add/',
+        views.action_item_create,
+        name='action_item_create'
+    ),
+    path('action-items/', views.action_item_inbox, name='action_item_inbox'),
+    path(
+        'meetings/<int:meeting_id>/attachments/upload/',
+        views.attachment_upload,
+        name='attachment_upload'
+    ),
+    path(
+        'attachments/<int:pk>/download/',
+        views.attachment_download,
+        name='attachment_download'
+    ),
 ]
@@ -1,12 +1,38 @@
+import json
+
+from django.conf import settings
+
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.template.loader import render_to_string
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from .models import Meeting, Note, Attendee
-from .forms import MeetingForm, NoteForm, AttendeeForm
-from .forms import CommentForm
-from .models import Comment
+from .models import Meeting, MeetingSeries, Note, Attendee
+from .forms import MeetingForm, MeetingSeriesForm, NoteForm, AttendeeForm, AttendeeBulkForm
+from .forms import ActionItemForm, ActionItemBulkForm
+from .forms import AttachmentUploadForm, CommentForm, ExportForm
+from .models import Attachment, CalendarToken, Comment
+from .loaders import comment_paginator, get_meeting, meeting_sections
+from .pagination import KeysetPaginator
+from .permissions import can_view_meeting, remember_meeting_access
+from . import search as search_index
+from . import action_items, attendees as bulk_attendees, autocomplete, blobs, caching, exports
+from . import events, ics, instrumentation, recurrence, revisions
+from .caching import fragment_timeout
 from django.db import transaction
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+MEETINGS_PER_PAGE = 20
 
 
 def index(request):
@@ -14,6 +40,20 @@ def index(request):
     return render(request, 'index.html')
 
 
+def metrics(request):
+    """Request histograms in the Prometheus text format"""
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not constant_time_compare(request.headers.get('Authorization', ''), expected):
+            return HttpResponseForbidden()
+    elif request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        instrumentation.render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 def register(request):
     """User registration"""
     if request.method == 'POST':
@@ -34,8 +74,15 @@ def register(request):
 @login_required
 def dashboard(request):
     """User dashboard"""
-    meetings = Meeting.objects.filter(created_by=request.user)
-    attended_meetings = Meeting.objects.filter(attendees__user=request.user)
+    meetings = recurrence.OccurrencePaginator(
+        Meeting.objects.filter(created_by=request.user),
+        MeetingSeries.objects.filter(created_by=request.user).select_related('created_by'),
+        per_page=MEETINGS_PER_PAGE,
+    ).get_page(request.GET.get('created'))
+    attended_meetings = KeysetPaginator(
+        Meeting.objects.filter(attendees__user=request.user),
+        per_page=MEETINGS_PER_PAGE,
+    ).get_page(request.GET.get('attending'))
     return render(request, 'dashboard.html', {
         'meetings': meetings,
         'attended_meetings': attended_meetings
@@ -45,10 +92,54 @@ def dashboard(request):
 @login_required
 def meeting_list(request):
     """List all meetings"""
-    meetings = Meeting.objects.all()
+    meetings = recurrence.OccurrencePaginator(
+        Meeting.objects.visible_to(request.user).select_related('created_by'),
+        MeetingSeries.objects.visible_to(request.user).select_related('created_by'),
+        per_page=MEETINGS_PER_PAGE,
+    ).get_page(request.GET.get('cursor'))
     return render(request, 'meeting_list.html', {'meetings': meetings})
 
 
+@login_required
+def search(request):
+    """Full-text search across meetings, notes and comments"""
+    query = request.GET.get('q', '').strip()
+    results = search_index.search(request.user, query) if query else []
+    return render(request, 'search.html', {'query': query, 'results': results})
+
+
+@login_required
+def user_autocomplete(request):
+    """JSON list of users whose username starts with ``q``"""
+    try:
+        limit = int(request.GET.get('limit', autocomplete.DEFAULT_LIMIT))
+    except ValueError:
+        return HttpResponseBadRequest('limit must be an integer')
+    results = autocomplete.match_users(request.GET.get('q', ''), limit)
+    response = JsonResponse({'results': results})
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+
+@login_required
+def meeting_export(request):
+    """Stream the meetings visible to the user with all their child data"""
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    export_format = form.cleaned_data['format'] or 'csv'
+    queryset = exports.export_queryset(
+        user=request.user,
+        start=form.cleaned_data['start'],
+        end=form.cleaned_data['end'],
+        visibility=form.cleaned_data['visibility'],
+    )
+    chunks, content_type = exports.stream_export(queryset, export_format)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="meetings.{export_format}"'
+    return response
+
+
 @login_required
 def meeting_create(request):
     """Create a new meeting"""
@@ -69,38 +160,181 @@ def meeting_create(request):
     )
 
 
+@login_required
+def series_create(request):
+    """Create a recurring meeting"""
+    if request.method == 'POST':
+        form = MeetingSeriesForm(request.POST)
+        if form.is_valid():
+            series = form.save(commit=False)
+            series.created_by = request.user
+            series.save()
+            messages.success(request, 'Recurring meeting created successfully!')
+            return redirect('dashboard')
+    else:
+        form = MeetingSeriesForm()
+    return render(
+        request,
+        'meeting_form.html',
+        {'form': form, 'title': 'Create Recurring Meeting'}
+    )
+
+
+@login_required
+def occurrence_detail(request, pk, stamp):
+    """An occurrence of a series, stored as a meeting once someone writes to it"""
+    series = get_object_or_404(
+        MeetingSeries.objects.visible_to(request.user).select_related('created_by'), pk=pk
+    )
+    try:
+        moment = recurrence.parse_stamp(stamp)
+    except ValueError:
+        raise Http404('No such occurrence.')
+    meeting = Meeting.objects.filter(series=series, series_occurrence=moment).first()
+    if meeting is not None:
+        return redirect(meeting)
+    if not recurrence.is_occurrence(series, moment):
+        raise Http404('No such occurrence.')
+    if request.method == 'POST':
+        if request.POST.get('action') == 'cancel':
+            if series.created_by_id != request.user.pk:
+                return render(request, 'access_denied.html', status=403)
+            recurrence.cancel(series, moment)
+            messages.success(request, 'Meeting cancelled.')
+            return redirect('dashboard')
+        meeting = recurrence.materialize(series, moment)
+        return redirect(meeting)
+    return render(request, 'occurrence_detail.html', {
+        'occurrence': recurrence.Occurrence(series, moment),
+    })
+
+
+def meeting_validators(request, meeting, session_key):
+    """ETag and Last-Modified of the meeting page as rendered for this user
+
+    Shared by the sync and async views. None for methods other than GET
+    and HEAD, which are rendered unconditionally.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    return (
+        f'"{caching.meeting_etag(meeting, request.user, session_key)}"',
+        int(meeting.modified_at.timestamp()),
+    )
+
+
+def conditional_meeting_response(request, validators):
+    """The 304 or 412 response when the client's copy is current, else None"""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        patch_meeting_response(response, validators)
+    return response
+
+
+def patch_meeting_response(response, validators):
+    """Add the validators and the private, always-revalidate cache policy"""
+    if validators is not None:
+        etag, last_modified = validators
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @login_required
 def meeting_detail(request, pk):
     """View meeting details"""
-    meeting = get_object_or_404(Meeting, pk=pk)
-
-    # Permission: allow access based on visibility
-    is_creator = (request.user.is_authenticated and meeting.created_by == request.user)
-    is_attendee = (request.user.is_authenticated and meeting.attendees.filter(user=request.user).exists())
-
-    if meeting.visibility == Meeting.VISIBILITY_PRIVATE:
-        # Private: only owner and attendees
-        if not (is_creator or is_attendee):
-            return render(request, 'access_denied.html', status=403)
-    elif meeting.visibility == Meeting.VISIBILITY_TEAM:
-        # Team: any authenticated user
-        if not request.user.is_authenticated:
-            return render(request, 'access_denied.html', status=403)
-    elif meeting.visibility == Meeting.VISIBILITY_PUBLIC:
-        # Public: everyone may view (no restrictions)
-        pass
-
-    notes = meeting.notes.all()
-    attendees = meeting.attendees.all()
-    action_items = meeting.action_items.all()
-    attachments = meeting.attachments.all()
-    return render(request, 'meeting_detail.html', {
+    meeting = get_meeting(pk, request.user)
+    remember_meeting_access(request, meeting)
+
+    # Permission: the visibility rules are evaluated in the same query
+    if not meeting.can_view:
+        return patch_meeting_response(render(request, 'access_denied.html', status=403), None)
+
+    validators = meeting_validators(request, meeting, request.session.session_key)
+    response = conditional_meeting_response(request, validators)
+    if response is not None:
+        return response
+
+    # Sections are evaluated lazily, so cached fragments skip their queries
+    context = {
         'meeting': meeting,
-        'notes': notes,
-        'attendees': attendees,
-        'action_items': action_items,
-        'attachments': attachments,
-    })
+        'fragment_timeout': fragment_timeout(),
+        'live_updates': events.streams_enabled(),
+    }
+    context.update(meeting_sections(meeting))
+    return patch_meeting_response(render(request, 'meeting_detail.html', context), validators)
+
+
+def meeting_public(request, token):
+    """Read-only view of a meeting shared by public link (no login needed)"""
+    content = caching.get_public_page(token)
+    if content is None:
+        meeting = get_object_or_404(
+            Meeting.objects.select_related('created_by', 'last_edited_by'),
+            public_token=token,
+        )
+        context = {'meeting': meeting}
+        context.update(meeting_sections(meeting))
+        # Rendered without the request so no session, user or CSRF state
+        # leaks into a page that is shared by every visitor
+        content = render_to_string('meeting_public.html', context)
+        caching.set_public_page(token, meeting.pk, content)
+    response = HttpResponse(content)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.PUBLIC_PAGE_MAX_AGE,
+        s_maxage=settings.PUBLIC_PAGE_MAX_AGE,
+    )
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@login_required
+def calendar_feed_settings(request):
+    """Show, generate, rotate or revoke the user's calendar feed URL"""
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'generate':
+            CalendarToken.objects.get_or_create(user=request.user)
+            messages.success(request, 'Calendar feed created.')
+        elif action == 'rotate':
+            calendar_token = get_object_or_404(CalendarToken, user=request.user)
+            calendar_token.rotate()
+            messages.success(request, 'Calendar feed URL replaced; the old one no longer works.')
+        elif action == 'revoke':
+            CalendarToken.objects.filter(user=request.user).delete()
+            messages.success(request, 'Calendar feed revoked.')
+        return redirect('calendar_feed_settings')
+    calendar_token = CalendarToken.objects.filter(user=request.user).first()
+    feed_url = None
+    if calendar_token is not None:
+        feed_url = request.build_absolute_uri(
+            reverse('calendar_feed', args=[calendar_token.token])
+        )
+    return render(request, 'calendar_feed.html', {'feed_url': feed_url})
+
+
+def calendar_feed(request, token):
+    """iCalendar feed of the token owner's meetings (no login needed)"""
+    calendar_token = get_object_or_404(
+        CalendarToken.objects.select_related('user'), token=token, user__is_active=True
+    )
+    etag = ics.feed_etag(calendar_token.user)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(
+            ics.stream_feed(calendar_token.user), content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'inline; filename="meetings.ics"'
+    response['ETag'] = etag
+    # Calendar clients poll often; make every poll a cheap revalidation
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
@@ -175,6 +409,7 @@ def note_create(request, meeting_id):
             note.meeting = meeting
             note.created_by = request.user
             note.save()
+            revisions.record(note, request.user)
             messages.success(request, 'Note added successfully!')
             return redirect('meeting_detail', pk=meeting_id)
     else:
@@ -186,19 +421,43 @@ def note_create(request, meeting_id):
     )
 
 
+@login_required
+def note_comments(request, pk):
+    """HTML fragment with the comments of a note older than ``?cursor=``"""
+    note = get_object_or_404(Note.objects.only('pk', 'meeting_id'), pk=pk)
+    if not can_view_meeting(request, note.meeting_id):
+        return render(request, 'access_denied.html', status=403)
+    page = comment_paginator(note.pk).get_page(request.GET.get('cursor'))
+    return render(request, 'comment_page.html', {
+        'note_id': note.pk,
+        'page': page,
+        'comments': page.object_list[::-1],
+    })
+
+
+def public_note_comments(request, token, pk):
+    """Earlier comments of a note on a meeting shared by public link"""
+    note = get_object_or_404(Note.objects.only('pk'), pk=pk, meeting__public_token=token)
+    page = comment_paginator(note.pk).get_page(request.GET.get('cursor'))
+    # Rendered without the request, like the public page it extends
+    response = HttpResponse(render_to_string('comment_page.html', {
+        'token': token,
+        'note_id': note.pk,
+        'page': page,
+        'comments': page.object_list[::-1],
+    }))
+    patch_cache_control(response, public=True, max_age=settings.PUBLIC_PAGE_MAX_AGE)
+    return response
+
+
 @login_required
 def comment_create(request, note_id):
     """Create a comment for a note (user must have access to the meeting)"""
     note = get_object_or_404(Note, pk=note_id)
-    meeting = note.meeting
 
     # Check access using same rules as meeting_detail
-    if meeting.visibility == Meeting.VISIBILITY_PRIVATE:
-        if not (meeting.created_by == request.user or meeting.attendees.filter(user=request.user).exists()):
-            return render(request, 'access_denied.html', status=403)
-    elif meeting.visibility == Meeting.VISIBILITY_TEAM:
-        if not request.user.is_authenticated:
-            return render(request, 'access_denied.html', status=403)
+    if not can_view_meeting(request, note.meeting_id):
+        return render(request, 'access_denied.html', status=403)
 
     if request.method == 'POST':
         form = CommentForm(request.POST)
@@ -208,8 +467,8 @@ def comment_create(request, note_id):
             comment.created_by = request.user
             comment.save()
             messages.success(request, 'Comment posted.')
-            return redirect('meeting_detail', pk=meeting.pk)
-    return redirect('meeting_detail', pk=meeting.pk)
+            return redirect('meeting_detail', pk=note.meeting_id)
+    return redirect('meeting_detail', pk=note.meeting_id)
 
 
 @login_required
@@ -246,9 +505,12 @@ def note_edit(request, pk):
     """Edit a note"""
     note = get_object_or_404(Note, pk=pk, created_by=request.user)
     if request.method == 'POST':
+        # Validating the form writes the new content onto the instance
+        previous = note.content
         form = NoteForm(request.POST, instance=note)
         if form.is_valid():
             form.save()
+            revisions.record(note, request.user, previous=previous)
             messages.success(request, 'Note updated successfully!')
             return redirect('meeting_detail', pk=note.meeting.pk)
     else:
@@ -260,6 +522,38 @@ def note_edit(request, pk):
     )
 
 
+@login_required
+def note_history(request, pk):
+    """List a note's revisions and diff two of them (``?from=&to=``)"""
+    note = get_object_or_404(Note.objects.select_related('meeting'), pk=pk)
+    if not can_view_meeting(request, note.meeting_id):
+        return render(request, 'access_denied.html', status=403)
+    history = list(
+        note.revisions.select_related('edited_by').defer('data').order_by('-number')
+    )
+    context = {'note': note, 'meeting': note.meeting, 'revisions': history}
+    if len(history) > 1:
+        numbers = {revision.number for revision in history}
+        try:
+            new = int(request.GET.get('to', history[0].number))
+            old = int(request.GET.get('from', max(
+                (number for number in numbers if number < new), default=new
+            )))
+        except ValueError:
+            return HttpResponseBadRequest('Revision numbers must be integers.')
+        if old not in numbers or new not in numbers:
+            return HttpResponseBadRequest('Unknown revision.')
+        context.update(
+            old=old,
+            new=new,
+            diff=revisions.diff(
+                revisions.text_at(note, old), revisions.text_at(note, new),
+                f'revision {old}', f'revision {new}',
+            ),
+        )
+    return render(request, 'note_history.html', context)
+
+
 @login_required
 def note_delete(request, pk):
     """Delete a note"""
@@ -297,6 +591,47 @@ def attendee_add(request, meeting_id):
     )
 
 
+@login_required
+def attendee_bulk_add(request, meeting_id):
+    """Invite many users at once from a list or CSV upload (owner only).
+
+    Also accepts a JSON body ``{"users": [...], "status": "..."}`` and then
+    answers with the result as JSON.
+    """
+    meeting = get_object_or_404(Meeting, pk=meeting_id, created_by=request.user)
+    if request.method == 'POST' and request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body)
+            identifiers = [str(item) for item in payload['users']]
+            status = payload.get('status', 'invited')
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Expected {"users": [...]}'}, status=400)
+        if status not in dict(Attendee._meta.get_field('status').choices):
+            return JsonResponse({'error': f'Unknown status: {status}'}, status=400)
+        result = bulk_attendees.bulk_invite(meeting, identifiers, status)
+        return JsonResponse(result.as_dict())
+
+    result = None
+    if request.method == 'POST':
+        form = AttendeeBulkForm(request.POST, request.FILES)
+        if form.is_valid():
+            identifiers = bulk_attendees.parse_identifiers(form.cleaned_data['identifiers'])
+            if form.cleaned_data['csv_file']:
+                identifiers += bulk_attendees.parse_csv(form.cleaned_data['csv_file'])
+            result = bulk_attendees.bulk_invite(
+                meeting, identifiers, form.cleaned_data['status']
+            )
+            messages.success(request, f'{len(result.added)} attendee(s) added.')
+            form = AttendeeBulkForm()
+    else:
+        form = AttendeeBulkForm()
+    return render(
+        request,
+        'attendee_bulk_form.html',
+        {'form': form, 'meeting': meeting, 'result': result}
+    )
+
+
 @login_required
 def attendee_remove(request, pk):
     """Remove an attendee from a meeting"""
@@ -337,3 +672,115 @@ def attendee_update_status(request, pk):
         'attendee_status_form.html',
         {'attendee': attendee}
     )
+
+
+@login_required
+def action_item_create(request, meeting_id):
+    """Add an action item to a meeting"""
+    meeting = get_object_or_404(Meeting, pk=meeting_id)
+    if not can_view_meeting(request, meeting.pk):
+        return render(request, 'access_denied.html', status=403)
+    if request.method == 'POST':
+        form = ActionItemForm(request.POST)
+        if form.is_valid():
+            item = form.save(commit=False)
+            item.meeting = meeting
+            item.save()
+            messages.success(request, 'Action item added successfully!')
+            return redirect('meeting_detail', pk=meeting_id)
+    else:
+        form = ActionItemForm()
+    return render(
+        request,
+        'action_item_form.html',
+        {'form': form, 'meeting': meeting}
+    )
+
+
+@login_required
+def action_item_inbox(request):
+    """The user's action items across meetings, with bulk updates"""
+    completed = request.GET.get('status') == 'done'
+    if request.method == 'POST':
+        form = ActionItemBulkForm(request.POST)
+        if form.is_valid():
+            item_ids = form.cleaned_data['items']
+            action = form.cleaned_data['action']
+            if action == 'complete':
+                updated = action_items.complete(request.user, item_ids)
+            elif action == 'reopen':
+                updated = action_items.reopen(request.user, item_ids)
+            else:
+                updated = action_items.reassign(
+                    request.user, item_ids, form.cleaned_data['assignee']
+                )
+            messages.success(request, f'{updated} action item(s) updated.')
+            return redirect(request.get_full_path())
+    else:
+        form = ActionItemBulkForm(initial={'action': 'reopen' if completed else 'complete'})
+    page = action_items.inbox(request.user, completed, request.GET.get('cursor'))
+    return render(request, 'action_item_inbox.html', {
+        'form': form,
+        'completed': completed,
+        'page': page,
+        'groups': action_items.group_by_meeting(page),
+    })
+
+
+@csrf_exempt
+@login_required
+def attachment_upload(request, meeting_id):
+    """Upload a file to a meeting.
+
+    The file is spooled to disk and hashed while it arrives; the CSRF check
+    runs afterwards, since the upload handlers must be set before the body
+    is read.
+    """
+    request.upload_handlers = [blobs.HashingUploadHandler(request)]
+    return _attachment_upload(request, meeting_id)
+
+
+@csrf_protect
+def _attachment_upload(request, meeting_id):
+    meeting = get_object_or_404(Meeting, pk=meeting_id)
+    if not can_view_meeting(request, meeting.pk):
+        return render(request, 'access_denied.html', status=403)
+    if request.method == 'POST':
+        form = AttachmentUploadForm(request.POST, request.FILES)
+        if request.upload_handlers[0].too_large:
+            limit = blobs.max_upload_size() // (1024 * 1024)
+            form.add_error(None, f'Files can be at most {limit} MB.')
+        elif form.is_valid():
+            uploaded = form.cleaned_data['file']
+            with transaction.atomic():
+                blob, _ = blobs.store(uploaded)
+                Attachment.objects.create(
+                    meeting=meeting,
+                    name=form.cleaned_data['name'] or uploaded.name,
+                    blob=blob,
+                    uploaded_by=request.user,
+                )
+            messages.success(request, 'File uploaded.')
+            return redirect('meeting_detail', pk=meeting.pk)
+    else:
+        form = AttachmentUploadForm()
+    return render(request, 'attachment_form.html', {'form': form, 'meeting': meeting})
+
+
+def attachment_download(request, pk):
+    """Download an uploaded attachment, with byte-range support"""
+    attachment = get_object_or_404(
+        Attachment.objects.select_related('blob'), pk=pk, blob__isnull=False
+    )
+    if not can_view_meeting(request, attachment.meeting_id):
+        return render(request, 'access_denied.html', status=403)
+    return blobs.serve(request, attachment.blob, attachment.name)
+
+
+def public_attachment_download(request, token, pk):
+    """Download an attachment of a meeting shared by public link"""
+    attachment = get_object_or_404(
+        Attachment.objects.select_related('blob'),
+        pk=pk, meeting__public_token=token, blob__isnull=False,
+    )
+    return blobs.serve(request, attachment.blob, attachment.name)
@@ -1,4 +1,5 @@
-﻿import os
+﻿import json
+import os
 from pathlib import Path
 import dj_database_url
 
@@ -28,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.PerformanceMiddleware',
+    'app.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -41,7 +44,8 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'meeting_notes.urls'
 
 TEMPLATES = [{
-    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    # DjangoTemplates plus per-request render timing for PerformanceMiddleware
+    'BACKEND': 'app.instrumentation.InstrumentedDjangoTemplates',
     'DIRS': [BASE_DIR / 'app' / 'templates'],
     'APP_DIRS': True,
     'OPTIONS': {
@@ -78,6 +82,109 @@ else:
         }
     }
 
+# Read replicas, as comma-separated database URLs. They become the aliases
+# replica_1, replica_2, ... and serve the reads of read-only views (see
+# app.routers). Locally, a copy of the SQLite file works as a replica. In
+# tests each replica mirrors the test database.
+DATABASE_REPLICAS = []
+for number, url in enumerate(
+    filter(None, os.environ.get('REPLICA_DATABASE_URLS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(dj_database_url.parse(url), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['app.routers.PrimaryReplicaRouter']
+# After writing, a user reads from the primary for this many seconds
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
+# Cache: Redis when REDIS_URL is set, a shared directory when CACHE_DIR is
+# set, otherwise per-process memory
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Sessions are read from the cache and written through to the database, so
+# they survive a cache flush. Messages travel in a cookie rather than the
+# session, so a redirect after a form post doesn't write the session twice.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# request.user is loaded from the cache for AUTH_USER_CACHE_TIMEOUT seconds;
+# saving a user or changing their permissions drops the entry (app.backends).
+# ModelBackend stays listed so sessions that were started with it stay valid.
+AUTHENTICATION_BACKENDS = [
+    'app.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 300))
+
+MEETING_FRAGMENT_CACHE_TIMEOUT = int(
+    os.environ.get('MEETING_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+)
+
+# Public share links: how long the rendered page stays in our cache, and
+# how long browsers and shared proxies/CDNs may reuse it
+PUBLIC_PAGE_CACHE_TIMEOUT = int(os.environ.get('PUBLIC_PAGE_CACHE_TIMEOUT', 300))
+PUBLIC_PAGE_MAX_AGE = int(os.environ.get('PUBLIC_PAGE_MAX_AGE', 60))
+
+# Username typeahead: how long results for one prefix stay cached
+USER_AUTOCOMPLETE_CACHE_TIMEOUT = int(os.environ.get('USER_AUTOCOMPLETE_CACHE_TIMEOUT', 300))
+
+# Route the dashboard, meeting list and meeting detail to the coroutine
+# views in app.async_views; only useful when served by an ASGI worker, as
+# the Procfile web process is
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Live meeting updates over Server-Sent Events. The default broker only
+# reaches watchers in the same process; use app.events.RedisBroker (with
+# EVENTS_REDIS_URL or REDIS_URL) when running several workers.
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'app.events.LocalBroker')
+EVENTS_HEARTBEAT_INTERVAL = int(os.environ.get('EVENTS_HEARTBEAT_INTERVAL', 15))
+EVENTS_STREAM_TIMEOUT = int(os.environ.get('EVENTS_STREAM_TIMEOUT', 300))
+
+# Recurring meetings (app.recurrence) list their virtual occurrences up to
+# this many days ahead; later ones are only in the calendar feed
+RECURRENCE_HORIZON_DAYS = int(os.environ.get('RECURRENCE_HORIZON_DAYS', 90))
+
+# Request instrumentation (app.middleware.PerformanceMiddleware). Requests
+# slower than PERF_SLOW_REQUEST_MS are logged to "app.performance" with
+# their slowest SQL; set it to 0 to disable the log.
+PERF_SERVER_TIMING = os.environ.get('PERF_SERVER_TIMING', 'True') == 'True'
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', 500))
+PERF_SLOW_REQUEST_SQL_LIMIT = int(os.environ.get('PERF_SLOW_REQUEST_SQL_LIMIT', 10))
+
+# Limits enforced by "manage.py benchmark_views", per URL name with
+# "default" applying to every view: p95 latency in ms and query count
+PERF_BUDGETS = {
+    'default': {'p95_ms': 500, 'queries': 15},
+    'dashboard': {'queries': 4},
+    'meeting_list': {'queries': 4},
+    'meeting_detail': {'p95_ms': 250, 'queries': 6},
+    'meeting_public': {'queries': 0},
+}
+
+# /metrics/ requires "Authorization: Bearer <METRICS_TOKEN>" when the token
+# is set, and otherwise only answers requests from INTERNAL_IPS
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+INTERNAL_IPS = os.environ.get('INTERNAL_IPS', '127.0.0.1').split(',')
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'en-us'
@@ -89,6 +196,28 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'app' / 'static']
 
+# Uploaded attachment files, stored by content hash (app.blobs). Set
+# ATTACHMENT_STORAGE_BACKEND and ATTACHMENT_STORAGE_OPTIONS (JSON) to use
+# another backend, e.g. "storages.backends.s3.S3Storage" with
+# '{"bucket_name": "...", "endpoint_url": "..."}' for S3-compatible storage.
+ATTACHMENT_STORAGE_BACKEND = os.environ.get(
+    'ATTACHMENT_STORAGE_BACKEND', 'django.core.files.storage.FileSystemStorage'
+)
+ATTACHMENT_STORAGE_OPTIONS = json.loads(os.environ.get('ATTACHMENT_STORAGE_OPTIONS', '{}'))
+if ATTACHMENT_STORAGE_BACKEND == 'django.core.files.storage.FileSystemStorage':
+    ATTACHMENT_STORAGE_OPTIONS.setdefault(
+        'location', os.environ.get('ATTACHMENT_ROOT', BASE_DIR / 'media' / 'attachments')
+    )
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'attachments': {
+        'BACKEND': ATTACHMENT_STORAGE_BACKEND,
+        'OPTIONS': ATTACHMENT_STORAGE_OPTIONS,
+    },
+}
+ATTACHMENT_MAX_UPLOAD_SIZE = int(os.environ.get('ATTACHMENT_MAX_UPLOAD_SIZE', 100 * 1024 * 1024))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'